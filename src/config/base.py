@@ -1,100 +1,1345 @@
+import codecs
 import csv
+import functools
+import io
+import json
+import operator
+import os
+import queue
+import re
+import sys
+import tempfile
+import threading
+import zlib
+from collections import Counter, defaultdict, namedtuple
 
 from django.conf import settings
 from django.http import JsonResponse
 from django.views import View
-from django.db import transaction, IntegrityError
-from datetime import datetime
-from django.http import HttpResponse
+from django.db import connections, router, transaction, IntegrityError
+from datetime import datetime, timedelta
+from django.http import FileResponse, StreamingHttpResponse
 from django.db import models
+from django.db.models import Q
+from django.dispatch import Signal
+from django.core import signing
+from django.core.exceptions import NON_FIELD_ERRORS, ImproperlyConfigured, ValidationError
+from django.core.validators import (
+    MaxLengthValidator, MinLengthValidator, ProhibitNullCharactersValidator,
+)
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.functional import cached_property
 from django.http import HttpResponseForbidden
 from register.constants import PRIVILEGE_EDITOR, PRIVILEGE_MANAGER, PRIVILEGE_SYSTEM
 from django import forms
 import openpyxl
+from config.common import Common
 
 
-class ExcelExportBaseView(View):
+# 一括登録（bulk_create）の完了通知（instances: 登録したオブジェクトのリスト）
+# - bulk_create では post_save / m2m_changed が送信されないため、検索インデックス等の後続処理はこちらで受信する
+bulk_created = Signal()
+
+
+class EchoBuffer:
+    '''
+    csv.writer 用の疑似バッファ
+    - 書き込まれた文字列を保持せずそのまま返す（ストリーミング出力用）
+    '''
+    def write(self, value):
+        return value
+
+
+class CopyOutputWriter:
+    '''
+    COPY ... TO STDOUT の出力先ファイルのラッパー
+    - psycopg2 は1行ごとに write() を呼ぶため、行末の改行（LF）を lineterminator に置き換える（値の中の改行はそのまま）
+    - every 行ごとにまとめて file に書き出し、呼び出し回数を出力済み件数として progress に渡す（任意）
+    '''
+    def __init__(self, file, every, lineterminator='\r\n', progress=None):
+        self.file = file
+        self.every = every
+        self.lineterminator = lineterminator.encode('utf-8')
+        self.progress = progress
+        self.count = 0
+        self.lines = []
+
+    def write(self, value):
+        if value.endswith(b'\n'):
+            value = value[:-1] + self.lineterminator
+        self.lines.append(value)
+        self.count += 1
+        if self.count % self.every == 0:
+            self.flush()
+            if self.progress:
+                self.progress(self.count)
+
+    def flush(self):
+        if self.lines:
+            self.file.write(b''.join(self.lines))
+            self.lines = []
+
+
+class CopyQueue:
+    '''
+    COPY を実行するスレッドから出力をストリーミングレスポンスに渡す有界キュー
+    - 書き込み側は write()（キューが空くまで待機）、読み出し側は queue.get() を使用
+    - cancel() 後の書き込みは破棄（読み出し側は終了の通知まで読み捨てる）
+    '''
+    def __init__(self, maxsize=2):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.cancelled = False
+
+    def write(self, value):
+        if not self.cancelled:
+            self.queue.put(value)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class ChunkBuffer:
+    '''
+    書き込まれたバイト列を溜めておき、drain() で取り出す疑似ファイル
+    - ファイルへの書き出しを前提としたライブラリ（pyarrow 等）の出力をストリーミングするために使用
+    '''
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def write(self, value):
+        self.buffer += value
+        self.position += len(value)
+        return len(value)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    @property
+    def closed(self):
+        return False
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+class CopyRowStream:
+    '''
+    行のイテレータを COPY ... FROM STDIN 用のCSVとして読み出す疑似ファイル
+    - copy_expert が read(size) で要求した分だけ行を変換し、全件をメモリに展開しない
+    - None は NULL（引用符なしの空欄）、空文字は "" として出力
+    '''
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.writer = csv.writer(EchoBuffer(), lineterminator='\n', quoting=csv.QUOTE_NOTNULL)
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.buffer += self.writer.writerow(row)
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+#--------------------------
+# 出力形式（format パラメータ）
+#--------------------------
+EXPORT_FORMATS = {}
+
+
+def register_export_format(cls):
+    '''出力形式を登録するデコレータ（format パラメータの値 → 出力形式クラス）'''
+    EXPORT_FORMATS[cls.name] = cls
+    return cls
+
+
+class ExportFormat:
+    '''
+    出力形式の基底クラス
+    - chunks(): 行（リスト）のイテラブルを受け取り、chunk_size 行ごとにバイト列を返すジェネレータ
+    '''
+    name = ''  # format パラメータの値
+    extension = ''  # 出力ファイルの拡張子
+    content_type = 'application/octet-stream'
+
+    def __init__(self, headers, chunk_size, fields=None):
+        self.headers = headers
+        self.chunk_size = chunk_size
+        self.fields = fields or [None] * len(headers)  # 列ごとのモデル項目（output_field、不明な列は None）
+
+    def chunks(self, rows):
+        raise NotImplementedError('サブクラスで chunks() を実装してください')
+
+
+@register_export_format
+class CSVFormat(ExportFormat):
+    '''CSV（UTF-8）'''
+    name = 'csv'
+    extension = 'csv'
+    content_type = 'text/csv'
+    delimiter = ','
+    lineterminator = '\r\n'  # csv.writer の既定（COPY の出力も CopyOutputWriter で揃える）
+
+    def chunks(self, rows):
+        writer = csv.writer(EchoBuffer(), delimiter=self.delimiter, lineterminator=self.lineterminator)
+        lines = [writer.writerow(self.headers)]
+        for row in rows:
+            lines.append(writer.writerow(row))
+            if len(lines) >= self.chunk_size:
+                yield ''.join(lines).encode('utf-8')
+                lines = []
+        if lines:
+            yield ''.join(lines).encode('utf-8')
+
+
+@register_export_format
+class TSVFormat(CSVFormat):
+    '''TSV（タブ区切り、UTF-8）'''
+    name = 'tsv'
+    extension = 'tsv'
+    content_type = 'text/tab-separated-values'
+    delimiter = '\t'
+
+
+@register_export_format
+class NDJSONFormat(ExportFormat):
+    '''NDJSON（1行1オブジェクト、キーはヘッダ名）'''
+    name = 'ndjson'
+    extension = 'ndjson'
+    content_type = 'application/x-ndjson'
+
+    def chunks(self, rows):
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(dict(zip(self.headers, row)), ensure_ascii=False, cls=DjangoJSONEncoder) + '\n')
+            if len(lines) >= self.chunk_size:
+                yield ''.join(lines).encode('utf-8')
+                lines = []
+        if lines:
+            yield ''.join(lines).encode('utf-8')
+
+
+@register_export_format
+class ParquetFormat(ExportFormat):
+    '''
+    Parquet（chunk_size 行ごとに1行グループとして書き出し）
+    - 列の型は列ごとの output_field から決定し（arrow_type）、行グループ間でスキーマを揃える
+    - 型が不明な列は文字列（NULL は欠損値）
+    '''
+    name = 'parquet'
+    extension = 'parquet'
+    content_type = 'application/vnd.apache.parquet'
+
+    @staticmethod
+    def arrow_type(pa, field):
+        '''モデル項目に対応する Arrow の型（対応しない項目は None）'''
+        if isinstance(field, models.BooleanField):
+            return pa.bool_()
+        if isinstance(field, models.DecimalField) and field.max_digits is not None:
+            return pa.decimal128(field.max_digits, field.decimal_places)
+        if isinstance(field, models.DateTimeField):
+            return pa.timestamp('us', tz='UTC')
+        if isinstance(field, models.DateField):
+            return pa.date32()
+        if isinstance(field, models.IntegerField):
+            return pa.int64()
+        if isinstance(field, models.FloatField):
+            return pa.float64()
+        return None
+
+    def chunks(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = [self.arrow_type(pa, field) for field in self.fields]
+        schema = pa.schema([(header, t or pa.string()) for header, t in zip(self.headers, types)])
+        sink = ChunkBuffer()
+        writer = pq.ParquetWriter(sink, schema)
+
+        def write(batch):
+            arrays = []
+            for t, column in zip(types, zip(*batch)):
+                if t is None:
+                    arrays.append(pa.array([None if v is None else str(v) for v in column], pa.string()))
+                else:
+                    arrays.append(pa.array(column, t))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.chunk_size:
+                write(batch)
+                batch = []
+                yield sink.drain()
+        if batch:
+            write(batch)
+        writer.close()
+        yield sink.drain()
+
+
+def gzip_chunks(chunks):
+    '''チャンクを順次 gzip 圧縮して返すジェネレータ（全体をメモリに保持しない）'''
+    compressor = zlib.compressobj(wbits=31)  # wbits=31: gzip形式
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# 圧縮方式（compress パラメータの値 → (拡張子, 圧縮処理)）
+EXPORT_COMPRESSIONS = {
+    'gzip': ('gz', gzip_chunks),
+}
+
+
+class ExportColumnsMixin():
+    '''
+    エクスポートの列定義（columns）を1回のクエリに変換するMixin
+    - columns: ヘッダ → ORMパス（例: 'product_category__product_category_name'）または式
+    - 指定時は values_list で必要な列のみ取得し、row() で関連を辿らない（件数に関わらずクエリ数一定）
+    - 未指定時は従来どおりモデルインスタンスを取得し、サブクラスの row() で1行を組み立てる
+    '''
+    columns: dict = {}  # 出力列定義（ヘッダ → ORMパス or 式）
+    headers: list[str] = []  # 出力ヘッダ定義（columns 未指定時）
+
+    def get_columns(self):
+        '''出力列定義（サブクラス・Mixinで列を追加する場合に拡張）'''
+        return dict(self.columns)
+
+    def get_headers(self):
+        '''出力ヘッダ（columns 指定時はそのキー）'''
+        return list(self.get_columns()) if self.columns else list(self.headers)
+
+    def project(self, queryset):
+        '''
+        列定義をクエリセットに適用
+        - 全列を col_<n> として注釈し、SQLのSELECT句の列順をヘッダと一致させる（COPY 出力用）
+        '''
+        if not self.columns:
+            return queryset
+        annotations = {
+            f'col_{idx}': models.F(path) if isinstance(path, str) else path
+            for idx, path in enumerate(self.get_columns().values())
+        }
+        return queryset.annotate(**annotations).values_list(*annotations)
+
+    def get_output_fields(self, data):
+        '''列ごとのモデル項目（columns 指定時は注釈の output_field、未指定時は不明として None）'''
+        if not self.columns:
+            return [None] * len(self.get_headers())
+        return [data.query.annotations[f'col_{idx}'].output_field for idx in range(len(self.get_columns()))]
+
+    def row(self, rec):
+        '''1行分のリストを返す（columns 未指定時はサブクラスで実装）'''
+        if self.columns:
+            return list(rec)
+        raise NotImplementedError('サブクラスで columns または row() を定義してください')
+
+    def iter_rows(self, data, progress=None):
+        '''
+        サーバーサイドカーソル（iterator）で chunk_size 件ずつ取得し、1行ずつ返す
+        - progress: chunk_size 件ごとと完了時に出力済み件数を受け取るコールバック（任意）
+        '''
+        count = 0
+        for rec in data.iterator(chunk_size=self.chunk_size):
+            yield self.row(rec)
+            count += 1
+            if progress and count % self.chunk_size == 0:
+                progress(count)
+        if progress:
+            progress(count)
+
+
+class ExportFormatMixin():
+    '''
+    format / compress パラメータによる出力形式の切り替え
+    - format: EXPORT_FORMATS に登録した形式（csv / tsv / ndjson / parquet）
+    - compress: EXPORT_COMPRESSIONS に登録した圧縮方式（gzip）
+    - いずれも未指定（または既定の形式のみ指定）の場合は各基底クラスの既定の出力
+    '''
+    @cached_property
+    def export_options(self):
+        '''(出力形式クラス, 圧縮方式) を返す（既定の出力の場合は出力形式クラスが None）'''
+        name = self.request.GET.get('format') or self.file_extension
+        compress = self.request.GET.get('compress') or None
+        if name == self.file_extension and not compress:
+            return None, None
+        if name not in EXPORT_FORMATS or (compress and compress not in EXPORT_COMPRESSIONS):
+            raise ValueError('出力形式が不正です。')
+        return EXPORT_FORMATS[name], compress
+
+    def get_file_name(self):
+        '''出力ファイル名（接頭辞＋日時、出力形式・圧縮方式に応じた拡張子）'''
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        export_format, compress = self.export_options
+        extension = export_format.extension if export_format else self.file_extension
+        if compress:
+            extension += '.' + EXPORT_COMPRESSIONS[compress][0]
+        return f'{self.filename_prefix}_{timestamp}.{extension}'
+
+    def stream_format(self, data, progress=None):
+        '''指定された出力形式（と圧縮方式）でバイト列のチャンクを返すジェネレータ'''
+        export_format, compress = self.export_options
+        chunks = export_format(self.get_headers(), self.chunk_size, self.get_output_fields(data)).chunks(
+            self.iter_rows(data, progress)
+        )
+        if compress:
+            chunks = EXPORT_COMPRESSIONS[compress][1](chunks)
+        return chunks
+
+    def format_response(self, data):
+        '''指定された出力形式でのストリーミングレスポンス'''
+        export_format, compress = self.export_options
+        content_type = 'application/gzip' if compress else export_format.content_type
+        response = StreamingHttpResponse(self.stream_format(data), content_type=content_type)
+        response['Content-Disposition'] = f"attachment; filename*=UTF-8''{self.get_file_name()}"
+        return response
+
+
+class ExportDeltaMixin():
+    '''
+    差分出力（since / cursor パラメータ）
+    - since: ISO 8601 形式の日時、cursor: 前回レスポンスの X-Export-Next-Cursor
+    - 指定時は基準より後に作成・更新・論理削除された行のみを（差分日時, id）順に出力
+    - 論理削除済みの行も含め、columns 指定時は末尾に削除フラグ列（1: 削除済み）を追加
+    - 出力範囲の上限を先に確定し、次回の基準をレスポンスヘッダ（X-Export-Next-Cursor / X-Export-Watermark）で返す
+    - 差分日時は保存時点の値でコミット順ではないため、直近 delta_margin 秒の行は次回に出力（上限を過去にずらす）
+    '''
+    delta_salt = 'export-delta'
+    delta_field = 'updated_at'  # 差分判定に使う日時（ORMパス or 式）
+    deleted_condition = Q(is_deleted=True)  # 論理削除済みの条件
+    deleted_header = '削除フラグ'  # 差分出力時に追加する列のヘッダ
+    delta_margin = settings.EXPORT_DELTA_MARGIN_SECONDS  # 出力範囲から除く直近の秒数
+    delta_next = None  # 次回の基準（差分日時, id）
+
+    @cached_property
+    def delta_since(self):
+        '''差分出力の基準（差分日時, id）。未指定時は None、不正な値は ValueError'''
+        cursor = self.request.GET.get('cursor')
+        since = self.request.GET.get('since')
+        if cursor:
+            try:
+                value, pk = signing.loads(cursor, salt=self.delta_salt)
+                return datetime.fromisoformat(value), int(pk)
+            except (signing.BadSignature, TypeError, ValueError):
+                raise ValueError('差分出力のカーソルが不正です。')
+        if since:
+            value = parse_datetime(since)
+            if value is None:
+                date = parse_date(since)
+                value = datetime(date.year, date.month, date.day) if date else None
+            if value is None:
+                raise ValueError('差分出力の基準日時が不正です。')
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            return value, None
+        return None
+
+    def get_base_queryset(self, request):
+        '''出力対象の基本クエリセット（所属テナント限定、差分出力時以外は論理削除済みを除外）'''
+        queryset = self.model_class.objects.filter(tenant=request.user.tenant)
+        if self.delta_since is None:
+            queryset = queryset.filter(is_deleted=False)
+        return queryset
+
+    def get_columns(self):
+        columns = super().get_columns()
+        if self.delta_since is not None and columns:
+            columns[self.deleted_header] = models.Case(
+                models.When(self.deleted_condition, then=models.Value('1')),
+                default=models.Value('0'),
+                output_field=models.CharField(),
+            )
+        return columns
+
+    def apply_delta(self, queryset):
+        '''
+        差分出力の条件を適用
+        - 基準より後の行に絞り込み、出力開始時点の最終行までを出力範囲とする（出力中の更新は次回に出力）
+        - 保存からコミットまでの間に次回の基準を越えられないよう、直近 delta_margin 秒の行は出力範囲に含めない
+        '''
+        if self.delta_since is None:
+            return queryset
+        since, pk = self.delta_since
+        field = models.F(self.delta_field) if isinstance(self.delta_field, str) else self.delta_field
+        queryset = queryset.annotate(delta_at=field)
+        if pk is None:
+            queryset = queryset.filter(delta_at__gt=since)
+        else:
+            queryset = queryset.filter(Q(delta_at__gt=since) | Q(delta_at=since, pk__gt=pk))
+        queryset = queryset.filter(delta_at__lte=timezone.now() - timedelta(seconds=self.delta_margin))
+
+        last = queryset.order_by('-delta_at', '-pk').values_list('delta_at', 'pk').first()
+        if last:
+            queryset = queryset.filter(Q(delta_at__lt=last[0]) | Q(delta_at=last[0], pk__lte=last[1]))
+        self.delta_next = last or (since, pk or 0)
+        return queryset.order_by('delta_at', 'pk')
+
+    def set_delta_headers(self, response):
+        '''次回の差分出力の基準をレスポンスヘッダに設定'''
+        if self.delta_next:
+            value, pk = self.delta_next
+            response['X-Export-Next-Cursor'] = signing.dumps([value.isoformat(), pk], salt=self.delta_salt)
+            response['X-Export-Watermark'] = value.isoformat()
+        return response
+
+
+class ExcelExportBaseView(ExportDeltaMixin, ExportColumnsMixin, ExportFormatMixin, View):
+    '''
+    Excel出力の基底クラス
+    - openpyxl の書き込み専用モードで1行ずつ追記し、シート全体をメモリに保持しない
+    - データはサーバーサイドカーソル（iterator）で chunk_size 件ずつ取得
+    - 一時ファイルに書き出して FileResponse で返却
+    - format パラメータ指定時は指定形式でストリーミング出力（ExportFormatMixin）
+    '''
     model_class = None  # 出力対象のモデルクラス
     filename_prefix = 'export'  # サブクラスで指定
-    headers: list[str] = []  # 出力ヘッダ定義
+    chunk_size = settings.EXPORT_CHUNK_SIZE  # 1回あたりの取得件数
+    file_extension = 'xlsx'  # 出力ファイルの拡張子
+    is_background = False  # バックグラウンドのエクスポートジョブで実行中か
 
     def get(self, request, *args, **kwargs):
-        # ファイル名設定
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        file_name = f'{self.filename_prefix}_{timestamp}.xlsx'
+        # 出力形式・差分出力の基準チェック
+        try:
+            export_format, _ = self.export_options
+            self.delta_since
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
         # データ取得
-        data = self.get_queryset(request).filter(is_deleted=False, tenant=request.user.tenant)
+        data = self.get_export_data(request)
+        if export_format:
+            return self.set_delta_headers(self.format_response(data))
+
+        # 一時ファイルに書き出し（レスポンス送信後に自動削除）
+        spool = tempfile.TemporaryFile(suffix='.xlsx')
+        self.write_file(data, spool)
+        spool.seek(0)
+
+        # レスポンス作成
+        return self.set_delta_headers(FileResponse(
+            spool,
+            as_attachment=True,
+            filename=self.get_file_name(),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        ))
+
+    def get_export_data(self, request):
+        '''出力対象のクエリセット（所属テナント限定、差分出力時は差分のみ）'''
+        return self.project(self.apply_delta(self.get_queryset(request).filter(tenant=request.user.tenant)))
 
-        # Workbook 作成
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = 'data'
+    def write_file(self, data, file, progress=None):
+        '''
+        書き込み専用モードのWorkbookにヘッダとデータ行を追記して保存
+        - progress: chunk_size 件ごとに出力済み件数を受け取るコールバック（任意）
+        '''
+        if self.export_options[0]:
+            for chunk in self.stream_format(data, progress=progress):
+                file.write(chunk)
+            return
+
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(title='data')
 
         # ヘッダ書き込み
-        for col, header in enumerate(self.headers, start=1):
-            ws.cell(row=1, column=col, value=header)
+        ws.append(self.get_headers())
 
         # データ書き込み
-        for row_idx, rec in enumerate(data, start=2):
-            values = self.row(rec)
-            for col_idx, val in enumerate(values, start=1):
-                ws.cell(row=row_idx, column=col_idx, value=val)
-
-        # レスポンス作成
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f"attachment; filename*=UTF-8''{file_name}"
+        for row in self.iter_rows(data, progress=progress):
+            ws.append(row)
 
-        wb.save(response)
-        return response
+        wb.save(file)
 
     def get_queryset(self, request):
-        return self.model_class.objects.all()
+        return self.get_base_queryset(request)
 
-    def row(self, rec):
-        raise NotImplementedError('サブクラスで row() を実装してください')
 
-
-class CSVExportBaseView(View):
+class CSVExportBaseView(ExportDeltaMixin, ExportColumnsMixin, ExportFormatMixin, View):
+    '''
+    CSV出力の基底クラス
+    - StreamingHttpResponse で chunk_size 行ごとに送信し、出力件数に関わらずメモリ使用量を一定に保つ
+    - データはサーバーサイドカーソル（iterator）で chunk_size 件ずつ取得
+    - PostgreSQL かつ columns 指定時は COPY ... TO STDOUT でDB側にCSVを生成させる（can_copy）
+    - COPY でもPythonでの書き出しと同じバイト列を出力（改行コード・空欄・値の書式を揃える）
+    - format / compress パラメータ指定時は指定形式でストリーミング出力（ExportFormatMixin）
+    '''
     model_class = None  # 出力対象のモデルクラス
     filename_prefix = 'export'  # サブクラスで指定
-    headers: list[str] = []  # 出力ヘッダ定義
+    chunk_size = settings.EXPORT_CHUNK_SIZE  # 1回あたりの取得・送信行数
+    file_extension = 'csv'  # 出力ファイルの拡張子
+    is_background = False  # バックグラウンドのエクスポートジョブで実行中か
+    use_copy = True  # COPY を使用するか（False の場合は常にPythonで書き出し）
+    # COPY で ::text に変換した値が str() と一致する型（DateTimeField 等はタイムゾーン・小数秒の書式が異なるため対象外）
+    copy_text_fields = (models.CharField, models.TextField, models.IntegerField, models.DecimalField, models.DateField)
 
     def get(self, request, *args, **kwargs):
-        # ファイル名設定
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        file_name = f'{self.filename_prefix}_{timestamp}.csv'
+        # 出力形式・差分出力の基準チェック
+        try:
+            export_format, _ = self.export_options
+            self.delta_since
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
         # データ取得
-        data = self.get_queryset(request)
+        data = self.get_export_data(request)
+        if export_format:
+            return self.set_delta_headers(self.format_response(data))
 
-        # レスポンス準備
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f"attachment; filename*=UTF-8''{file_name}"
+        # レスポンス準備（ストリーミング）
+        chunks = self.copy_stream(data) if self.can_copy(data) else self.stream(data)
+        response = StreamingHttpResponse(chunks, content_type='text/csv')
+        response['Content-Disposition'] = f"attachment; filename*=UTF-8''{self.get_file_name()}"
+        return self.set_delta_headers(response)
 
-        writer = csv.writer(response)
+    def get_export_data(self, request):
+        '''出力対象のクエリセット（差分出力時は差分のみ）'''
+        return self.project(self.apply_delta(self.get_queryset(request)))
 
-        # ヘッダ出力
-        writer.writerow(self.headers)
+    def stream(self, data, progress=None):
+        '''
+        CSVを chunk_size 行ごとにまとめて返すジェネレータ
+        - progress: chunk_size 件ごとに出力済み件数を受け取るコールバック（任意）
+        '''
+        return CSVFormat(self.get_headers(), self.chunk_size).chunks(self.iter_rows(data, progress))
 
-        # データ出力
-        for rec in data:
-            writer.writerow(self.row(rec))
+    def copy_column(self, name, output_field):
+        '''
+        COPY で出力する列の式（Pythonでの書き出しと同じ文字列にできない型は None）
+        - 空文字は COPY では "" となるため、Pythonでの書き出しと同じく空欄で出力するよう NULL に変換
+        - 真偽値は str() と同じ True / False に変換
+        '''
+        column = f'"{name}"'
+        if isinstance(output_field, models.BooleanField):
+            return f"CASE WHEN {column} THEN 'True' WHEN NOT {column} THEN 'False' END"
+        if isinstance(output_field, models.DateTimeField) or not isinstance(output_field, self.copy_text_fields):
+            return None
+        return f"NULLIF({column}::text, '')"
 
-        return response
+    def copy_columns(self, data):
+        '''列定義の列ごとの COPY の式（DISTINCT 時の並び替え列など、SELECT句に追加される列は含めない）'''
+        return [self.copy_column(f'col_{idx}', field) for idx, field in enumerate(self.get_output_fields(data))]
+
+    def can_copy(self, data):
+        '''COPY で出力可能か（PostgreSQL かつ columns 指定で values_list に変換済み、全列が copy_column で変換可能）'''
+        return (
+            self.use_copy and bool(self.columns) and connections[data.db].vendor == 'postgresql'
+            and None not in self.copy_columns(data)
+        )
+
+    def copy_header(self):
+        '''ヘッダ行（日本語の列名を使うため、COPY の HEADER オプションではなくPythonで出力）'''
+        writer = csv.writer(EchoBuffer(), lineterminator=CSVFormat.lineterminator)
+        return writer.writerow(self.get_headers()).encode('utf-8')
+
+    def copy_command(self, data):
+        '''
+        (psycopg2 の接続, COPY 文) を返す
+        - リクエストのスレッドで呼び出し、COPY の実行は別スレッドからでも行えるよう Django の接続ラッパーではなく psycopg2 の接続を返す
+        '''
+        connection = connections[data.db]
+        sql, params = data.query.sql_with_params()
+        with connection.cursor() as cursor:
+            query = cursor.mogrify(sql, params).decode('utf-8')
+        columns = ', '.join(self.copy_columns(data))
+        return connection.connection, f'COPY (SELECT {columns} FROM ({query}) AS export) TO STDOUT WITH (FORMAT csv)'
+
+    def copy_rows(self, connection, sql, file, progress=None):
+        '''COPY 文を実行してデータ行を chunk_size 行ごとにファイルに書き出し、出力件数を返す'''
+        writer = CopyOutputWriter(file, self.chunk_size, CSVFormat.lineterminator, progress)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(sql, writer)
+        writer.flush()
+        return writer.count
+
+    def copy_to(self, data, file, progress=None):
+        '''
+        クエリセットを COPY (SELECT ...) TO STDOUT でCSVとしてファイルに書き出し、出力件数を返す
+        - progress: chunk_size 件ごとに出力済み件数を受け取るコールバック（任意）
+        '''
+        connection, sql = self.copy_command(data)
+        file.write(self.copy_header())
+        return self.copy_rows(connection, sql, file, progress)
+
+    def copy_stream(self, data):
+        '''
+        COPY の出力を chunk_size 行ごとに返すジェネレータ（画面からのストリーミング出力用）
+        - psycopg2 の copy_expert は完了まで戻らないため別スレッドで実行し、有界キュー（CopyQueue）で受け取る
+        - 接続はリクエストと共有（COPY の完了まで、このジェネレータ以外から接続は使用されない）
+        - 途中で閉じられた場合（クライアントの切断等）は COPY をキャンセルし、スレッドの終了を待つ
+        '''
+        connection, sql = self.copy_command(data)
+        header = self.copy_header()
+        chunks = CopyQueue()
+        done = object()
+        errors = []
+
+        def run():
+            try:
+                self.copy_rows(connection, sql, chunks)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                chunks.queue.put(done)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        finished = False
+        try:
+            while (chunk := chunks.queue.get()) is not done:
+                yield header + chunk
+                header = b''
+            finished = True
+            if errors:
+                raise errors[0]
+            if header:
+                yield header
+        finally:
+            if not finished:
+                chunks.cancel()
+                connection.cancel()
+                while chunks.queue.get() is not done:
+                    pass
+            thread.join()
+
+    def write_file(self, data, file, progress=None):
+        '''CSVをファイルに書き出し（バックグラウンド出力用）'''
+        if self.export_options[0]:
+            for chunk in self.stream_format(data, progress=progress):
+                file.write(chunk)
+            return
+
+        if self.can_copy(data):
+            count = self.copy_to(data, file, progress=progress)
+            if progress:
+                progress(count)
+            return
+
+        for chunk in self.stream(data, progress=progress):
+            file.write(chunk)
 
     def get_queryset(self, request):
         '''サブクラスで必要に応じてフィルタリングを行う'''
-        return self.model_class.objects.filter(is_deleted=False, tenant=request.user.tenant)
+        return self.get_base_queryset(request)
 
-    def row(self, rec):
-        '''サブクラスで1行分のリストを返す'''
-        raise NotImplementedError('サブクラスで row() を実装してください')
 
+class ImportLookup:
+    '''
+    CSVインポート単位の名称→レコード解決キャッシュ
+    - ファイル内の名称をまとめて1回の IN クエリで取得し、行ごとの解決は辞書から返す
+    - queryset: テナント等で絞り込んだ検索対象、field: 名称の項目
+    '''
+    def __init__(self, queryset, field, names):
+        names = {name for name in names if name}
+        self.records = {}
+        if names:
+            for obj in queryset.filter(**{f'{field}__in': names}).order_by('pk'):
+                self.records.setdefault(getattr(obj, field), obj)
+
+    @staticmethod
+    def split(value):
+        '''カンマ区切りの名称をリストに変換'''
+        return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+    def get(self, name):
+        '''名称に一致するレコード（存在しない場合は None）'''
+        return self.records.get(name)
+
+    def get_many(self, names):
+        '''名称に一致するレコードのリスト（存在しない名称は無視）'''
+        return [self.records[name] for name in names if name in self.records]
+
+
+# 列単位の検証結果（instance: 検証を通過した行の未保存オブジェクト、エラーのある行は None）
+ColumnResult = namedtuple('ColumnResult', ['instance', 'cleaned_data', 'errors'])
+
+
+class ColumnValidator:
+    '''
+    CSVインポート用：ModelForm と同じ検証を行単位ではなく列単位で行う
+    - フォームは1回だけ生成し、項目ごとに列の値を重複除去して clean() を1回ずつ実行
+      （正規表現・文字数・選択肢の検証、Decimal の変換は同じ値につき1回）
+    - 関連先（ModelChoiceField / ModelMultipleChoiceField）は解決済みのオブジェクトを受け取り、必須チェックのみ行う
+    - clean_<項目名>()・モデルの clean() / 制約は1行ずつ、一意チェック（unique=True 等）は項目ごとに1回のクエリで行う
+    - フォームの clean() は実行しない（テナント指定時の重複チェック等のため、インポートでは各ビューで判定）
+    - エラーの内容・順序は ModelForm の errors と同じ
+    '''
+    def __init__(self, form_class, **form_kwargs):
+        self.form = form_class(**form_kwargs)
+        self.model = form_class._meta.model
+        self.form_fields = [
+            field for field in self.model._meta.fields if field.name in self.form.fields and field.editable
+            and not isinstance(field, (models.AutoField, models.FileField))
+        ]
+        excluded = {field.name for field in self.model._meta.fields if field.name not in self.form.fields}
+        self.unique_checks = self.model()._get_unique_checks(exclude=excluded)[0]
+
+    def validate(self, rows, instances=None):
+        '''
+        行データのリストを検証し、行ごとの ColumnResult を返す
+        - rows: フォームに渡す値の辞書のリスト（関連先の項目は解決済みのオブジェクト、複数はリスト）
+        - instances: 行ごとの登録済みデータ（ModelForm の instance 相当、一意チェックで自身を除く）
+        - errors: {項目名: [メッセージ, ...]}（エラーなしは空の辞書）
+        '''
+        instances = instances or [None] * len(rows)
+        cleaned = [{} for _ in rows]
+        errors = [{} for _ in rows]
+
+        # ----------------------------------------------------------------
+        # フォーム項目：列ごとに検証
+        # ----------------------------------------------------------------
+        for name, field in self.form.fields.items():
+            column = [field.widget.value_from_datadict(row, {}, name) for row in rows]
+            if isinstance(field, forms.ModelChoiceField):
+                results = [self.clean_relation(field, value) for value in column]
+            else:
+                results = self.clean_column(field, column)
+
+            hook = getattr(self.form, f'clean_{name}', None)
+            for data, row_errors, (value, messages) in zip(cleaned, errors, results):
+                if messages is None and hook:
+                    data[name] = value
+                    self.form.cleaned_data = data
+                    try:
+                        value = hook()
+                    except ValidationError as e:
+                        messages = e.messages
+                if messages is None:
+                    data[name] = value
+                else:
+                    data.pop(name, None)
+                    row_errors[name] = list(messages)
+
+        # ----------------------------------------------------------------
+        # モデル：オブジェクトを作成して項目・clean()・制約を検証
+        # ----------------------------------------------------------------
+        cache = {}
+        objects = []
+        for row, data, row_errors in zip(rows, cleaned, errors):
+            obj = self.construct_instance(row, data)
+            model_errors = self.clean_model(obj, data, row_errors, cache)
+            self.update_errors(data, row_errors, model_errors)
+            objects.append(obj)
+
+        # ----------------------------------------------------------------
+        # 一意チェック：チャンク内の値をまとめて1回で検索
+        # ----------------------------------------------------------------
+        exclusions = [self.get_exclusions(data, row_errors) for data, row_errors in zip(cleaned, errors)]
+        for model_class, unique_check in self.unique_checks:
+            self.check_unique(model_class, unique_check, objects, exclusions, instances, cleaned, errors)
+
+        results = []
+        for obj, data, row_errors in zip(objects, cleaned, errors):
+            if row_errors:
+                results.append(ColumnResult(None, data, row_errors))
+                continue
+            obj._m2m_data = {
+                field.name: data[field.name] for field in self.model._meta.many_to_many if field.name in data
+            }
+            results.append(ColumnResult(obj, data, row_errors))
+        return results
+
+    def clean_column(self, field, column):
+        '''列の値をフォーム項目の clean() で検証し、行ごとに (値, エラーメッセージ or None) を返す（同じ値は1回のみ検証）'''
+        results = {}
+        for value in set(column):
+            try:
+                results[value] = (field.clean(value), None)
+            except ValidationError as e:
+                results[value] = (None, e.messages)
+        return [results[value] for value in column]
+
+    def clean_relation(self, field, value):
+        '''解決済みの関連先の必須チェック（存在確認は名称の解決時に済んでいるためクエリは発行しない）'''
+        if value in field.empty_values:
+            if field.required:
+                return None, [field.error_messages['required']]
+            return ([] if isinstance(field, forms.ModelMultipleChoiceField) else None), None
+        return value, None
+
+    def construct_instance(self, row, data):
+        '''cleaned_data からオブジェクトを作成（django.forms.models.construct_instance と同じ項目の扱い）'''
+        obj = self.model()
+        for field in self.form_fields:
+            if field.name not in data:
+                continue
+            form_field = self.form.fields[field.name]
+            if (
+                field.has_default()
+                and form_field.widget.value_omitted_from_data(row, {}, field.name)
+                and data[field.name] in form_field.empty_values
+            ):
+                continue
+            field.save_form_data(obj, data[field.name])
+        return obj
+
+    def get_exclusions(self, data, row_errors):
+        '''モデルの検証から除く項目（ModelForm._get_validation_exclusions と同じ判定）'''
+        exclude = set()
+        for field in self.model._meta.fields:
+            form_field = self.form.fields.get(field.name)
+            if form_field is None or field.name in row_errors:
+                exclude.add(field.name)
+            elif (
+                not field.blank and not form_field.required
+                and data.get(field.name) in form_field.empty_values
+            ):
+                exclude.add(field.name)
+        return exclude
+
+    def clean_model(self, obj, data, row_errors, cache):
+        '''
+        モデルの full_clean(validate_unique=False) 相当の検証を行い、{項目名: [ValidationError, ...]} を返す
+        - 項目の clean() は同じ値につき1回（cache）、関連先は解決済みのため存在確認をしない
+        '''
+        exclude = self.get_exclusions(data, row_errors)
+        model_errors = {}
+        for field in self.model._meta.fields:
+            if field.name in exclude or field.is_relation:
+                continue
+            raw_value = getattr(obj, field.attname)
+            if field.blank and raw_value in field.empty_values:
+                continue
+            key = (field.name, raw_value)
+            if key not in cache:
+                try:
+                    cache[key] = (field.clean(raw_value, obj), None)
+                except ValidationError as e:
+                    cache[key] = (None, e.error_list)
+            value, error_list = cache[key]
+            if error_list is None:
+                setattr(obj, field.attname, value)
+            else:
+                model_errors[field.name] = list(error_list)
+
+        try:
+            obj.clean()
+        except ValidationError as e:
+            model_errors = e.update_error_dict(model_errors)
+
+        exclude.update(name for name in model_errors if name != NON_FIELD_ERRORS)
+        try:
+            obj.validate_constraints(exclude=exclude)
+        except ValidationError as e:
+            model_errors = e.update_error_dict(model_errors)
+        return model_errors
+
+    def update_errors(self, data, row_errors, model_errors):
+        '''モデルのエラーをフォームのメッセージで置き換えて追加（ModelForm._update_errors と同じ）'''
+        for name, error_list in model_errors.items():
+            error_messages = self.form.fields[name].error_messages if name in self.form.fields else {}
+            messages = []
+            for error in error_list:
+                if isinstance(error, ValidationError) and error.code in error_messages:
+                    error = ValidationError(error_messages[error.code], code=error.code, params=error.params)
+                messages.extend(ValidationError(error).messages)
+            row_errors.setdefault(name, []).extend(messages)
+            data.pop(name, None)
+
+    def check_unique(self, model_class, unique_check, objects, exclusions, instances, cleaned, errors):
+        '''
+        一意チェック（Model._perform_unique_checks 相当）をチャンク内の値でまとめて1回のクエリで行う
+        - 検証から除く項目（exclusions：エラーのある項目等）・値が None の項目を含む行は対象外
+        - 登録済みデータ（instances）と同じレコードは重複としない
+        '''
+        fields = [model_class._meta.get_field(name) for name in unique_check]
+        targets = defaultdict(list)
+        for i, (obj, exclude) in enumerate(zip(objects, exclusions)):
+            if exclude.intersection(unique_check):
+                continue
+            values = tuple(getattr(obj, field.attname) for field in fields)
+            if None in values:
+                continue
+            targets[values].append(i)
+        if not targets:
+            return
+
+        if len(fields) == 1:
+            condition = Q(**{f'{fields[0].attname}__in': [values[0] for values in targets]})
+        else:
+            condition = functools.reduce(operator.or_, (
+                Q(**{field.attname: value for field, value in zip(fields, values)}) for values in targets
+            ))
+        found = defaultdict(set)
+        for *values, pk in model_class._default_manager.filter(condition).values_list(
+            *[field.attname for field in fields], 'pk'
+        ):
+            found[tuple(values)].add(pk)
+
+        key = unique_check[0] if len(unique_check) == 1 else NON_FIELD_ERRORS
+        for values, indexes in targets.items():
+            for i in indexes:
+                instance = instances[i]
+                if found.get(values, set()) - {instance.pk if instance is not None else None}:
+                    error = objects[i].unique_error_message(model_class, unique_check)
+                    self.update_errors(cleaned[i], errors[i], {key: [error]})
+
+
+#--------------------------
+# CSVインポート（ステージングテーブル経由）
+#--------------------------
+# 文字数の検証メッセージに実際の文字数をSQLで埋め込むための仮の値
+LENGTH_PLACEHOLDER = 987654321
+# 検証式の中で値の式に置き換える目印
+VALUE_PLACEHOLDER = '@@value@@'
+
+
+@functools.cache
+def strip_characters():
+    '''str.strip() が除去する空白文字（SQL の btrim で同じ文字を除去するために使用）'''
+    return ''.join(c for c in map(chr, range(sys.maxunicode + 1)) if c.isspace())
+
+
+class StagingImportMixin():
+    '''
+    ステージングテーブル経由のCSVインポート（大きなファイル用）
+    - 行データを COPY で一時テーブルに投入し、検証を集合演算（SQL）で行って INSERT ... SELECT で一括登録
+    - 検証内容・エラーメッセージは staging_form_class（ModelForm）から生成し、validate_row と同じ結果を返す
+      - 文字列（検証が文字数のみの項目）：必須・文字数をSQLで検証
+      - 上記以外（正規表現・選択肢・数値・メールアドレス等）：列の値を重複除去してからフォーム項目の clean() で検証
+        （ColumnValidator と同じ処理。正規表現は PostgreSQL と Python で \\d 等の意味が異なるためSQLでは検証しない）
+      - 関連先（get_staging_references）：名称で解決し、存在しない場合はその行はそのエラーのみ
+      - 重複（unique_field）：ファイル内・登録済みデータとの重複をフォームの検証を通った行で判定
+    - フォームの clean()（テナントを前提とした重複チェック等）はインポート時と同様に対象外
+    '''
+    staging_form_class = None
+    staging_threshold = settings.IMPORT_STAGING_THRESHOLD  # この大きさ（バイト）以上のファイルをステージング取込
+    staging_duplicate_message = ''  # 重複時のメッセージ（{項目名} に行の値を埋め込み）
+    staging_clean_validators = {}  # モデルの clean() の検証を文字数のバリデータで表したもの {項目名: [バリデータ, ...]}
+
+    def can_stage(self, file):
+        '''ステージング取込を行うか（PostgreSQL かつ staging_form_class 指定・新規登録モード・閾値以上のファイル）'''
+        db = router.db_for_write(self.model_class)
+        return (
+            self.staging_form_class is not None
+            and self.import_mode == 'insert'
+            and file.size >= self.staging_threshold
+            and connections[db].vendor == 'postgresql'
+        )
+
+    def get_staging_references(self, request):
+        '''
+        名称で解決する関連先 {項目名: (クエリセット, 名称の項目, 存在しない場合のメッセージ)}
+        - メッセージの {value} には行の値を埋め込む
+        '''
+        return {}
+
+    def stage_import(self, rows, request):
+        '''
+        ステージングテーブル経由で取込を行い、通常の取込と同じ形式のレスポンスを返す
+        - rows: (行番号, 英語キーの行データ) のイテレータ
+        - エラーが1件でもあれば登録しない
+        '''
+        db = router.db_for_write(self.model_class)
+        with transaction.atomic(using=db):
+            ids, errors = self.stage_rows(rows, request)
+            if errors:
+                transaction.set_rollback(True, using=db)
+                return JsonResponse({'error': 'CSVに問題があります。', 'details': errors}, status=400)
+        return JsonResponse({'message': f'{len(ids)}件をインポートしました。'})
+
+    def stage_rows(self, rows, request, skip_errors=False):
+        '''
+        ステージングテーブル経由で行を検証・登録し、(登録した主キーのリスト, エラーメッセージのリスト) を返す
+        - 呼び出し側のトランザクション内で実行（一時テーブルはコミット時に削除）
+        - skip_errors: エラーのない行だけを登録する（インポートジョブ用）。False の場合はエラーがあれば何も登録しない
+        '''
+        model = self.model_class
+        validator = ColumnValidator(self.staging_form_class)
+        form = validator.form
+        names = list(form.fields)
+        references = self.get_staging_references(request)
+        db = router.db_for_write(model)
+        qn = connections[db].ops.quote_name
+
+        with connections[db].cursor() as cursor:
+            literal = lambda value: cursor.mogrify('%s', [value]).decode('utf-8')
+
+            # 行データを一時テーブルに投入（値はすべて文字列のまま）
+            columns = ', '.join(qn(name) for name in names)
+            cursor.execute(
+                'CREATE TEMPORARY TABLE import_staging (idx integer PRIMARY KEY, '
+                + ', '.join(f'{qn(name)} text' for name in names)
+                + ') ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                f'COPY import_staging (idx, {columns}) FROM STDIN WITH (FORMAT csv)',
+                CopyRowStream([idx, *[row.get(name) or '' for name in names]] for idx, row in rows),
+            )
 
-class CSVImportBaseView(View):
+            # SQLで検証できない項目は列の値を重複除去して検証
+            cursor.execute(
+                'CREATE TEMPORARY TABLE import_staging_value '
+                '(field text, raw text, cleaned text, form_error text, model_error text) ON COMMIT DROP'
+            )
+            # （COPY 中は同じ接続で検索できないため、検証結果を先に作成）
+            plan = self.staging_plan(form, references, literal, qn)
+            values = list(self.clean_staging_values(cursor, validator, plan['python_fields'], qn))
+            cursor.copy_expert('COPY import_staging_value FROM STDIN WITH (FORMAT csv)', CopyRowStream(values))
+
+            # 行ごとのエラー（関連先 → フォーム → 重複の順に最初の1件）と登録値を算出
+            cursor.execute(self.staging_check_sql(plan, request, literal, qn))
+
+            cursor.execute(
+                "SELECT idx::text || '行目: ' || error FROM import_checked WHERE error IS NOT NULL ORDER BY idx"
+            )
+            errors = [error for error, in cursor.fetchall()]
+            if errors and not skip_errors:
+                return [], errors
+
+            ids = self.staging_insert(cursor, plan, request, literal, qn)
+
+        # 検索インデックス等の後続処理
+        for start in range(0, len(ids), self.batch_size):
+            objects = model.objects.filter(pk__in=ids[start:start + self.batch_size])
+            bulk_created.send(sender=model, instances=list(objects.select_related(*references).order_by('pk')))
+        return ids, errors
+
+    # ------------------------------------------------------------
+    # 検証SQLの組み立て
+    # ------------------------------------------------------------
+    def staging_plan(self, form, references, literal, qn):
+        '''
+        フォーム項目ごとの検証式・登録値の式を組み立てる
+        - form_errors / model_errors: 「ラベル: メッセージ」または NULL を返す式（フォームの errors と同じ順）
+        - reference_errors: 関連先が存在しない場合のメッセージまたは NULL を返す式
+        - python_fields: 値の重複除去後に clean() で検証する項目（文字数以外の検証がある項目・文字列以外の項目）
+        '''
+        plan = {
+            'form_errors': [], 'model_errors': [], 'clean_errors': [], 'reference_errors': [],
+            'cleaned': {}, 'joins': [], 'python_fields': [],
+        }
+        for name, field in form.fields.items():
+            model_field = self.model_class._meta.get_field(name)
+            label = f"{literal(str(self._field_label(form, name)))} || ': ' || "
+            raw = f's.{qn(name)}'
+            required = literal(str(field.error_messages['required']))
+
+            if name in references:
+                # 関連先：名称で解決（同名が複数ある場合は主キーの小さい方）
+                queryset, name_field, message = references[name]
+                sql, params = (
+                    queryset.order_by().values(ref_name=models.F(name_field))
+                    .annotate(ref_id=models.Min('pk')).query.sql_with_params()
+                )
+                alias = f'ref_{len(plan["joins"])}'
+                plan['joins'].append(
+                    f"LEFT JOIN ({cursor_sql(literal, sql, params)}) AS {alias} ON {alias}.ref_name = {raw}"
+                )
+                plan['reference_errors'].append(
+                    f"CASE WHEN {raw} <> '' AND {alias}.ref_id IS NULL "
+                    f"THEN replace({literal(message)}, '{{value}}', {raw}) END"
+                )
+                if field.required:
+                    plan['form_errors'].append(f"CASE WHEN {raw} = '' THEN {label}{required} END")
+                plan['cleaned'][name] = f'{alias}.ref_id'
+                continue
+
+            clean_checks = self.staging_validator_checks(self.staging_clean_validators.get(name, []), literal)
+            if clean_checks is None:
+                raise ImproperlyConfigured(f'{name} の staging_clean_validators は文字数のバリデータのみ指定できます。')
+            checks = model_checks = None
+            if type(field) is forms.CharField:
+                extra = [v for v in model_field.validators if type(v) not in {type(fv) for fv in field.validators}]
+                checks = self.staging_validator_checks(field.validators, literal)
+                model_checks = self.staging_validator_checks(extra, literal)
+            if checks is None or model_checks is None:
+                # SQLで検証しない項目（正規表現・選択肢・数値・メールアドレス等）
+                if clean_checks:
+                    raise ImproperlyConfigured(f'{name} の staging_clean_validators はSQLで検証する項目のみ指定できます。')
+                alias = f'value_{len(plan["python_fields"])}'
+                plan['python_fields'].append(name)
+                plan['joins'].append(
+                    f'LEFT JOIN import_staging_value AS {alias} '
+                    f'ON {alias}.field = {literal(name)} AND {alias}.raw = {raw}'
+                )
+                plan['form_errors'].append(f'{label}{alias}.form_error')
+                plan['model_errors'].append(f'{label}{alias}.model_error')
+                plan['cleaned'][name] = f'{alias}.cleaned'
+                continue
+
+            value = f'btrim({raw}, {literal(strip_characters())})' if field.strip else raw
+            empty = f"{value} = ''"
+            form_error = (
+                f"CASE WHEN {empty} THEN {required if field.required else 'NULL'} "
+                f"ELSE NULLIF(concat_ws(', ', {', '.join(c.replace(VALUE_PLACEHOLDER, value) for c in checks) or 'NULL'}), '') END"
+            )
+            plan['form_errors'].append(f'{label}({form_error})')
+            if model_checks:
+                plan['model_errors'].append(
+                    f"CASE WHEN ({form_error}) IS NULL AND NOT {empty} "
+                    f"THEN {label}NULLIF(concat_ws(', ', {', '.join(c.replace(VALUE_PLACEHOLDER, value) for c in model_checks)}), '') END"
+                )
+            if clean_checks:
+                plan['clean_errors'].append(
+                    f"CASE WHEN ({form_error}) IS NULL AND NOT {empty} "
+                    f"THEN {label}NULLIF(concat_ws(', ', {', '.join(c.replace(VALUE_PLACEHOLDER, value) for c in clean_checks)}), '') END"
+                )
+            empty_value = getattr(field, 'empty_value', '')
+            empty_value = 'NULL' if empty_value is None else literal(empty_value)
+            plan['cleaned'][name] = f'CASE WHEN {empty} THEN {empty_value} ELSE {value} END'
+        return plan
+
+    def staging_validator_checks(self, validators, literal):
+        '''
+        文字数のバリデータをSQLの検証式（VALUE_PLACEHOLDER を値の式に置き換えて使用）に変換
+        - 文字数以外のバリデータ（正規表現等）がある場合は None（Pythonで検証）
+        '''
+        checks = []
+        for validator in validators:
+            if isinstance(validator, ProhibitNullCharactersValidator):
+                # NUL文字は COPY の時点で拒否される（DBエラー）ためSQLでは検証しない
+                continue
+            if isinstance(validator, (MaxLengthValidator, MinLengthValidator)):
+                operator = '>' if isinstance(validator, MaxLengthValidator) else '<'
+                message = literal(str(validator.message % {
+                    'limit_value': validator.limit_value, 'show_value': LENGTH_PLACEHOLDER, 'value': '',
+                }))
+                checks.append(
+                    f"CASE WHEN char_length({VALUE_PLACEHOLDER}) {operator} {int(validator.limit_value)} "
+                    f"THEN replace({message}, '{LENGTH_PLACEHOLDER}', char_length({VALUE_PLACEHOLDER})::text) END"
+                )
+            else:
+                return None
+        return checks
+
+    def clean_staging_values(self, cursor, validator, names, qn):
+        '''
+        SQLで検証しない項目の値を重複除去して検証し、(項目, 値, 登録値, フォームのエラー, モデルのエラー) を返す
+        - フォームの検証は ColumnValidator.clean_column（通常の取込と同じ）
+        - モデルのエラーはフォームの検証を通った値について、モデルの項目の clean() で判定（Model.clean_fields と同じ）
+        '''
+        for name in names:
+            field = validator.form.fields[name]
+            model_field = self.model_class._meta.get_field(name)
+            cursor.execute(f'SELECT DISTINCT {qn(name)} FROM import_staging')
+            raws = [raw for raw, in cursor.fetchall()]
+            for raw, (value, messages) in zip(raws, validator.clean_column(field, raws)):
+                if messages is not None:
+                    yield [name, raw, None, ', '.join(messages), None]
+                    continue
+
+                model_error = None
+                if not (model_field.blank and value in model_field.empty_values):
+                    try:
+                        model_field.clean(value, None)
+                    except ValidationError as e:
+                        model_error = ', '.join(e.messages)
+                yield [name, raw, None if value is None else str(value), None, model_error]
+
+    def staging_check_sql(self, plan, request, literal, qn):
+        '''
+        行ごとのエラーと登録値を一時テーブル import_checked に作成するSQL
+        - 重複はフォームの検証を通った行のうち、登録済みのデータまたはファイル内の前の行と一致するもの
+        '''
+        model = self.model_class
+        unique = self.unique_field if isinstance(self.unique_field, (list, tuple)) else (self.unique_field,)
+        keys = [name for name in unique if name != 'tenant_id']
+        exists = ' AND '.join(
+            f't.tenant_id = {literal(request.user.tenant_id)}' if name == 'tenant_id'
+            else f't.{qn(model._meta.get_field(name).column)} = checked.{qn("key_" + name)}'
+            for name in unique
+        )
+        duplicate_message = ' || '.join(
+            literal(part) if i % 2 == 0 else f'checked.{qn("key_" + part)}'
+            for i, part in enumerate(re.split(r'\{(\w+)\}', self.staging_duplicate_message))
+        )
+        reference_error = f"COALESCE({', '.join(plan['reference_errors'])})" if plan['reference_errors'] else 'NULL'
+        form_error = f"NULLIF(concat_ws('; ', {', '.join(plan['form_errors'] + plan['model_errors'] + plan['clean_errors'])}), '')"
+        selected = [f's.{qn(name)} AS {qn("key_" + name)}' for name in keys]
+        selected += [f'{expr} AS {qn("value_" + name)}' for name, expr in plan['cleaned'].items()]
+        valid = 'checked.reference_error IS NULL AND checked.form_error IS NULL'
+
+        return f'''
+            CREATE TEMPORARY TABLE import_checked ON COMMIT DROP AS
+            WITH checked AS (
+                SELECT s.idx, {reference_error} AS reference_error, {form_error} AS form_error, {', '.join(selected)}
+                FROM import_staging AS s
+                {' '.join(plan['joins'])}
+            )
+            SELECT checked.*, CASE
+                WHEN checked.reference_error IS NOT NULL THEN checked.reference_error
+                WHEN checked.form_error IS NOT NULL THEN checked.form_error
+                WHEN row_number() OVER (
+                    PARTITION BY {valid}, {', '.join(f'checked.{qn("key_" + name)}' for name in keys)}
+                    ORDER BY checked.idx
+                ) > 1
+                OR EXISTS (SELECT 1 FROM {qn(model._meta.db_table)} AS t WHERE {exists})
+                THEN {duplicate_message}
+            END AS error
+            FROM checked
+        '''
+
+    def staging_insert(self, cursor, plan, request, literal, qn):
+        '''
+        エラーのない行を INSERT ... SELECT で登録し、登録した主キーのリストを返す
+        - フォームにない項目は作成者・更新者・テナント・作成日時・更新日時、その他はモデルの既定値
+        '''
+        model = self.model_class
+        connection = cursor.db
+        now = timezone.now()
+        base_values = {
+            'tenant': request.user.tenant_id,
+            'create_user': request.user.pk,
+            'update_user': request.user.pk,
+            'created_at': now,
+            'updated_at': now,
+        }
+
+        columns, values = [], []
+        for field in model._meta.concrete_fields:
+            if field.primary_key or field.generated:
+                continue
+            if field.name in plan['cleaned']:
+                values.append(f'CAST({qn("value_" + field.name)} AS {field.cast_db_type(connection)})')
+            elif field.name in base_values:
+                values.append(literal(base_values[field.name]))
+            elif field.has_default():
+                values.append(literal(field.get_db_prep_save(field.get_default(), connection)))
+            elif field.null:
+                continue
+            else:
+                raise ImproperlyConfigured(f'{model.__name__}.{field.name} の登録値がありません。')
+            columns.append(qn(field.column))
+
+        cursor.execute(f'''
+            INSERT INTO {qn(model._meta.db_table)} ({', '.join(columns)})
+            SELECT {', '.join(values)} FROM import_checked WHERE error IS NULL ORDER BY idx
+            RETURNING {qn(model._meta.pk.column)}
+        ''')
+        return [pk for pk, in cursor.fetchall()]
+
+
+def cursor_sql(literal, sql, params):
+    '''パラメータを埋め込んだSQL（サブクエリとして他のSQLに組み込むため）'''
+    return sql % tuple(literal(param) for param in params)
+
+
+# インポートモード
+IMPORT_MODE_CHOICES = [
+    ('insert', '新規登録'),
+    ('upsert', '新規登録＋更新'),
+]
+
+# 文字コード判定：ASCII以外のバイト（ASCIIのみの範囲はUTF-8・cp932のどちらでも同じ内容になるため判定に使わない）
+NON_ASCII_BYTE = re.compile(rb'[\x80-\xff]')
+
+
+class CSVImportBaseView(StagingImportMixin, View):
     '''
     CSV Import機能の基底クラス（日本語・英語ヘッダ両対応）
     expected_headers: 日本語ヘッダのリスト
@@ -104,26 +1349,36 @@ class CSVImportBaseView(View):
     model_class = None
     unique_field = None
     HEADER_MAP = {}
+    batch_size = settings.IMPORT_BATCH_SIZE  # 一括登録の1回あたりの件数
+    import_job_enabled = True  # インポートジョブ（バックグラウンドでのチャンク単位の登録）の対象とするか
+    upsert_unique_fields = None  # 更新モード（upsert）で登録済みデータとの一致を判定する項目（モデルの一意制約と同じ項目）
+    import_mode = 'insert'  # インポートモード（IMPORT_MODE_CHOICES）
+    import_form_class = None  # 列単位の検証（ColumnValidator）に使うフォーム（validate_row からは self.validated[行番号] で参照）
+    encoding_sample_size = 64 * 1024  # 文字コード判定に使うバイト数（最初のASCII以外のバイトから）
 
     # ------------------------------------------------------------
     # 内部ユーティリティ：エラーを日本語ラベルに変換
     # ------------------------------------------------------------
-    def _format_errors_with_verbose_name(self, form):
+    def _format_errors_with_verbose_name(self, form, errors=None):
         '''
-        form.errors を日本語フィールド名付きに変換して返す
+        form.errors（errors 指定時は {項目名: [メッセージ, ...]}）を日本語フィールド名付きに変換して返す
         '''
         messages = []
-        for field, errs in form.errors.items():
-            try:
-                if hasattr(form.fields[field], 'label') and form.fields[field].label:
-                    label = form.fields[field].label
-                else:
-                    label = self.model_class._meta.get_field(field).verbose_name
-            except Exception:
-                label = field
-            messages.append(f"{label}: {', '.join(errs)}")
+        for field, errs in (form.errors if errors is None else errors).items():
+            messages.append(f"{self._field_label(form, field)}: {', '.join(errs)}")
         return messages
 
+    def _field_label(self, form, field):
+        '''
+        項目の日本語ラベル（フォームのラベル → モデルの verbose_name → 項目名の順）
+        '''
+        try:
+            if hasattr(form.fields[field], 'label') and form.fields[field].label:
+                return form.fields[field].label
+            return self.model_class._meta.get_field(field).verbose_name
+        except Exception:
+            return field
+
     # ------------------------------------------------------------
     # POST: CSVインポート処理
     # ------------------------------------------------------------
@@ -132,40 +1387,105 @@ class CSVImportBaseView(View):
         if not file:
             return JsonResponse({'error': 'ファイルが選択されていません'}, status=400)
 
+        error = self.check_file(file) or self.set_import_mode(request.POST.get('mode'))
+        if error:
+            return error
+
         # ------------------------------------------------------------
-        # 拡張子チェック
+        # CSV読み込み（ファイル全体は読み込まず、逐次デコード）
         # ------------------------------------------------------------
-        import os
-        filename = file.name
-        ext = os.path.splitext(filename)[1].lower()  # 拡張子を小文字で取得
-        if ext != '.csv':
-            return JsonResponse({'error': 'CSVファイル（.csv）のみアップロード可能です。'}, status=400)
+        reader = self.read_csv(file)
+        error = self.check_headers(reader)
+        if error:
+            return error
+        normalize = self.normalize_header
 
         # ------------------------------------------------------------
-        # ファイルサイズチェック
+        # 大きなファイルはステージングテーブル経由で取込
         # ------------------------------------------------------------
-        if file.size > settings.MAX_FILE_SIZE:
-            return JsonResponse({'error': 'ファイルサイズが上限を超えています。'}, status=400)
+        if self.can_stage(file):
+            try:
+                return self.stage_import(self.iter_rows(reader, normalize), request)
+            except UnicodeDecodeError:
+                return JsonResponse({'error': 'CSVファイルの文字コードを判別できません。'}, status=400)
+            except IntegrityError as e:
+                return JsonResponse({'error': '登録中にDBエラーが発生しました。', 'details': [str(e)]}, status=500)
+
+        # ------------------------------------------------------------
+        # 重複チェックデータ準備
+        # ------------------------------------------------------------
+        existing = self.get_existing(request)
 
         # ------------------------------------------------------------
-        # CSV読み込み
+        # 行ごとのバリデーション・登録（batch_size 件ずつ）
+        # - ファイル全体を保持せず、チャンク単位で関連先の解決・検証・一括登録を行う
+        # - エラーが1件でもあれば以降は検証のみ行い、最後に登録済みのチャンクもロールバック
         # ------------------------------------------------------------
-        file_data = file.read()
+        counts, errors = Counter(), []
         try:
-            decoded_data = file_data.decode('utf-8-sig')
+            with transaction.atomic():
+                for chunk in self.iter_chunks(self.iter_rows(reader, normalize)):
+                    objects = self.validate_chunk(chunk, existing, request, errors)
+                    if not errors:
+                        counts.update(self.save_objects(objects))
+                if errors:
+                    transaction.set_rollback(True)
         except UnicodeDecodeError:
-            decoded_data = file_data.decode('cp932')
-
-        decoded_file = decoded_data.splitlines()
-        reader = csv.DictReader(decoded_file)
+            return JsonResponse({'error': 'CSVファイルの文字コードを判別できません。'}, status=400)
+        except IntegrityError as e:
+            return JsonResponse({'error': '登録中にDBエラーが発生しました。', 'details': [str(e)]}, status=500)
 
         # ------------------------------------------------------------
-        # ヘッダチェック
+        # エラーがあればJSONで返す
         # ------------------------------------------------------------
+        if errors:
+            return JsonResponse({'error': 'CSVに問題があります。', 'details': errors}, status=400)
+
+        if self.import_mode == 'upsert':
+            return JsonResponse({
+                'message': self.get_result_message(counts),
+                'inserted': counts['inserted'],
+                'updated': counts['updated'],
+                'unchanged': counts['unchanged'],
+            })
+        return JsonResponse({'message': self.get_result_message(counts)})
+
+    # ------------------------------------------------------------
+    # ファイル・ヘッダの検証
+    # ------------------------------------------------------------
+    def check_file(self, file):
+        '''
+        拡張子・ファイルサイズを検証し、問題があればエラーのレスポンスを返す
+        '''
+        # 拡張子チェック
+        ext = os.path.splitext(file.name)[1].lower()  # 拡張子を小文字で取得
+        if ext != '.csv':
+            return JsonResponse({'error': 'CSVファイル（.csv）のみアップロード可能です。'}, status=400)
+
+        # ファイルサイズチェック
+        if file.size > settings.MAX_FILE_SIZE:
+            return JsonResponse({'error': 'ファイルサイズが上限を超えています。'}, status=400)
+        return None
+
+    @staticmethod
+    def normalize_header(header):
+        '''ヘッダの比較用に前後の空白・全角空白を除去'''
+        return header.strip().replace('　', '')
+
+    def check_headers(self, reader):
+        '''
+        ヘッダ行を読み込んで検証し、問題があればエラーのレスポンスを返す
+        - 欠落・想定外・重複をチェック
+        '''
+        try:
+            reader.fieldnames  # ヘッダ行の読み込み（文字コード不正はここで検出）
+        except UnicodeDecodeError:
+            return JsonResponse({'error': 'CSVファイルの文字コードを判別できません。'}, status=400)
+
         if reader.fieldnames is None:
             return JsonResponse({'error': 'CSVにヘッダ行が存在しません。'}, status=400)
 
-        normalize = lambda x: x.strip().replace('　', '')
+        normalize = self.normalize_header
         normalized_actual = [normalize(h) for h in reader.fieldnames]
         normalized_expected = [normalize(h) for h in self.expected_headers]
         allowed_headers = [h for h in self.HEADER_MAP.keys() if h in normalized_expected]
@@ -200,19 +1520,77 @@ class CSVImportBaseView(View):
                 'error': 'CSVヘッダが重複しています。',
                 'details': f'重複: {duplicates}',
             }, status=400)
+        return None
 
-        # ------------------------------------------------------------
-        # 重複チェックデータ準備
-        # ------------------------------------------------------------
+    def set_import_mode(self, mode):
+        '''
+        インポートモードを設定し、不正な場合はエラーのレスポンスを返す
+        - 更新モード（upsert）は upsert_unique_fields を指定したビューのみ
+        '''
+        mode = mode or 'insert'
+        if mode not in dict(IMPORT_MODE_CHOICES) or (mode == 'upsert' and not self.upsert_unique_fields):
+            return JsonResponse({'error': 'インポートモードが不正です。'}, status=400)
+        self.import_mode = mode
+        return None
+
+    def get_existing(self, request):
+        '''
+        重複チェック用に登録済みの unique_field の値を集合で返す
+        - 更新モードでは自テナントのデータは更新対象のため含めない（他テナントと一意の項目のみ重複とする）
+        '''
+        queryset = self.model_class.objects.all()
+        if self.import_mode == 'upsert':
+            queryset = queryset.exclude(tenant=request.user.tenant)
         if isinstance(self.unique_field, (list, tuple)):
-            existing = set(self.model_class.objects.values_list(*self.unique_field))
-        else:
-            existing = set(self.model_class.objects.values_list(self.unique_field, flat=True))
+            return set(queryset.values_list(*self.unique_field))
+        return set(queryset.values_list(self.unique_field, flat=True))
 
-        # ------------------------------------------------------------
-        # 行ごとのバリデーション
-        # ------------------------------------------------------------
-        objects_to_create, errors = [], []
+    def get_result_message(self, counts):
+        '''登録結果のメッセージ（counts: save_objects の件数の合計）'''
+        if self.import_mode == 'upsert':
+            return (
+                f"{counts['inserted']}件を登録、{counts['updated']}件を更新しました。"
+                f"（変更なし {counts['unchanged']}件）"
+            )
+        return f"{counts['inserted']}件をインポートしました。"
+
+    # ------------------------------------------------------------
+    # CSV読み込み
+    # ------------------------------------------------------------
+    def read_csv(self, file):
+        '''
+        アップロードファイルを逐次読み込む csv.DictReader を返す
+        - 行末の改行を除いて渡す（従来の splitlines() と同様、セル内の改行は連結される）
+        '''
+        return csv.DictReader(line.rstrip('\n') for line in self.open_csv(file))
+
+    def open_csv(self, file):
+        '''
+        アップロードファイルを逐次デコードするテキストストリームとして開く
+        - 文字コードは最初のASCII以外のバイトから encoding_sample_size バイトで判定（UTF-8（BOM付き可）として読めなければ cp932）
+          （先頭がASCIIのみの行で占められていても、日本語を含む最初の行で判定する）
+        - デコードは TextIOWrapper の読み込み単位で行い、ファイル全体をメモリに展開しない
+        '''
+        file.seek(0)
+        encoding = 'utf-8-sig'
+        while block := file.read(self.encoding_sample_size):
+            match = NON_ASCII_BYTE.search(block)
+            if match is None:
+                continue
+            sample = block[match.start():] + file.read(match.start())
+            try:
+                # 末尾で途中まで読んだ文字はエラーにしない（final=False）
+                codecs.getincrementaldecoder('utf-8')().decode(sample)
+            except UnicodeDecodeError:
+                encoding = 'cp932'
+            break
+        file.seek(0)
+        return io.TextIOWrapper(file.file, encoding=encoding)
+
+    def iter_rows(self, reader, normalize):
+        '''
+        CSVの行を英語キーに変換し、(行番号, 行データ) で返す
+        '''
         for idx, row in enumerate(reader, start=2):
             normalized_row = {}
             for key, value in row.items():
@@ -227,7 +1605,32 @@ class CSVImportBaseView(View):
                     normalized_row[key_norm] = value
                 else:
                     continue
+            yield idx, normalized_row
+
+    def iter_chunks(self, rows):
+        '''
+        iter_rows の行を batch_size 件ずつ [(行番号, 行データ), ...] で返す
+        '''
+        chunk = []
+        for item in rows:
+            chunk.append(item)
 
+            if len(chunk) >= self.batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def validate_chunk(self, chunk, existing, request, errors):
+        '''
+        チャンク内の関連先をまとめて解決してから1行ずつ検証し、登録対象のオブジェクトを返す
+        - エラーは errors に追加
+        '''
+        self.lookups = self.get_lookups([row for _, row in chunk], request)
+        self.validated = self.validate_columns(chunk) if self.import_form_class else {}
+
+        objects = []
+        for idx, normalized_row in chunk:
             # --------------------------------------------------------
             # 各行ごとに validate_row() 実行
             # --------------------------------------------------------
@@ -247,30 +1650,162 @@ class CSVImportBaseView(View):
             elif err:
                 errors.append(err)
             elif obj:
-                objects_to_create.append(obj)
+                objects.append(obj)
+        return objects
 
-        # ------------------------------------------------------------
-        # エラーがあればJSONで返す
-        # ------------------------------------------------------------
-        if errors:
-            return JsonResponse({'error': 'CSVに問題があります。', 'details': errors}, status=400)
+    @cached_property
+    def column_validator(self):
+        return ColumnValidator(self.import_form_class, **self.get_import_form_kwargs())
 
-        # ------------------------------------------------------------
-        # 登録実行
-        # ------------------------------------------------------------
-        try:
-            with transaction.atomic():
-                for obj in objects_to_create:
-                    form = getattr(obj, "_form_instance", None)
-                    obj.save()
+    def get_import_form_kwargs(self):
+        '''import_form_class の生成時の引数（選択肢をログインユーザーで絞り込む場合等）'''
+        return {}
 
-                    if form:
-                        form.instance = obj
-                        form.save_m2m()
-        except IntegrityError as e:
-            return JsonResponse({'error': '登録中にDBエラーが発生しました。', 'details': [str(e)]}, status=500)
+    def validate_columns(self, chunk):
+        '''
+        チャンクの全行を import_form_class の検証内容で列単位に検証し、{行番号: ColumnResult} を返す
+        - 行ごとにフォームを生成しない（ColumnValidator）
+        '''
+        rows = [self.get_form_data(row) for _, row in chunk]
+        instances = [self.get_form_instance(row) for _, row in chunk]
+        results = self.column_validator.validate(rows, instances)
+        return {idx: result for (idx, _), result in zip(chunk, results)}
+
+    def get_form_data(self, row):
+        '''フォームに渡す値（関連先は self.lookups で解決したオブジェクトに変換）'''
+        return row
+
+    def get_form_instance(self, row):
+        '''行に対応する登録済みデータ（ModelForm の instance 相当、一意チェックで自身を除く）'''
+        return None
+
+    def format_column_errors(self, result, idx):
+        '''列単位の検証結果のエラーを「{行番号}行目: 項目: メッセージ; ...」で返す'''
+        error_text = '; '.join(self._format_errors_with_verbose_name(self.column_validator.form, result.errors))
+        return f'{idx}行目: {error_text}'
+
+    # ------------------------------------------------------------
+    # 一括登録
+    # ------------------------------------------------------------
+    def save_objects(self, objects):
+        '''
+        検証済みオブジェクトを batch_size 件ずつ bulk_create で登録し、件数を {'inserted': 件数, ...} で返す
+        - 多対多（フォームの save_m2m 相当）は中間テーブルの行をまとめて一括登録
+        - save() / シグナルは呼ばれないため、登録後に bulk_created を送信
+        - 更新モードは upsert_objects で登録・更新
+        '''
+        if self.import_mode == 'upsert':
+            return self.upsert_objects(objects)
+
+        self.model_class.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.save_m2m(objects)
+        bulk_created.send(sender=self.model_class, instances=objects)
+        return {'inserted': len(objects)}
+
+    def upsert_objects(self, objects):
+        '''
+        検証済みオブジェクトを batch_size 件ずつ bulk_create(update_conflicts=True) で登録・更新し、
+        登録・更新・変更なしの件数を返す
+        - バッチごとに upsert_unique_fields で登録済みのデータを1回で取得し、新規・変更あり・変更なしに振り分け
+        - 変更なし（CSVの項目・多対多が同じ）の行は書き込まない（更新日時も変えない）
+        - 論理削除済みのデータと一致した場合は削除を取り消して更新
+        - 更新対象は get_upsert_queryset() の範囲のみ
+        '''
+        model = self.model_class
+        opts = model._meta
+        key_fields = [opts.get_field(name) for name in self.upsert_unique_fields]
+        fields = [opts.get_field(name) for name in self.HEADER_MAP.values()]
+        compare_fields = [
+            field for field in fields if field.concrete and not field.many_to_many and field not in key_fields
+        ] + [opts.get_field('is_deleted')]
+        m2m_fields = [field for field in fields if field.many_to_many]
+        update_fields = [field.name for field in compare_fields] + ['update_user', 'updated_at']
+        key = lambda obj: tuple(getattr(obj, field.attname) for field in key_fields)
+
+        counts = Counter(inserted=0, updated=0, unchanged=0)
+        for start in range(0, len(objects), self.batch_size):
+            batch = objects[start:start + self.batch_size]
+            current = self.get_upsert_queryset().filter(**{
+                f'{field.attname}__in': {getattr(obj, field.attname) for obj in batch} for field in key_fields
+            }).prefetch_related(*[field.name for field in m2m_fields])
+            current = {key(obj): obj for obj in current}
+
+            created, changed = [], []
+            for obj in batch:
+                target = current.get(key(obj))
+                if target is None:
+                    created.append(obj)
+                elif self.has_changes(obj, target, compare_fields, m2m_fields):
+                    changed.append(obj)
+            counts['inserted'] += len(created)
+            counts['updated'] += len(changed)
+            counts['unchanged'] += len(batch) - len(created) - len(changed)
+
+            written = created + changed
+            if not written:
+                continue
+            model.objects.bulk_create(
+                written,
+                update_conflicts=True,
+                unique_fields=[field.name for field in key_fields],
+                update_fields=update_fields,
+            )
+            self.save_m2m(written, replace=changed)
+            bulk_created.send(sender=model, instances=written)
+        return counts
+
+    def get_upsert_queryset(self):
+        '''
+        更新モードで更新対象とする登録済みデータ
+        - 範囲外のデータと一意キーが一致する行は、validate_row（一意チェック等）でエラーにすること
+        '''
+        return self.model_class.objects.all()
+
+    def has_changes(self, obj, current, compare_fields, m2m_fields):
+        '''取込値と登録済みのデータ（current）で、更新対象の項目・多対多に違いがあるか'''
+        if any(getattr(obj, field.attname) != getattr(current, field.attname) for field in compare_fields):
+            return True
+        m2m_data = getattr(obj, '_m2m_data', {})
+        return any(
+            {target.pk for target in m2m_data[field.name]} != {target.pk for target in getattr(current, field.name).all()}
+            for field in m2m_fields if field.name in m2m_data
+        )
+
+    def save_m2m(self, objects, replace=()):
+        '''
+        フォームの多対多（save_m2m 相当、値は ColumnValidator が設定した obj._m2m_data）を中間テーブルに一括登録
+        - replace: 登録済みの中間テーブルの行を入れ替えるオブジェクト（更新モードで更新した行）
+        '''
+        replaced = [obj.pk for obj in replace if getattr(obj, '_m2m_data', None)]
+        if replaced:
+            for field in self.model_class._meta.many_to_many:
+                if field.name in self.HEADER_MAP.values():
+                    field.remote_field.through.objects.filter(**{f'{field.m2m_field_name()}__in': replaced}).delete()
+
+        through_rows = defaultdict(list)
+        for obj in objects:
+            m2m_data = getattr(obj, '_m2m_data', {})
+            for field in obj._meta.many_to_many:
+                if field.name not in m2m_data:
+                    continue
+                through = field.remote_field.through
+                for target in m2m_data[field.name]:
+                    through_rows[through].append(through(**{
+                        field.m2m_field_name(): obj,
+                        field.m2m_reverse_field_name(): target,
+                    }))
+        for through, rows in through_rows.items():
+            through.objects.bulk_create(rows, batch_size=self.batch_size)
 
-        return JsonResponse({'message': f'{len(objects_to_create)}件をインポートしました。'})
+    # ------------------------------------------------------------
+    # 関連先の解決キャッシュ
+    # ------------------------------------------------------------
+    def get_lookups(self, rows, request):
+        '''
+        チャンク（batch_size 件）の行データから関連先の名称を集め、{キー: ImportLookup} を返す
+        - validate_row からは self.lookups[キー] で参照する
+        '''
+        return {}
 
     # ------------------------------------------------------------
     # サブクラスで実装すべき：1行単位の検証ロジック
@@ -344,3 +1879,203 @@ class SystemUserOnlyMixin():
         if int(request.user.privilege)  != int(PRIVILEGE_SYSTEM):
             return HttpResponseForbidden('アクセス権限がありません。')
         return super().dispatch(request, *args, **kwargs)
+
+
+class EstimatedCountPaginator(Paginator):
+    '''
+    件数が多い場合にCOUNT(*)を行わず推定件数でページングする
+    - 推定行数が COUNT_ESTIMATE_THRESHOLD 以上の場合のみ推定値を使用
+    - 正確な件数は ListCountBaseView から非同期で取得する
+    '''
+    @cached_property
+    def _count(self):
+        return Common.get_count(self.object_list)
+
+    @cached_property
+    def count(self):
+        return self._count[0]
+
+    @property
+    def is_estimated(self):
+        return self._count[1]
+
+    def validate_number(self, number):
+        # 推定件数は実件数より少ない場合があるため、上限チェックは行わない
+        if not self.is_estimated:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('ページ番号が整数ではありません。')
+        if number < 1:
+            raise EmptyPage('ページ番号が1未満です。')
+        return number
+
+    def page(self, number):
+        if not self.is_estimated:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class ListCountBaseView(View):
+    '''
+    一覧の正確な件数を返す（推定件数表示時に画面から非同期で取得）
+    list_view_class: 件数を取得する一覧ビュー（get_querysetの検索条件を再利用）
+    '''
+    list_view_class = None
+
+    def get(self, request, *args, **kwargs):
+        view = self.list_view_class()
+        view.setup(request, *args, **kwargs)
+        count = view.get_queryset().order_by().count()
+        return JsonResponse({'count': count})
+
+
+class KeysetPage:
+    '''
+    キーセット方式のページ（前後ページのカーソルのみ保持）
+    '''
+    is_keyset = True
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor='', previous_cursor=''):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginationMixin():
+    '''
+    キーセット（カーソル）方式のページング
+    - OFFSET/COUNTを使わず、並び順のキー値＋idを境界に前後ページを取得
+    - 並び順はget_queryset()のorder_by（なければモデルのordering）を使用
+    - URLパラメータ after / before に署名付きカーソルを受け取る
+    - 既定は従来のページ番号方式（件数・ページ番号を表示）とし、次の場合のみキーセット方式（use_keyset）
+      - paging=keyset またはカーソルの指定時
+      - 件数が推定値となる（推定行数が COUNT_ESTIMATE_THRESHOLD 以上の）場合
+    '''
+    keyset_salt = 'keyset-pagination'
+    paginator_class = EstimatedCountPaginator
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        '''キーセット方式の判定で件数を取得したページャーを、ページ番号方式でもそのまま使う'''
+        paginator = getattr(self, '_paginator', None)
+        if paginator is None or paginator.object_list is not queryset:
+            paginator = self._paginator = super().get_paginator(queryset, per_page, **kwargs)
+        return paginator
+
+    def use_keyset(self, paginator):
+        '''キーセット方式でページングするか'''
+        params = self.request.GET
+        if params.get('paging') == 'keyset' or params.get('after') or params.get('before'):
+            return True
+        return paginator.is_estimated
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_paginator(
+            queryset, page_size, orphans=self.get_paginate_orphans(), allow_empty_first_page=self.get_allow_empty()
+        )
+        if not self.use_keyset(paginator):
+            return super().paginate_queryset(queryset, page_size)
+
+        ordering = self.get_keyset_ordering(queryset)
+        fields = [field.lstrip('-') for field in ordering]
+
+        after = self._load_cursor(self.request.GET.get('after'), len(fields))
+        before = self._load_cursor(self.request.GET.get('before'), len(fields))
+
+        if before is not None:
+            # 前ページ：並び順を反転して取得し、表示用に戻す
+            reverse = [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+            rows = list(queryset.filter(self._seek(reverse, before)).order_by(*reverse)[:page_size + 1])
+            has_previous = len(rows) > page_size
+            object_list = rows[:page_size][::-1]
+            has_next = True
+        else:
+            if after is not None:
+                queryset = queryset.filter(self._seek(ordering, after))
+            rows = list(queryset.order_by(*ordering)[:page_size + 1])
+            has_next = len(rows) > page_size
+            object_list = rows[:page_size]
+            has_previous = after is not None
+
+        page = KeysetPage(
+            object_list,
+            has_next=has_next and bool(object_list),
+            has_previous=has_previous and bool(object_list),
+            next_cursor=self._dump_cursor(object_list[-1], fields) if object_list else '',
+            previous_cursor=self._dump_cursor(object_list[0], fields) if object_list else '',
+        )
+        return (None, page, object_list, page.has_other_pages())
+
+    def get_keyset_ordering(self, queryset):
+        '''
+        並び順のキーを取得し、末尾にidを付与して一意にする
+        '''
+        ordering = [str(field) for field in (queryset.query.order_by or queryset.model._meta.ordering or ['-id'])]
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    def _seek(self, ordering, values):
+        '''
+        境界行より後ろの行を取得する条件を作成
+        - (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...
+        - NULLは昇順で末尾、降順で先頭（PostgreSQLの既定）として扱う
+        '''
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            desc = field.startswith('-')
+            if value is None:
+                after = Q(**{f'{name}__isnull': False}) if desc else Q(pk__in=[])
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                after = Q(**{f'{name}__lt' if desc else f'{name}__gt': value})
+                if not desc:
+                    after |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            condition |= equal & after
+            equal &= same
+        return condition
+
+    def _dump_cursor(self, obj, fields):
+        values = []
+        for field in fields:
+            value = obj
+            for attr in field.split('__'):
+                value = getattr(value, 'pk' if attr == 'pk' else attr, None)
+                if value is None:
+                    break
+            values.append(None if value is None else str(value))
+        return signing.dumps(values, salt=self.keyset_salt)
+
+    def _load_cursor(self, token, length):
+        if not token:
+            return None
+        try:
+            values = signing.loads(token, salt=self.keyset_salt)
+        except signing.BadSignature:
+            return None
+        if not isinstance(values, list) or len(values) != length:
+            return None
+        return values
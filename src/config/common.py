@@ -1,9 +1,21 @@
 import re
+import json
 import datetime
+import unicodedata
+from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import Page
+from django.db import connections, models
+from django.contrib.postgres.aggregates import StringAgg
+from django.db.models.functions import Coalesce, Concat
 from decimal import Decimal
 from django.core.validators import RegexValidator
 
+# 検索用の正規化：カタカナ（ァ～ヶ）をひらがな（ぁ～ゖ）に寄せる
+KATAKANA = ''.join(chr(c) for c in range(0x30A1, 0x30F7))
+HIRAGANA = ''.join(chr(c - 0x60) for c in range(0x30A1, 0x30F7))
+KANA_FOLD_TABLE = str.maketrans(KATAKANA, HIRAGANA)
+
 class Common:
     # 共通データカラムリスト
     COMMON_DATA_COLUMNS = ['create_user', 'created_at', 'update_user', 'updated_at']
@@ -20,6 +32,12 @@ class Common:
         ページング部品の値をコンテキストに設定
         '''
         page: Page = context['page_obj']
+        if getattr(page, 'is_keyset', False):
+            # キーセット方式：ページ番号は持たず、カーソルのパラメータを削除
+            url_params = re.sub(r'(^|&)(after|before|page)=[^&]*', '', url_params).lstrip('&')
+            context['query_str'] = url_params
+            return context
+
         context['paginator_range'] = page.paginator.get_elided_page_range(
             page.number
             , on_each_side=1
@@ -32,6 +50,122 @@ class Common:
         # 処理結果を返却
         return context
 
+    @classmethod
+    def estimate_count(cls, queryset):
+        '''
+        実行計画（EXPLAIN）の推定行数から件数を取得（PostgreSQLのみ）
+        '''
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @classmethod
+    def table_rows(cls, queryset):
+        '''
+        テーブル全体の推定行数（pg_class.reltuples、PostgreSQLのみ）
+        - テーブル単位で COUNT_ESTIMATE_CACHE_SECONDS 秒キャッシュし、一覧表示ごとには問い合わせない
+        - 統計情報が未収集の場合は None
+        '''
+        table = queryset.model._meta.db_table
+        key = f'table_rows:{queryset.db}:{table}'
+        rows = cache.get(key)
+        if rows is None:
+            with connections[queryset.db].cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)', [table])
+                row = cursor.fetchone()
+            rows = int(row[0]) if row else -1
+            cache.set(key, rows, settings.COUNT_ESTIMATE_CACHE_SECONDS)
+        return rows if rows >= 0 else None
+
+    @classmethod
+    def get_count(cls, queryset):
+        '''
+        件数を取得（推定行数が閾値以上の場合は推定値を返す）
+        - 戻り値：(件数, 推定値かどうか)
+        - PostgreSQL以外、またはテーブル全体でも閾値未満の場合は EXPLAIN を行わず COUNT のみ
+        '''
+        if connections[queryset.db].vendor != 'postgresql':
+            return queryset.count(), False
+        table_rows = cls.table_rows(queryset)
+        if table_rows is not None and table_rows < settings.COUNT_ESTIMATE_THRESHOLD:
+            return queryset.count(), False
+        estimated = cls.estimate_count(queryset)
+        if estimated >= settings.COUNT_ESTIMATE_THRESHOLD:
+            return estimated, True
+        return queryset.count(), False
+
+    @classmethod
+    def exceeds_count(cls, queryset, limit):
+        '''
+        件数が limit を超えるか（limit + 1 件までの COUNT で判定し、全件は数えない）
+        - 出力件数の上限チェック等、推定値では判定できない場合に使用
+        '''
+        return queryset[:limit + 1].count() > limit
+
+    @classmethod
+    def normalize_search_text(cls, value):
+        '''
+        検索用に文字列を正規化
+        - NFKC（全角英数・半角カナの統一）→ 小文字化 → カタカナをひらがなに変換
+        - 生成カラム（search_text_expression）と同じ変換を行うこと
+        '''
+        return unicodedata.normalize('NFKC', value or '').lower().translate(KANA_FOLD_TABLE)
+
+    @classmethod
+    def search_text_expression(cls, fields):
+        '''
+        検索用生成カラムの式（対象カラムを空白区切りで連結して正規化）
+        - normalize_search_text と同じ変換をPostgreSQLの関数で行う
+        '''
+        parts = []
+        for field in fields:
+            if parts:
+                parts.append(models.Value(' '))
+            parts.append(Coalesce(models.F(field), models.Value(''), output_field=models.TextField()))
+        text = Concat(*parts, output_field=models.TextField()) if len(parts) > 1 else parts[0]
+        return models.Func(
+            text,
+            template=f"translate(lower(normalize(%(expressions)s, NFKC)), '{KATAKANA}', '{HIRAGANA}')",
+            output_field=models.TextField(),
+        )
+
+    @classmethod
+    def choice_label_expression(cls, field, choices):
+        '''
+        選択肢の表示名を返す式（get_FOO_display と同等、未定義の値はそのまま返す）
+        '''
+        return models.Case(
+            *[models.When(**{field: value}, then=models.Value(label)) for value, label in choices],
+            default=models.F(field),
+            output_field=models.CharField(),
+        )
+
+    @classmethod
+    def related_names_expression(cls, relation, field, outer_ref='pk'):
+        '''
+        多対多の関連先の項目をカンマ区切りで連結する相関サブクエリ
+        - relation: ManyToManyField の記述子（例: SalesOrder.reference_users）
+        - outer_ref: 外側のクエリで関連元の主キーを指すパス
+        - 行ごとの関連取得（N+1）を避け、エクスポートを1クエリで行うために使用
+        '''
+        source = relation.field.m2m_field_name()
+        target = relation.field.m2m_reverse_field_name()
+        if relation.reverse:
+            source, target = target, source
+
+        names = (
+            relation.through.objects
+            .filter(**{source: models.OuterRef(outer_ref)})
+            .values(source)
+            .annotate(names=StringAgg(f'{target}__{field}', ', ', ordering=f'{target}__{field}'))
+            .values('names')
+        )
+        return Coalesce(models.Subquery(names), models.Value(''), output_field=models.TextField())
+
     @classmethod
     def get_ip_address(cls, request):
         # 'HTTP_X_FORWARDED_FOR'ヘッダを参照して転送経路のIPアドレスを取得する。
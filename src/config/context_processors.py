@@ -1,3 +1,4 @@
+from django.conf import settings
 from register import constants as register_const
 
 def app_name(request):
@@ -26,4 +27,7 @@ def const_str(request):
         'PRIVILEGE_EDITOR': register_const.PRIVILEGE_EDITOR,
         'PRIVILEGE_VIEWER': register_const.PRIVILEGE_VIEWER,
         'PRIVILEGE_CHOICES': register_const.PRIVILEGE_CHOICES,
+
+        # CSVインポートをインポートジョブで行うファイルサイズ
+        'IMPORT_STAGING_THRESHOLD': settings.IMPORT_STAGING_THRESHOLD,
     }
\ No newline at end of file
@@ -85,5 +85,38 @@ DEFAULT_PAGE_SIZE = 20
 # CSVファイルの最大出力件数
 MAX_EXPORT_ROWS = 10000
 
+# CSV出力時のサーバーサイドカーソルの取得件数（兼 レスポンス1回あたりの送信行数）
+EXPORT_CHUNK_SIZE = 2000
+
+# 差分出力で次回に回す直近の秒数（更新日時は保存時点の値のため、最長の更新トランザクションより長くする）
+EXPORT_DELTA_MARGIN_SECONDS = 60
+
+# ジョブのファイルの保存先（ソースツリーの外、環境変数 JOB_FILE_ROOT で変更可）
+JOB_FILE_ROOT = Path(os.getenv('JOB_FILE_ROOT') or BASE_DIR.parent / 'var')
+
+# エクスポートジョブ（バックグラウンド出力）の出力先・保存日数・ワーカーの待機間隔（秒）・中断とみなす更新なしの秒数
+EXPORT_JOB_DIR = JOB_FILE_ROOT / 'export_jobs'
+EXPORT_JOB_RETENTION_DAYS = 7
+EXPORT_JOB_POLL_INTERVAL = 5
+EXPORT_JOB_STALE_SECONDS = 300
+
+# インポートジョブ（バックグラウンド取込）の保存先・保存日数・コミット単位の既定値・中断とみなす更新なしの秒数
+IMPORT_JOB_DIR = JOB_FILE_ROOT / 'import_jobs'
+IMPORT_JOB_RETENTION_DAYS = 7
+IMPORT_JOB_CHUNK_SIZE = 1000
+IMPORT_JOB_STALE_SECONDS = 300
+
+# 件数表示を推定値に切り替える件数（実行計画の推定行数がこれ以上の場合）
+COUNT_ESTIMATE_THRESHOLD = 100000
+
+# 件数の推定に使うテーブル全体の推定行数のキャッシュ秒数
+COUNT_ESTIMATE_CACHE_SECONDS = 300
+
 # インポートファイルのファイルサイズ上限
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
\ No newline at end of file
+MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB（CSVは逐次デコードのため、ファイル全体はメモリに展開しない）
+
+# CSVインポート時の一括登録（bulk_create）の1回あたりの件数
+IMPORT_BATCH_SIZE = 1000
+
+# CSVインポートをインポートジョブ・ステージングテーブル（COPY ＋ SQLでの一括検証）経由で行うファイルサイズ（これ以上の場合）
+IMPORT_STAGING_THRESHOLD = 5 * 1024 * 1024  # 5MB
\ No newline at end of file
@@ -41,3 +41,15 @@ def format_postal(value):
     if len(value) == 7:
         return f'{value[:3]}-{value[3:]}'
     return value
+
+
+
+#----------------------------------------------------
+# 金額フォーマット
+#----------------------------------------------------
+@register.filter
+def format_yen(value):
+    '''金額を ¥1,234 形式にフォーマット（未計算の場合は空文字）'''
+    if value is None or value == '':
+        return ''
+    return f'¥{int(value):,}'
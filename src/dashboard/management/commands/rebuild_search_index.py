@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from dashboard.models import rebuild_search_index
+
+
+class Command(BaseCommand):
+    '''
+    横断検索インデックスを既存データから再作成する
+    '''
+    help = '商品・取引先・受注・ユーザーの横断検索インデックスを再作成します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='対象テナントID（未指定時は全テナント）')
+        parser.add_argument('--batch-size', type=int, default=1000, help='1回の登録件数')
+
+    def handle(self, *args, **options):
+        total = rebuild_search_index(tenant_id=options.get('tenant'), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total}件の検索インデックスを作成しました。'))
@@ -0,0 +1,41 @@
+import logging
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+from dashboard.models import ExportJob, claim_export_job, purge_export_jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    '''
+    エクスポートジョブを順次実行するワーカー
+    '''
+    help = '待機中のエクスポートジョブを実行します（--once 指定時は待機中のジョブがなくなった時点で終了）。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='待機中のジョブを処理したら終了する')
+        parser.add_argument('--interval', type=int, default=settings.EXPORT_JOB_POLL_INTERVAL, help='ジョブ確認の間隔（秒）')
+
+    def handle(self, *args, **options):
+        while True:
+            purge_export_jobs()
+
+            job = claim_export_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            try:
+                job.run()
+                self.stdout.write(f'ジョブ{job.pk}: {job.file_name}（{job.processed_rows}件）を出力しました。')
+            except Exception as e:
+                logger.exception('エクスポートジョブ %s の実行に失敗しました。', job.pk)
+                job.delete_file()
+                ExportJob.objects.filter(pk=job.pk).update(
+                    status='failed', error_message=str(e), finished_at=timezone.now()
+                )
+                self.stderr.write(f'ジョブ{job.pk}: 出力に失敗しました。（{e}）')
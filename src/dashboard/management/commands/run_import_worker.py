@@ -0,0 +1,45 @@
+import logging
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+from dashboard.models import ImportJob, claim_import_job, purge_import_jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    '''
+    インポートジョブを順次実行するワーカー
+    - 中断されたジョブ（ワーカーの停止等）は最後にコミットしたチャンクの次の行から再開
+    '''
+    help = '待機中・中断されたインポートジョブを実行します（--once 指定時は対象のジョブがなくなった時点で終了）。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='対象のジョブを処理したら終了する')
+        parser.add_argument('--interval', type=int, default=settings.EXPORT_JOB_POLL_INTERVAL, help='ジョブ確認の間隔（秒）')
+
+    def handle(self, *args, **options):
+        while True:
+            purge_import_jobs()
+
+            job = claim_import_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            try:
+                job.run()
+                self.stdout.write(
+                    f'ジョブ{job.pk}: {job.file_name}（登録 {job.imported_rows}件・更新 {job.updated_rows}件・'
+                    f'エラー {job.error_rows}件）を取り込みました。'
+                )
+            except Exception as e:
+                # コミット済みのチャンク・エラーファイルはそのまま残す
+                logger.exception('インポートジョブ %s の実行に失敗しました。', job.pk)
+                ImportJob.objects.filter(pk=job.pk).update(
+                    status='failed', error_message=str(e), finished_at=timezone.now()
+                )
+                self.stderr.write(f'ジョブ{job.pk}: 取込に失敗しました。（{e}）')
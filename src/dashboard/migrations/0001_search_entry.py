@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:26
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('tenant_mst', '0005_rename_contact_email_tenant_email_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('product', '商品'), ('partner', '取引先'), ('sales_order', '受注'), ('user', 'ユーザー')], max_length=20, verbose_name='種別')),
+                ('object_id', models.BigIntegerField(verbose_name='対象ID')),
+                ('title', models.CharField(max_length=255, verbose_name='表示名')),
+                ('subtitle', models.CharField(blank=True, default='', max_length=255, verbose_name='補足')),
+                ('search_text', models.TextField(verbose_name='検索用テキスト')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='tenant_mst.tenant', verbose_name='所属テナント')),
+            ],
+            options={
+                'db_table': 'search_entry',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='idx_search_entry_trgm', opclasses=['gin_trgm_ops']), models.Index(fields=['tenant', 'entity_type'], name='idx_search_entry_tenant')],
+                'constraints': [models.UniqueConstraint(fields=('entity_type', 'object_id'), name='uq_search_entry_object')],
+            },
+        ),
+    ]
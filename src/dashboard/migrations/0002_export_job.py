@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-18 04:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_search_entry'),
+        ('tenant_mst', '0005_rename_contact_email_tenant_email_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_deleted', models.BooleanField(default=False, verbose_name='削除フラグ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('view_name', models.CharField(max_length=100, verbose_name='出力ビュー（URL名）')),
+                ('query_string', models.TextField(blank=True, default='', verbose_name='検索条件')),
+                ('status', models.CharField(choices=[('pending', '待機中'), ('running', '実行中'), ('done', '完了'), ('failed', 'エラー')], default='pending', max_length=20, verbose_name='状態')),
+                ('total_rows', models.PositiveIntegerField(blank=True, null=True, verbose_name='出力対象件数')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='出力済件数')),
+                ('file_name', models.CharField(blank=True, default='', max_length=255, verbose_name='ファイル名')),
+                ('file_path', models.CharField(blank=True, default='', max_length=500, verbose_name='保存先')),
+                ('error_message', models.TextField(blank=True, default='', verbose_name='エラー内容')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='開始日時')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='終了日時')),
+                ('create_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_creator', to=settings.AUTH_USER_MODEL, verbose_name='作成者')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='tenant_mst.tenant', verbose_name='所属テナント')),
+                ('update_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_updater', to=settings.AUTH_USER_MODEL, verbose_name='更新者')),
+            ],
+            options={
+                'db_table': 'export_job',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'id'], name='idx_export_job_status')],
+            },
+        ),
+    ]
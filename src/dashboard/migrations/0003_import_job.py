@@ -0,0 +1,49 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_export_job'),
+        ('tenant_mst', '0005_rename_contact_email_tenant_email_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_deleted', models.BooleanField(default=False, verbose_name='削除フラグ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('view_name', models.CharField(max_length=100, verbose_name='インポートビュー（URL名）')),
+                ('status', models.CharField(choices=[('pending', '待機中'), ('running', '実行中'), ('done', '完了'), ('failed', 'エラー')], default='pending', max_length=20, verbose_name='状態')),
+                ('chunk_size', models.PositiveIntegerField(default=1000, verbose_name='コミット単位（件）')),
+                ('total_rows', models.PositiveIntegerField(blank=True, null=True, verbose_name='データ件数')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='処理済件数')),
+                ('imported_rows', models.PositiveIntegerField(default=0, verbose_name='登録件数')),
+                ('error_rows', models.PositiveIntegerField(default=0, verbose_name='エラー件数')),
+                ('rows_per_second', models.FloatField(default=0, verbose_name='処理速度（件/秒）')),
+                ('file_name', models.CharField(max_length=255, verbose_name='ファイル名')),
+                ('file_path', models.CharField(blank=True, default='', max_length=500, verbose_name='保存先')),
+                ('error_file_path', models.CharField(blank=True, default='', max_length=500, verbose_name='エラーファイルの保存先')),
+                ('error_file_size', models.PositiveBigIntegerField(default=0, verbose_name='エラーファイルのコミット済みサイズ')),
+                ('error_message', models.TextField(blank=True, default='', verbose_name='エラー内容')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='開始日時')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='終了日時')),
+                ('create_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_creator', to=settings.AUTH_USER_MODEL, verbose_name='作成者')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='tenant_mst.tenant', verbose_name='所属テナント')),
+                ('update_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_updater', to=settings.AUTH_USER_MODEL, verbose_name='更新者')),
+            ],
+            options={
+                'db_table': 'import_job',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'id'], name='idx_import_job_status')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_import_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('insert', '新規登録'), ('upsert', '新規登録＋更新')], default='insert', max_length=20, verbose_name='インポートモード'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='unchanged_rows',
+            field=models.PositiveIntegerField(default=0, verbose_name='変更なし件数'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='updated_rows',
+            field=models.PositiveIntegerField(default=0, verbose_name='更新件数'),
+        ),
+    ]
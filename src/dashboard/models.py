@@ -1,3 +1,557 @@
-from django.db import models
+import csv
+import itertools
+import time
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.contrib.messages.storage import default_storage
+from django.core.files import File
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.contrib.postgres.indexes import GinIndex
+from django.http import HttpRequest, QueryDict
+from django.urls import resolve, reverse
+from django.utils import timezone
+from config.base import IMPORT_MODE_CHOICES, BaseModel, bulk_created
+from config.common import Common
+from partner_mst.models import Partner
+from product_mst.models import Product, ProductCategory
+from register.models import CustomUser
+from sales_order.models import SalesOrder
 
-# Create your models here.
+
+# 横断検索の対象種別
+ENTITY_CHOICES = [
+    ('product', '商品'),
+    ('partner', '取引先'),
+    ('sales_order', '受注'),
+    ('user', 'ユーザー'),
+]
+
+
+class SearchEntry(models.Model):
+    '''
+    横断検索インデックス
+    - 商品名・取引先名（カナ）・受注番号・ユーザー名をテナント単位で1テーブルに保持
+    - 各モデルの保存／削除シグナルで差分更新（全件再作成は rebuild_search_index コマンド）
+    '''
+    class Meta:
+        db_table = 'search_entry'
+        constraints = [
+            models.UniqueConstraint(fields=['entity_type', 'object_id'], name='uq_search_entry_object')
+        ]
+        indexes = [
+            GinIndex(fields=['search_text'], opclasses=['gin_trgm_ops'], name='idx_search_entry_trgm'),
+            models.Index(fields=['tenant', 'entity_type'], name='idx_search_entry_tenant'),
+        ]
+
+    tenant = models.ForeignKey('tenant_mst.Tenant', on_delete=models.CASCADE, related_name='search_entries', verbose_name='所属テナント')
+    entity_type = models.CharField(max_length=20, choices=ENTITY_CHOICES, verbose_name='種別')
+    object_id = models.BigIntegerField(verbose_name='対象ID')
+    title = models.CharField(max_length=255, verbose_name='表示名')
+    subtitle = models.CharField(max_length=255, blank=True, default='', verbose_name='補足')
+    search_text = models.TextField(verbose_name='検索用テキスト')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+
+    def __str__(self):
+        return f'{self.get_entity_type_display()}: {self.title}'
+
+
+#--------------------------
+# 検索対象の定義
+#--------------------------
+def product_entry(obj):
+    '''商品: 商品名（補足: 商品カテゴリ）'''
+    category = obj.product_category.product_category_name if obj.product_category else ''
+    return obj.product_name, category, [obj.product_name]
+
+
+def partner_entry(obj):
+    '''取引先: 取引先名・取引先名カナ（補足: 取引先名カナ）'''
+    return obj.partner_name, obj.partner_name_kana or '', [obj.partner_name, obj.partner_name_kana]
+
+
+def sales_order_entry(obj):
+    '''受注: 受注番号（補足: 受注日・ステータス）'''
+    return obj.sales_order_no, f'{obj.sales_order_date} {obj.get_status_code_display()}', [obj.sales_order_no]
+
+
+def user_entry(obj):
+    '''ユーザー: ユーザー名・ユーザー名カナ（補足: メールアドレス）'''
+    return obj.username, obj.email or '', [obj.username, obj.username_kana]
+
+
+# 種別ごとの対象モデル・項目取得関数・一括取得時の関連・インデックスに影響する項目
+SEARCH_SOURCES = {
+    'product': (Product, product_entry, ['product_category'], {'product_name', 'product_category'}),
+    'partner': (Partner, partner_entry, [], {'partner_name', 'partner_name_kana'}),
+    'sales_order': (SalesOrder, sales_order_entry, [], {'sales_order_no', 'sales_order_date', 'status_code'}),
+    'user': (CustomUser, user_entry, [], {'username', 'username_kana', 'email'}),
+}
+
+# 全種別共通でインデックスに影響する項目
+SEARCH_COMMON_FIELDS = {'tenant', 'is_deleted'}
+
+
+def build_search_entry(entity_type, obj):
+    '''モデルインスタンスから検索インデックス行を生成（未保存）'''
+    _, entry, _, _ = SEARCH_SOURCES[entity_type]
+    title, subtitle, texts = entry(obj)
+    return SearchEntry(
+        tenant_id=obj.tenant_id,
+        entity_type=entity_type,
+        object_id=obj.pk,
+        title=title[:255],
+        subtitle=subtitle[:255],
+        search_text=Common.normalize_search_text(' '.join(t for t in texts if t)),
+    )
+
+
+def index_objects(entity_type, objs):
+    '''
+    検索インデックスを差分更新
+    - 論理削除済み・テナント未所属のレコードはインデックスから除外
+    - 既存行は (entity_type, object_id) の一意制約で上書き
+    '''
+    removed = [obj.pk for obj in objs if obj.is_deleted or not obj.tenant_id]
+    entries = [build_search_entry(entity_type, obj) for obj in objs if not obj.is_deleted and obj.tenant_id]
+
+    if removed:
+        SearchEntry.objects.filter(entity_type=entity_type, object_id__in=removed).delete()
+    if entries:
+        SearchEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['entity_type', 'object_id'],
+            update_fields=['tenant', 'title', 'subtitle', 'search_text', 'updated_at'],
+        )
+
+
+def rebuild_search_index(tenant_id=None, batch_size=1000):
+    '''
+    検索インデックスを全件再作成
+    - 対象テナント（未指定時は全テナント）の行を削除し、主キー順にバッチ登録
+    '''
+    total = 0
+    with transaction.atomic():
+        entries = SearchEntry.objects.all()
+        if tenant_id:
+            entries = entries.filter(tenant_id=tenant_id)
+        entries.delete()
+
+        for entity_type, (model, _, related, _) in SEARCH_SOURCES.items():
+            queryset = model.objects.filter(is_deleted=False, tenant__isnull=False).select_related(*related)
+            if tenant_id:
+                queryset = queryset.filter(tenant_id=tenant_id)
+
+            last_pk = 0
+            while True:
+                objs = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+                if not objs:
+                    break
+                SearchEntry.objects.bulk_create([build_search_entry(entity_type, obj) for obj in objs])
+                total += len(objs)
+                last_pk = objs[-1].pk
+    return total
+
+
+#--------------------------
+# シグナル（差分更新）
+#--------------------------
+def connect_search_signals(entity_type, model, fields):
+    '''
+    対象モデルの保存・削除シグナルに検索インデックス更新を接続
+    - update_fields 指定の保存（最終ログイン日時の更新など）で対象項目が含まれない場合は何もしない
+    - CSVインポートの一括登録（bulk_created）はまとめて差分更新
+    '''
+    watched = fields | SEARCH_COMMON_FIELDS
+
+    @receiver(post_save, sender=model, dispatch_uid=f'search_entry_save_{entity_type}', weak=False)
+    def on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or (update_fields and not watched & set(update_fields)):
+            return
+        index_objects(entity_type, [instance])
+
+    @receiver(post_delete, sender=model, dispatch_uid=f'search_entry_delete_{entity_type}', weak=False)
+    def on_delete(sender, instance, **kwargs):
+        SearchEntry.objects.filter(entity_type=entity_type, object_id=instance.pk).delete()
+
+    @receiver(bulk_created, sender=model, dispatch_uid=f'search_entry_bulk_{entity_type}', weak=False)
+    def on_bulk_create(sender, instances, **kwargs):
+        index_objects(entity_type, instances)
+
+
+for _entity_type, (_model, _, _, _fields) in SEARCH_SOURCES.items():
+    connect_search_signals(_entity_type, _model, _fields)
+
+
+@receiver(post_save, sender=ProductCategory)
+def product_category_saved(sender, instance, raw=False, **kwargs):
+    '''
+    商品カテゴリ名の変更を商品の補足欄に反映
+    '''
+    if raw:
+        return
+    products = Product.objects.filter(product_category=instance).select_related('product_category')
+    index_objects('product', list(products))
+
+
+#--------------------------
+# エクスポートジョブ
+#--------------------------
+EXPORT_JOB_STATUS_CHOICES = [
+    ('pending', '待機中'),
+    ('running', '実行中'),
+    ('done', '完了'),
+    ('failed', 'エラー'),
+]
+
+
+class ExportJob(BaseModel):
+    '''
+    エクスポートジョブ
+    - CSV/Excel出力ビューを検索条件付きでバックグラウンド実行（run_export_worker コマンド）
+    - 作成者（create_user）の権限・テナントで出力し、完了後にファイルをダウンロード
+    '''
+    class Meta:
+        db_table = 'export_job'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='idx_export_job_status'),
+        ]
+
+    view_name = models.CharField(max_length=100, verbose_name='出力ビュー（URL名）')
+    query_string = models.TextField(blank=True, default='', verbose_name='検索条件')
+    status = models.CharField(max_length=20, choices=EXPORT_JOB_STATUS_CHOICES, default='pending', verbose_name='状態')
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name='出力対象件数')
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name='出力済件数')
+    file_name = models.CharField(max_length=255, blank=True, default='', verbose_name='ファイル名')
+    file_path = models.CharField(max_length=500, blank=True, default='', verbose_name='保存先')
+    error_message = models.TextField(blank=True, default='', verbose_name='エラー内容')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='開始日時')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='終了日時')
+
+    def __str__(self):
+        return f'{self.view_name}（{self.get_status_display()}）'
+
+    @property
+    def progress(self):
+        '''進捗率（％）'''
+        if self.status == 'done':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, self.processed_rows * 100 // self.total_rows)
+
+    def build_request(self):
+        '''ジョブ作成時の検索条件・ユーザーでGETリクエストを再現'''
+        request = HttpRequest()
+        request.method = 'GET'
+        request.GET = QueryDict(self.query_string)
+        request.user = self.create_user
+        request._messages = default_storage(request)
+        return request
+
+    def run(self):
+        '''
+        出力ビューの検索条件・行定義をそのまま使ってファイルを作成
+        - 出力件数上限（MAX_EXPORT_ROWS）は適用しない
+        '''
+        request = self.build_request()
+        view = resolve(reverse(self.view_name)).func.view_class()
+        view.setup(request)
+        view.is_background = True
+
+        data = view.get_export_data(request)
+        self.total_rows = data.count()
+        self.file_name = view.get_file_name()
+
+        # 出力先：EXPORT_JOB_DIR/<テナントID>/<ジョブID>_<ファイル名>
+        directory = Path(settings.EXPORT_JOB_DIR) / str(self.tenant_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.file_path = str(directory / f'{self.pk}_{self.file_name}')
+        self.save(update_fields=['total_rows', 'file_name', 'file_path', 'updated_at'])
+
+        # 出力済件数の更新（更新日時は中断の判定に使用）
+        def progress(count):
+            ExportJob.objects.filter(pk=self.pk).update(processed_rows=count, updated_at=timezone.now())
+
+        with open(self.file_path, 'wb') as file:
+            view.write_file(data, file, progress=progress)
+
+        self.refresh_from_db(fields=['processed_rows'])
+        self.status = 'done'
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'finished_at', 'updated_at'])
+
+    def delete_file(self):
+        '''出力ファイルを削除'''
+        if self.file_path:
+            Path(self.file_path).unlink(missing_ok=True)
+
+
+def claim_export_job():
+    '''
+    待機中のジョブ、または中断されたジョブ（EXPORT_JOB_STALE_SECONDS 以上更新のない実行中のジョブ）を1件取得して実行中にする
+    - 複数ワーカーで同じジョブを取得しないよう行ロック（SKIP LOCKED）
+    - 中断されたジョブは途中までのファイルを破棄し、最初から出力し直す
+    '''
+    stale = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_STALE_SECONDS)
+    with transaction.atomic():
+        job = (
+            ExportJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='running', updated_at__lt=stale))
+            .order_by('id')
+            .first()
+        )
+        if job:
+            job.delete_file()
+            job.status = 'running'
+            job.processed_rows = 0
+            job.started_at = timezone.now()
+            job.save(update_fields=['status', 'processed_rows', 'started_at', 'updated_at'])
+    return job
+
+
+def purge_export_jobs():
+    '''保存期間（EXPORT_JOB_RETENTION_DAYS）を過ぎたジョブと出力ファイルを削除'''
+    expired = ExportJob.objects.filter(
+        created_at__lt=timezone.now() - timedelta(days=settings.EXPORT_JOB_RETENTION_DAYS)
+    )
+    for job in expired:
+        job.delete_file()
+    return expired.delete()[0]
+
+
+#--------------------------
+# インポートジョブ
+#--------------------------
+# エラーファイルの先頭列（以降はCSVの項目）
+IMPORT_ERROR_HEADERS = ['行番号', 'エラー内容']
+
+
+class ImportJob(BaseModel):
+    '''
+    インポートジョブ
+    - CSVインポートビューの検証・登録をバックグラウンドで実行（run_import_worker コマンド）
+    - chunk_size 件ごとにコミットし、エラー行は登録せずエラーファイル（CSV）に出力
+    - ワーカーが停止した場合は、最後にコミットしたチャンクの次の行から再開
+    '''
+    class Meta:
+        db_table = 'import_job'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='idx_import_job_status'),
+        ]
+
+    view_name = models.CharField(max_length=100, verbose_name='インポートビュー（URL名）')
+    mode = models.CharField(max_length=20, choices=IMPORT_MODE_CHOICES, default='insert', verbose_name='インポートモード')
+    status = models.CharField(max_length=20, choices=EXPORT_JOB_STATUS_CHOICES, default='pending', verbose_name='状態')
+    chunk_size = models.PositiveIntegerField(default=1000, verbose_name='コミット単位（件）')
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name='データ件数')
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name='処理済件数')
+    imported_rows = models.PositiveIntegerField(default=0, verbose_name='登録件数')
+    updated_rows = models.PositiveIntegerField(default=0, verbose_name='更新件数')
+    unchanged_rows = models.PositiveIntegerField(default=0, verbose_name='変更なし件数')
+    error_rows = models.PositiveIntegerField(default=0, verbose_name='エラー件数')
+    rows_per_second = models.FloatField(default=0, verbose_name='処理速度（件/秒）')
+    file_name = models.CharField(max_length=255, verbose_name='ファイル名')
+    file_path = models.CharField(max_length=500, blank=True, default='', verbose_name='保存先')
+    error_file_path = models.CharField(max_length=500, blank=True, default='', verbose_name='エラーファイルの保存先')
+    error_file_size = models.PositiveBigIntegerField(default=0, verbose_name='エラーファイルのコミット済みサイズ')
+    error_message = models.TextField(blank=True, default='', verbose_name='エラー内容')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='開始日時')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='終了日時')
+
+    def __str__(self):
+        return f'{self.view_name}（{self.get_status_display()}）'
+
+    @property
+    def progress(self):
+        '''進捗率（％）'''
+        if self.status == 'done':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, self.processed_rows * 100 // self.total_rows)
+
+    def save_file(self, file):
+        '''
+        アップロードファイルを保存
+        - 保存先：IMPORT_JOB_DIR/<テナントID>/<ジョブID>_<ファイル名>（エラーファイルは末尾に _errors.csv）
+        '''
+        directory = Path(settings.IMPORT_JOB_DIR) / str(self.tenant_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.file_path = str(directory / f'{self.pk}_{Path(file.name).name}')
+        self.error_file_path = f'{self.file_path}_errors.csv'
+        with open(self.file_path, 'wb') as destination:
+            for chunk in file.chunks():
+                destination.write(chunk)
+        self.save(update_fields=['file_path', 'error_file_path'])
+
+    def open_file(self):
+        '''保存したアップロードファイルを開く（インポートビューの open_csv に渡せる File）'''
+        return File(open(self.file_path, 'rb'), name=self.file_name)
+
+    def build_request(self):
+        '''ジョブ作成時のユーザーでPOSTリクエストを再現'''
+        request = HttpRequest()
+        request.method = 'POST'
+        request.user = self.create_user
+        request._messages = default_storage(request)
+        return request
+
+    def build_view(self, request):
+        '''インポートビューをコミット単位の件数・インポートモードで生成'''
+        view = resolve(reverse(self.view_name)).func.view_class()
+        view.setup(request)
+        view.batch_size = self.chunk_size
+        view.import_mode = self.mode
+        return view
+
+    def run(self):
+        '''
+        インポートビューの検証・登録処理をチャンク単位で実行
+        - チャンクごとに登録・エラーファイルへの追記・処理件数の更新を1トランザクションでコミット
+        - 再開時は処理済件数分の行を読み飛ばし、エラーファイルをコミット済みのサイズに戻してから続行
+        - ステージング取込の対象（can_stage）のファイルは run_staged で全行を1トランザクションで処理
+        '''
+        request = self.build_request()
+        view = self.build_view(request)
+
+        if self.total_rows is None:
+            with self.open_file() as file:
+                self.total_rows = sum(1 for _ in view.read_csv(file))
+            self.save(update_fields=['total_rows', 'updated_at'])
+
+        with self.open_file() as file:
+            staged = view.can_stage(file)
+        if staged:
+            self.run_staged(view, request)
+            return
+
+        existing = view.get_existing(request)
+        start_rows, start_time = self.processed_rows, time.monotonic()
+
+        with self.open_file() as file, open(self.error_file_path, 'a+', encoding='utf-8', newline='') as error_file:
+            error_file.truncate(self.error_file_size)
+            error_file.seek(self.error_file_size)
+            writer = csv.writer(error_file)
+            if not self.error_file_size:
+                writer.writerow(IMPORT_ERROR_HEADERS + list(view.HEADER_MAP))
+
+            reader = view.read_csv(file)
+            rows = itertools.islice(view.iter_rows(reader, view.normalize_header), self.processed_rows, None)
+            for chunk in view.iter_chunks(rows):
+                errors = []
+                with transaction.atomic():
+                    objects = view.validate_chunk(chunk, existing, request, errors)
+                    counts = view.save_objects(objects)
+
+                    # エラー行（行データは日本語ヘッダの順で出力）
+                    chunk_rows = dict(chunk)
+                    for error in errors:
+                        idx, message = split_row_error(error)
+                        row = chunk_rows.get(idx, {})
+                        writer.writerow([idx, message] + [row.get(key, '') for key in view.HEADER_MAP.values()])
+                    error_file.flush()
+
+                    self.processed_rows += len(chunk)
+                    self.imported_rows += counts['inserted']
+                    self.updated_rows += counts.get('updated', 0)
+                    self.unchanged_rows += counts.get('unchanged', 0)
+                    self.error_rows += len(errors)
+                    self.error_file_size = error_file.tell()
+                    self.rows_per_second = (self.processed_rows - start_rows) / max(time.monotonic() - start_time, 0.001)
+                    self.save(update_fields=[
+                        'processed_rows', 'imported_rows', 'updated_rows', 'unchanged_rows', 'error_rows',
+                        'error_file_size', 'rows_per_second', 'updated_at',
+                    ])
+
+        self.status = 'done'
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'finished_at', 'updated_at'])
+
+    def run_staged(self, view, request):
+        '''
+        ステージングテーブル経由で検証・登録（エラーのない行のみ登録し、エラー行はエラーファイルに出力）
+        - 登録・エラーファイル・処理件数を1トランザクションでコミット（中断した場合は最初からやり直し）
+        - 更新日時が古くなっても他のワーカーが取得しないよう、処理中はジョブの行をロック（claim_import_job は SKIP LOCKED）
+        '''
+        with transaction.atomic():
+            ImportJob.objects.select_for_update().filter(pk=self.pk).first()
+            with self.open_file() as file:
+                rows = view.iter_rows(view.read_csv(file), view.normalize_header)
+                ids, errors = view.stage_rows(rows, request, skip_errors=True)
+            messages = dict(split_row_error(error) for error in errors)
+
+            # エラー行の行データはファイルを読み直して出力（行データは日本語ヘッダの順で出力）
+            with self.open_file() as file, open(self.error_file_path, 'w', encoding='utf-8', newline='') as error_file:
+                writer = csv.writer(error_file)
+                writer.writerow(IMPORT_ERROR_HEADERS + list(view.HEADER_MAP))
+                if messages:
+                    for idx, row in view.iter_rows(view.read_csv(file), view.normalize_header):
+                        if idx in messages:
+                            writer.writerow([idx, messages[idx]] + [row.get(key, '') for key in view.HEADER_MAP.values()])
+                self.error_file_size = error_file.tell()
+
+            started_at = self.started_at or timezone.now()
+            self.processed_rows = self.total_rows
+            self.imported_rows = len(ids)
+            self.error_rows = len(errors)
+            self.rows_per_second = self.processed_rows / max((timezone.now() - started_at).total_seconds(), 0.001)
+            self.status = 'done'
+            self.finished_at = timezone.now()
+            self.save(update_fields=[
+                'processed_rows', 'imported_rows', 'error_rows', 'error_file_size', 'rows_per_second',
+                'status', 'finished_at', 'updated_at',
+            ])
+
+    def delete_file(self):
+        '''アップロードファイル・エラーファイルを削除'''
+        for path in (self.file_path, self.error_file_path):
+            if path:
+                Path(path).unlink(missing_ok=True)
+
+
+def split_row_error(error):
+    '''
+    インポートのエラーメッセージ「N行目: 内容」を (行番号, 内容) に分割
+    - 行番号のないメッセージは (None, メッセージ)
+    '''
+    idx, separator, message = error.partition('行目: ')
+    if separator and idx.isdigit():
+        return int(idx), message
+    return None, error
+
+
+def claim_import_job():
+    '''
+    待機中のジョブ、または中断されたジョブ（IMPORT_JOB_STALE_SECONDS 以上更新のない実行中のジョブ）を1件取得して実行中にする
+    - 複数ワーカーで同じジョブを取得しないよう行ロック（SKIP LOCKED）
+    '''
+    stale = timezone.now() - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS)
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='running', updated_at__lt=stale))
+            .order_by('id')
+            .first()
+        )
+        if job:
+            job.status = 'running'
+            job.started_at = job.started_at or timezone.now()
+            job.save(update_fields=['status', 'started_at', 'updated_at'])
+    return job
+
+
+def purge_import_jobs():
+    '''保存期間（IMPORT_JOB_RETENTION_DAYS）を過ぎたジョブとファイルを削除'''
+    expired = ImportJob.objects.filter(
+        created_at__lt=timezone.now() - timedelta(days=settings.IMPORT_JOB_RETENTION_DAYS)
+    )
+    for job in expired:
+        job.delete_file()
+    return expired.delete()[0]
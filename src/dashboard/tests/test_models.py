@@ -0,0 +1,132 @@
+from django.test import TestCase, override_settings
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from dashboard.models import ExportJob, claim_export_job, purge_export_jobs
+from product_mst.models import Product
+from tenant_mst.models import Tenant
+from datetime import timedelta
+from pathlib import Path
+import tempfile
+
+User = get_user_model()
+
+
+class ExportJobModelTests(TestCase):
+    '''エクスポートジョブ 単体テスト'''
+
+    def setUp(self):
+        '''共通データ作成'''
+        call_command('loaddata', 'test_tenants.json')
+        call_command('loaddata', 'test_registers.json')
+        call_command('loaddata', 'test_product_categories.json')
+        call_command('loaddata', 'test_products.json')
+
+        self.user = User.objects.get(pk=3)
+        self.tenant = Tenant.objects.get(pk=1)
+
+    def _create_job(self, **kwargs):
+        '''商品マスタのCSV出力ジョブを作成'''
+        kwargs.setdefault('view_name', 'product_mst:export_csv')
+        return ExportJob.objects.create(tenant=self.tenant, create_user=self.user, update_user=self.user, **kwargs)
+
+    def _make_stale(self, job):
+        '''更新が途絶えた状態にする'''
+        ExportJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=settings.EXPORT_JOB_STALE_SECONDS + 1)
+        )
+
+    #----------------
+    # 実行
+    #----------------
+    def test_1_1_1_1(self):
+        '''ジョブの実行（正常系：作成者のテナント・検索条件でファイルを出力）'''
+        job = self._create_job(query_string='search_product_name=商品001')
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(EXPORT_JOB_DIR=directory):
+            job.run()
+            job.refresh_from_db()
+
+            self.assertEqual(job.status, 'done')
+            self.assertEqual(job.progress, 100)
+            self.assertEqual((job.total_rows, job.processed_rows), (1, 1))
+
+            # 保存先：EXPORT_JOB_DIR/<テナントID>/<ジョブID>_<ファイル名>
+            path = Path(job.file_path)
+            self.assertEqual(path.parent, Path(directory) / str(self.tenant.pk))
+            self.assertEqual(path.name, f'{job.pk}_{job.file_name}')
+            lines = path.read_bytes().decode('utf-8-sig').splitlines()
+
+        self.assertEqual(len(lines), 2)
+        self.assertIn('商品001', lines[1])
+
+    def test_1_1_1_2(self):
+        '''ジョブの実行（正常系：出力件数上限を適用しない）'''
+        job = self._create_job()
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(EXPORT_JOB_DIR=directory, MAX_EXPORT_ROWS=2):
+            job.run()
+            job.refresh_from_db()
+            count = Product.objects.filter(tenant=self.tenant, is_deleted=False).count()
+            self.assertEqual((job.total_rows, job.processed_rows), (count, count))
+
+    #----------------
+    # ジョブの取得
+    #----------------
+    def test_2_1_1_1(self):
+        '''ジョブの取得（正常系：待機中のジョブを古い順に実行中にする）'''
+        job1, job2 = self._create_job(), self._create_job()
+
+        claimed = claim_export_job()
+        self.assertEqual(claimed.pk, job1.pk)
+        self.assertEqual(claimed.status, 'running')
+        self.assertIsNotNone(claimed.started_at)
+
+        self.assertEqual(claim_export_job().pk, job2.pk)
+        self.assertIsNone(claim_export_job())
+
+    def test_2_1_1_2(self):
+        '''ジョブの取得（正常系：更新が途絶えた実行中のジョブを途中のファイルを破棄して再実行）'''
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'partial.csv'
+            path.write_bytes(b'partial')
+            job = self._create_job(status='running', processed_rows=5, file_path=str(path))
+            self._make_stale(job)
+
+            claimed = claim_export_job()
+            self.assertEqual(claimed.pk, job.pk)
+            self.assertEqual((claimed.status, claimed.processed_rows), ('running', 0))
+            self.assertFalse(path.exists())
+
+        # 再取得した時点で更新日時が新しくなるため、他のワーカーは取得しない
+        self.assertIsNone(claim_export_job())
+
+    def test_2_1_1_3(self):
+        '''ジョブの取得（正常系：更新中の実行中・完了・エラーのジョブは取得しない）'''
+        self._create_job(status='running')
+        for status in ('done', 'failed'):
+            self._make_stale(self._create_job(status=status))
+
+        self.assertIsNone(claim_export_job())
+
+    #----------------
+    # 保存期間
+    #----------------
+    def test_3_1_1_1(self):
+        '''保存期間（正常系：期限切れのジョブと出力ファイルを削除）'''
+        with tempfile.TemporaryDirectory() as directory:
+            expired_path, current_path = Path(directory) / 'expired.csv', Path(directory) / 'current.csv'
+            expired_path.write_bytes(b'expired')
+            current_path.write_bytes(b'current')
+            expired = self._create_job(status='done', file_path=str(expired_path))
+            current = self._create_job(status='done', file_path=str(current_path))
+            ExportJob.objects.filter(pk=expired.pk).update(
+                created_at=timezone.now() - timedelta(days=settings.EXPORT_JOB_RETENTION_DAYS, seconds=1)
+            )
+
+            self.assertEqual(purge_export_jobs(), 1)
+            self.assertFalse(expired_path.exists())
+            self.assertTrue(current_path.exists())
+
+        self.assertEqual(list(ExportJob.objects.values_list('pk', flat=True)), [current.pk])
@@ -0,0 +1,234 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import resolve, reverse
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from dashboard.models import ExportJob, rebuild_search_index
+from dashboard.views import has_view_permission
+from sales_order.models import SalesOrder
+from tenant_mst.models import Tenant
+from unittest import mock
+import io
+import json
+import tempfile
+
+User = get_user_model()
+
+
+class SearchViewTests(TestCase):
+    '''横断検索 単体テスト'''
+
+    def setUp(self):
+        '''共通データ作成'''
+        # テストクライアント生成
+        self.client = Client()
+
+        # テストデータ投入
+        call_command('loaddata', 'test_tenants.json')
+        call_command('loaddata', 'test_registers.json')
+        call_command('loaddata', 'test_partners.json')
+        call_command('loaddata', 'test_product_categories.json')
+        call_command('loaddata', 'test_products.json')
+
+        # 基本は更新ユーザーで実施
+        self.user = User.objects.get(pk=3)
+        self.tenant = Tenant.objects.get(pk=1)
+        self.client.login(email='editor@example.com', password='pass')
+
+        # 受注：担当者が自分／他人（参照権限なし）／他人（全社参照可）
+        self.own_order = self._create_order('SO-2026-000001', assignee=self.user)
+        self.hidden_order = self._create_order('SO-2026-000002', assignee=User.objects.get(pk=2))
+        self.public_order = self._create_order('SO-2026-000003', assignee=User.objects.get(pk=2), is_visible_all=True)
+
+        # フィクスチャはシグナルで索引されないため再作成
+        rebuild_search_index()
+
+    def _create_order(self, sales_order_no, **kwargs):
+        '''受注を作成'''
+        return SalesOrder.objects.create(
+            tenant=self.tenant,
+            sales_order_no=sales_order_no,
+            partner_id=1,
+            create_user=self.user,
+            update_user=self.user,
+            **kwargs,
+        )
+
+    def _search(self, **params):
+        '''横断検索を実行し、(種別, ID) の一覧を返す'''
+        response = self.client.get(reverse('dashboard:search'), params)
+        self.assertEqual(response.status_code, 200)
+        return [(r['type'], r['id']) for r in json.loads(response.content)['results']]
+
+    #----------------
+    # SearchView
+    #----------------
+    def test_1_1_1_1(self):
+        '''横断検索（正常系：参照できない受注は含めない）'''
+        results = self._search(q='so-2026')
+
+        self.assertCountEqual(results, [('sales_order', self.own_order.pk), ('sales_order', self.public_order.pk)])
+
+    def test_1_1_1_2(self):
+        '''横断検索（正常系：参照ユーザーに指定された受注は含める）'''
+        self.hidden_order.reference_users.add(self.user)
+        results = self._search(q='so-2026')
+
+        self.assertIn(('sales_order', self.hidden_order.pk), results)
+
+    def test_1_1_1_3(self):
+        '''横断検索（正常系：他テナントのデータは含めない）'''
+        results = self._search(q='user')
+
+        self.assertNotIn(('user', 5), results)
+        self.assertTrue(all(User.objects.get(pk=pk).tenant_id == 1 for _, pk in results))
+
+    def test_1_1_2_1(self):
+        '''横断検索（正常系：更新権限はシステム権限ユーザーを含めない）'''
+        results = self._search(q='_user', type='user')
+
+        self.assertCountEqual(results, [('user', 2), ('user', 3), ('user', 4)])
+
+    def test_1_1_2_2(self):
+        '''横断検索（正常系：参照権限はユーザーを含めない）'''
+        self.client.login(email='viewer@example.com', password='pass')
+        results = self._search(q='user')
+
+        self.assertFalse([r for r in results if r[0] == 'user'])
+
+    def test_1_1_2_3(self):
+        '''横断検索（正常系：システム権限はシステム権限ユーザーを含める）'''
+        self.client.login(email='system@example.com', password='pass')
+        results = self._search(q='_user', type='user')
+
+        self.assertCountEqual(results, [('user', 1), ('user', 2), ('user', 3), ('user', 4)])
+
+    def test_1_1_3_1(self):
+        '''横断検索（正常系：種別の絞り込み）'''
+        # 種別指定なし：商品・ユーザーの両方が該当
+        self.user.username = '商品担当'
+        self.user.save()
+        results = self._search(q='商品')
+        self.assertEqual({t for t, _ in results}, {'product', 'user'})
+
+        # 1種別
+        results = self._search(q='商品', type='product')
+        self.assertTrue(results)
+        self.assertEqual({t for t, _ in results}, {'product'})
+
+        # 複数種別
+        results = self._search(q='so-2026', type=['user', 'sales_order'])
+        self.assertEqual({t for t, _ in results}, {'sales_order'})
+
+        # 該当なしの種別
+        self.assertEqual(self._search(q='商品', type='partner'), [])
+
+    def test_1_1_4_1(self):
+        '''横断検索（正常系：キーワード未入力）'''
+        self.assertEqual(self._search(q=' '), [])
+
+
+class ExportJobViewTests(TestCase):
+    '''エクスポートジョブ 単体テスト'''
+
+    def setUp(self):
+        '''共通データ作成'''
+        # テストクライアント生成
+        self.client = Client()
+
+        # テストデータ投入
+        call_command('loaddata', 'test_tenants.json')
+        call_command('loaddata', 'test_registers.json')
+        call_command('loaddata', 'test_product_categories.json')
+        call_command('loaddata', 'test_products.json')
+
+        # 基本は更新ユーザーで実施
+        self.user = User.objects.get(pk=3)
+        self.client.login(email='editor@example.com', password='pass')
+
+    def _create_job(self, action, query=''):
+        '''エクスポートジョブを登録'''
+        return self.client.post(reverse('dashboard:export_job_create'), {'action': action, 'query': query})
+
+    def test_2_1_1_1(self):
+        '''ジョブ登録（正常系：出力ビュー・検索条件・作成者を保存）'''
+        response = self._create_job(reverse('product_mst:export_csv'), 'search_product_name=商品001')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+
+        job = ExportJob.objects.get(pk=data['id'])
+        self.assertEqual(data['status_url'], reverse('dashboard:export_job_status', kwargs={'pk': job.pk}))
+        self.assertEqual(job.view_name, 'product_mst:export_csv')
+        self.assertEqual(job.query_string, 'search_product_name=商品001')
+        self.assertEqual((job.status, job.tenant_id, job.create_user_id), ('pending', 1, self.user.pk))
+
+    def test_2_1_1_2(self):
+        '''ジョブ登録（異常系：出力ビュー以外・存在しないURL）'''
+        for action in (reverse('product_mst:list'), reverse('dashboard:export_job_create'), '/not_found/', ''):
+            with self.subTest(action=action):
+                response = self._create_job(action)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(json.loads(response.content)['error'], '出力対象が不正です。')
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_2_1_1_3(self):
+        '''ジョブ登録（異常系：出力ビューの権限なし）'''
+        with mock.patch('dashboard.views.has_view_permission', return_value=False):
+            response = self._create_job(reverse('product_mst:export_csv'))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_2_1_2_1(self):
+        '''ビューの権限チェック（ログイン・権限Mixinの判定結果を返す）'''
+        match = resolve(reverse('register:list'))
+        self.assertTrue(has_view_permission(match, self.user))
+        self.assertFalse(has_view_permission(match, User.objects.get(pk=4)))
+
+        match = resolve(reverse('product_mst:export_csv'))
+        self.assertTrue(has_view_permission(match, User.objects.get(pk=4)))
+
+    def test_2_1_3_1(self):
+        '''ジョブ実行（正常系：ワーカーで出力し、進捗確認・ダウンロード）'''
+        response = self._create_job(reverse('product_mst:export_csv'), 'search_product_name=商品001')
+        status_url = json.loads(response.content)['status_url']
+
+        # 実行前
+        data = json.loads(self.client.get(status_url).content)
+        self.assertEqual((data['status'], data['progress']), ('pending', 0))
+        self.assertNotIn('download_url', data)
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(EXPORT_JOB_DIR=directory):
+            call_command('run_export_worker', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+
+            data = json.loads(self.client.get(status_url).content)
+            self.assertEqual((data['status'], data['progress']), ('done', 100))
+            self.assertEqual((data['total_rows'], data['processed_rows']), (1, 1))
+
+            response = self.client.get(data['download_url'])
+            self.assertEqual(response.status_code, 200)
+            content = b''.join(response.streaming_content).decode('utf-8-sig')
+            self.assertIn('商品001', content)
+
+            # 作成者以外はダウンロード・進捗確認不可
+            self.client.login(email='manager@example.com', password='pass')
+            self.assertEqual(self.client.get(data['download_url']).status_code, 404)
+            self.assertEqual(self.client.get(status_url).status_code, 404)
+
+    def test_2_1_3_2(self):
+        '''ジョブ実行（異常系：出力に失敗したジョブはエラーにしてファイルを残さない）'''
+        response = self._create_job(reverse('product_mst:export_csv'))
+        status_url = json.loads(response.content)['status_url']
+
+        stderr = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory, override_settings(EXPORT_JOB_DIR=directory), \
+                mock.patch('product_mst.views.ExportCSV.write_file', side_effect=RuntimeError('disk full')), \
+                self.assertLogs('dashboard.management.commands.run_export_worker', level='ERROR'):
+            call_command('run_export_worker', '--once', stdout=io.StringIO(), stderr=stderr)
+
+        job = ExportJob.objects.get()
+        self.assertEqual((job.status, job.error_message), ('failed', 'disk full'))
+        self.assertIsNotNone(job.finished_at)
+        self.assertIn('出力に失敗しました', stderr.getvalue())
+
+        data = json.loads(self.client.get(status_url).content)
+        self.assertEqual(data['error'], 'ファイルの出力に失敗しました。')
+        self.assertEqual(self.client.get(reverse('dashboard:export_job_download', kwargs={'pk': job.pk})).status_code, 404)
@@ -5,4 +5,11 @@ app_name = 'dashboard'
 
 urlpatterns = [
     path('', views.DashboardView.as_view(), name='top'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('export_jobs/create/', views.ExportJobCreateView.as_view(), name='export_job_create'),
+    path('export_jobs/<int:pk>/', views.ExportJobStatusView.as_view(), name='export_job_status'),
+    path('export_jobs/<int:pk>/download/', views.ExportJobDownloadView.as_view(), name='export_job_download'),
+    path('import_jobs/create/', views.ImportJobCreateView.as_view(), name='import_job_create'),
+    path('import_jobs/<int:pk>/', views.ImportJobStatusView.as_view(), name='import_job_status'),
+    path('import_jobs/<int:pk>/errors/', views.ImportJobErrorsView.as_view(), name='import_job_errors'),
 ]
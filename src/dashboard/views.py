@@ -1,5 +1,284 @@
+from pathlib import Path
 from django.views import generic
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpRequest, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import Resolver404, resolve, reverse
+from django.utils.http import content_disposition_header
+from django.conf import settings
+from django.db import transaction
+from config.base import CSVExportBaseView, CSVImportBaseView, ExcelExportBaseView
+from config.common import Common
+from register.constants import PRIVILEGE_EDITOR, PRIVILEGE_SYSTEM
+from register.models import CustomUser
+from sales_order.models import SalesOrder
+from sales_order.services import filter_visible
+from .models import ExportJob, ImportJob, SearchEntry
+
+
+# 横断検索の最大件数
+SEARCH_RESULT_LIMIT = 20
+
+# 種別ごとの遷移先（更新画面）
+ENTITY_URL_NAMES = {
+    'product': 'product_mst:update',
+    'partner': 'partner_mst:update',
+    'sales_order': 'sales_order:update',
+    'user': 'register:update',
+}
+
 
 class DashboardView(LoginRequiredMixin, generic.TemplateView):
-    template_name = 'dashboard/index.html'
\ No newline at end of file
+    template_name = 'dashboard/index.html'
+
+
+class SearchView(LoginRequiredMixin, generic.View):
+    '''
+    横断検索（商品・取引先・受注・ユーザー）
+    - 検索インデックスのトライグラム索引で部分一致検索し、類似度順に返す
+    - type パラメータで種別を絞り込み可能
+    '''
+    def get(self, request):
+        keyword = Common.normalize_search_text((request.GET.get('q') or '').strip())
+        if not keyword:
+            return JsonResponse({'results': []})
+
+        entries = SearchEntry.objects.filter(tenant=request.user.tenant, search_text__contains=keyword)
+
+        entity_types = request.GET.getlist('type')
+        if entity_types:
+            entries = entries.filter(entity_type__in=entity_types)
+
+        entries = filter_accessible(entries, request.user).annotate(
+            rank=TrigramWordSimilarity(keyword, 'search_text')
+        ).order_by('-rank', 'title', 'id')
+
+        results = [
+            {
+                'type': entry.entity_type,
+                'type_label': entry.get_entity_type_display(),
+                'id': entry.object_id,
+                'title': entry.title,
+                'subtitle': entry.subtitle,
+                'url': reverse(ENTITY_URL_NAMES[entry.entity_type], kwargs={'pk': entry.object_id}),
+            }
+            for entry in entries[:SEARCH_RESULT_LIMIT]
+        ]
+        return JsonResponse({'results': results})
+
+
+def filter_accessible(entries, user):
+    '''
+    ログインユーザーが参照可能な検索結果に絞り込む
+    - 受注: 担当者・全社参照可・参照権限のあるもののみ
+    - ユーザー: 編集権限以上のみ（システム権限ユーザーはシステム権限のみ）
+    '''
+    visible_orders = filter_visible(SalesOrder.objects.filter(tenant=user.tenant), user).values('id')
+    entries = entries.exclude(Q(entity_type='sales_order') & ~Q(object_id__in=visible_orders))
+
+    if int(user.privilege) > int(PRIVILEGE_EDITOR):
+        entries = entries.exclude(entity_type='user')
+    elif user.privilege != PRIVILEGE_SYSTEM:
+        system_users = CustomUser.objects.filter(tenant=user.tenant, privilege=PRIVILEGE_SYSTEM).values('id')
+        entries = entries.exclude(entity_type='user', object_id__in=system_users)
+    return entries
+
+
+#--------------------------
+# エクスポートジョブ
+#--------------------------
+class ExportJobCreateView(LoginRequiredMixin, generic.View):
+    '''
+    エクスポートジョブの登録
+    - action: 出力ビューのURL（CSV/Excel出力ビューのみ）、query: 検索条件のクエリ文字列
+    '''
+    def post(self, request):
+        try:
+            match = resolve(request.POST.get('action') or '')
+        except Resolver404:
+            return JsonResponse({'error': '出力対象が不正です。'}, status=400)
+
+        view_class = getattr(match.func, 'view_class', None)
+        if not (view_class and issubclass(view_class, (CSVExportBaseView, ExcelExportBaseView))):
+            return JsonResponse({'error': '出力対象が不正です。'}, status=400)
+
+        # 出力ビューの権限チェック（ログイン・権限Mixinのみを通すため OPTIONS で呼び出し）
+        if not has_view_permission(match, request.user):
+            return JsonResponse({'error': 'アクセス権限がありません。'}, status=403)
+
+        job = ExportJob.objects.create(
+            tenant=request.user.tenant,
+            view_name=match.view_name,
+            query_string=request.POST.get('query', ''),
+            create_user=request.user,
+            update_user=request.user,
+        )
+        return JsonResponse({
+            'id': job.pk,
+            'status_url': reverse('dashboard:export_job_status', kwargs={'pk': job.pk}),
+        })
+
+
+class ExportJobStatusView(LoginRequiredMixin, generic.View):
+    '''エクスポートジョブの進捗（ポーリング用）'''
+    def get(self, request, pk):
+        job = get_object_or_404(ExportJob, pk=pk, create_user=request.user, tenant=request.user.tenant)
+        data = {
+            'id': job.pk,
+            'status': job.status,
+            'status_label': job.get_status_display(),
+            'total_rows': job.total_rows,
+            'processed_rows': job.processed_rows,
+            'progress': job.progress,
+        }
+        if job.status == 'done':
+            data['download_url'] = reverse('dashboard:export_job_download', kwargs={'pk': job.pk})
+        if job.status == 'failed':
+            data['error'] = 'ファイルの出力に失敗しました。'
+        return JsonResponse(data)
+
+
+class ExportJobDownloadView(LoginRequiredMixin, generic.View):
+    '''完了したエクスポートジョブのファイルをダウンロード'''
+    def get(self, request, pk):
+        job = get_object_or_404(ExportJob, pk=pk, create_user=request.user, tenant=request.user.tenant, status='done')
+        try:
+            file = open(job.file_path, 'rb')
+        except OSError:
+            raise Http404('出力ファイルが見つかりません。')
+        return FileResponse(file, as_attachment=True, filename=job.file_name)
+
+
+def has_view_permission(match, user):
+    '''
+    URLの解決結果のビューにアクセスできるか
+    - ログイン・権限Mixinのみを通すため OPTIONS で呼び出し
+    '''
+    check = HttpRequest()
+    check.method = 'OPTIONS'
+    check.user = user
+    return match.func(check, *match.args, **match.kwargs).status_code == 200
+
+
+#--------------------------
+# インポートジョブ
+#--------------------------
+class ImportJobCreateView(LoginRequiredMixin, generic.View):
+    '''
+    インポートジョブの登録
+    - action: インポートビューのURL、file: CSVファイル、chunk_size: コミット単位の件数（任意）、mode: インポートモード（任意）
+    - 拡張子・ファイルサイズ・ヘッダは登録時に検証し、行の検証・登録はワーカーで実行
+    '''
+    def post(self, request):
+        try:
+            match = resolve(request.POST.get('action') or '')
+        except Resolver404:
+            return JsonResponse({'error': '取込対象が不正です。'}, status=400)
+
+        view_class = getattr(match.func, 'view_class', None)
+        if not (view_class and issubclass(view_class, CSVImportBaseView) and view_class.import_job_enabled):
+            return JsonResponse({'error': '取込対象が不正です。'}, status=400)
+
+        if not has_view_permission(match, request.user):
+            return JsonResponse({'error': 'アクセス権限がありません。'}, status=403)
+
+        try:
+            chunk_size = int(request.POST.get('chunk_size') or settings.IMPORT_JOB_CHUNK_SIZE)
+        except ValueError:
+            chunk_size = 0
+        if chunk_size < 1:
+            return JsonResponse({'error': 'コミット単位の件数が不正です。'}, status=400)
+
+        file = request.FILES.get('file')
+        if not file:
+            return JsonResponse({'error': 'ファイルが選択されていません'}, status=400)
+
+        view = view_class()
+        view.setup(request, *match.args, **match.kwargs)
+        error = view.check_file(file) or view.set_import_mode(request.POST.get('mode'))
+        if error:
+            return error
+
+        with transaction.atomic():
+            job = ImportJob.objects.create(
+                tenant=request.user.tenant,
+                view_name=match.view_name,
+                mode=view.import_mode,
+                chunk_size=chunk_size,
+                file_name=file.name,
+                create_user=request.user,
+                update_user=request.user,
+            )
+            job.save_file(file)
+
+            # 保存したファイルでヘッダを検証
+            with job.open_file() as saved:
+                error = view.check_headers(view.read_csv(saved))
+            if error:
+                job.delete_file()
+                transaction.set_rollback(True)
+                return error
+
+        return JsonResponse({
+            'id': job.pk,
+            'status_url': reverse('dashboard:import_job_status', kwargs={'pk': job.pk}),
+        })
+
+
+class ImportJobStatusView(LoginRequiredMixin, generic.View):
+    '''インポートジョブの進捗（ポーリング用）'''
+    def get(self, request, pk):
+        job = get_object_or_404(ImportJob, pk=pk, create_user=request.user, tenant=request.user.tenant)
+        data = {
+            'id': job.pk,
+            'status': job.status,
+            'status_label': job.get_status_display(),
+            'total_rows': job.total_rows,
+            'processed_rows': job.processed_rows,
+            'imported_rows': job.imported_rows,
+            'updated_rows': job.updated_rows,
+            'unchanged_rows': job.unchanged_rows,
+            'error_rows': job.error_rows,
+            'rows_per_second': round(job.rows_per_second, 1),
+            'progress': job.progress,
+        }
+        if job.error_rows:
+            data['error_file_url'] = reverse('dashboard:import_job_errors', kwargs={'pk': job.pk})
+        if job.status == 'done':
+            view = job.build_view(request)
+            data['message'] = view.get_result_message({
+                'inserted': job.imported_rows, 'updated': job.updated_rows, 'unchanged': job.unchanged_rows,
+            })
+            if job.error_rows:
+                data['message'] += f'（エラー {job.error_rows}件）'
+        if job.status == 'failed':
+            data['error'] = 'ファイルの取込に失敗しました。'
+        return JsonResponse(data)
+
+
+class ImportJobErrorsView(LoginRequiredMixin, generic.View):
+    '''
+    インポートジョブのエラーファイル（CSV）をダウンロード
+    - 実行中・中断したジョブでもコミット済みのチャンクの範囲のみ返す
+    '''
+    def get(self, request, pk):
+        job = get_object_or_404(ImportJob, pk=pk, create_user=request.user, tenant=request.user.tenant)
+        try:
+            file = open(job.error_file_path, 'rb')
+        except OSError:
+            raise Http404('エラーファイルが見つかりません。')
+
+        def read_committed(size=job.error_file_size, block=64 * 1024):
+            with file:
+                while size > 0:
+                    data = file.read(min(block, size))
+                    if not data:
+                        break
+                    size -= len(data)
+                    yield data
+
+        response = StreamingHttpResponse(read_committed(), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = content_disposition_header(True, f'{Path(job.file_name).stem}_errors.csv')
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('login', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['tenant', 'access_at', 'username', 'id'], name='idx_access_log_access_at'),
+        ),
+    ]
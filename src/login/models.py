@@ -25,6 +25,9 @@ class AccessLog(BaseModel):
     class Meta:
         app_label = 'login'
         ordering = ['access_at', 'username']
+        indexes = [
+            models.Index(fields=['tenant', 'access_at', 'username', 'id'], name='idx_access_log_access_at'),
+        ]
 
     username = models.CharField(max_length=50, verbose_name='ユーザーコード')
     ip=models.CharField(max_length=255, validators=[validate_ip], verbose_name='IPアドレス')
@@ -1,4 +1,4 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib import messages
@@ -6,6 +6,10 @@ from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
 from tenant_mst.models import Tenant
+from login.models import AccessLog
+from login.views import AccessLogListView
+from django.utils import timezone
+from datetime import timedelta
 from bs4 import BeautifulSoup
 
 User = get_user_model()
@@ -230,3 +234,81 @@ class PasswordResetCompleteViewTests(TestCase):
         response = self.client.get(reverse('login:password_reset_complete'))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'login/password_reset_complete.html')
+
+
+class AccessLogListViewTests(TestCase):
+    """AccessLogListView関連テスト（キーセットページング）"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        # テナント・ユーザー作成
+        self.tenant = Tenant.objects.create(
+            tenant_name='テストテナント',
+            representative_name='代表者テスト',
+            email='tenant@example.com'
+        )
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123',
+            privilege=1,
+            tenant=self.tenant,
+        )
+
+        # アクセス履歴作成（同一日時・同一ユーザーを含む）
+        base = timezone.now().replace(microsecond=0)
+        for i in range(120):
+            log = AccessLog.objects.create(
+                tenant=self.tenant,
+                username=f'user_{i % 3}',
+                ip='0.0.0.0',
+                access_type='login',
+                create_user=self.user,
+                update_user=self.user,
+            )
+            AccessLog.objects.filter(pk=log.pk).update(access_at=base + timedelta(minutes=i % 10))
+
+    def _get_page(self, **params):
+        """キーセットページングでページを取得"""
+        request = self.factory.get('/', {'paging': 'keyset', **params})
+        request.user = self.user
+        view = AccessLogListView()
+        view.setup(request)
+        _, page, _, _ = view.paginate_queryset(view.get_queryset(), view.paginate_by)
+        return page
+
+    def test_1_7_1_1(self):
+        """1-7-1-1: 正常系 次ページを辿ると既定の並び順（アクセス日時・ユーザーコード・ID）で全件取得"""
+        pages = [self._get_page()]
+        while pages[-1].has_next():
+            pages.append(self._get_page(after=pages[-1].next_cursor))
+
+        self.assertEqual([len(page) for page in pages], [50, 50, 20])
+        self.assertFalse(pages[0].has_previous())
+        self.assertFalse(pages[-1].has_next())
+
+        expected = list(
+            AccessLog.objects.filter(tenant=self.tenant).order_by('access_at', 'username', 'id').values_list('pk', flat=True)
+        )
+        self.assertEqual([log.pk for page in pages for log in page], expected)
+
+    def test_1_7_1_2(self):
+        """1-7-1-2: 正常系 前ページへの移動"""
+        first = self._get_page()
+        second = self._get_page(after=first.next_cursor)
+
+        page = self._get_page(before=second.previous_cursor)
+        self.assertEqual([log.pk for log in page], [log.pk for log in first])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_1_7_2_1(self):
+        """1-7-2-1: 異常系 改ざんされたカーソルは先頭ページとして扱う"""
+        first = self._get_page()
+        cursor = first.next_cursor
+        tampered = cursor[:-1] + ('A' if cursor[-1] != 'A' else 'B')
+
+        page = self._get_page(after=tampered)
+        self.assertEqual([log.pk for log in page], [log.pk for log in first])
+        self.assertFalse(page.has_previous())
@@ -6,6 +6,7 @@ from django.views import generic
 from .models import AccessLog
 from .const import *
 from config.common import Common
+from config.base import KeysetPaginationMixin
 from datetime import datetime
 from django.http import HttpResponse
 from openpyxl import Workbook
@@ -110,7 +111,7 @@ class PasswordResetComplete(PasswordResetCompleteView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-class AccessLogListView(generic.ListView):
+class AccessLogListView(KeysetPaginationMixin, generic.ListView):
     model = AccessLog
     context_object_name = 'access_logs'
     template_name = 'login/index.html'
@@ -165,7 +166,7 @@ class ExportExcel(generic.TemplateView):
         # 出力ファイル名を設定
         file_name = f'access_log_{datetime.now().replace(microsecond=0)}.xlsx'
         # queryセットを取得
-        data = AccessLog.objects.all()
+        data = AccessLog.objects.select_related('create_user', 'update_user')
         # 検索条件を適用
         data = search_data(request=request, query_set=data)
         # Excel出力用のレスポンスを取得
@@ -198,7 +199,7 @@ class ExportCSV(generic.TemplateView):
         # 出力ファイル名を設定
         file_name = f'access_log_{datetime.now().replace(microsecond=0)}.csv'
         # queryセットを取得
-        data = AccessLog.objects.all()
+        data = AccessLog.objects.select_related('create_user', 'update_user')
         # 検索条件を適用
         data = search_data(request=request, query_set=data)
         # CSV出力用のレスポンスを取得
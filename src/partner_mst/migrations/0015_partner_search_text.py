@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:58
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partner_mst', '0014_alter_partner_postal_code'),
+        ('tenant_mst', '0005_rename_contact_email_tenant_email_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='partner',
+            name='search_text',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(django.db.models.functions.text.Concat(django.db.models.functions.comparison.Coalesce(models.F('partner_name'), models.Value('')), models.Value(' '), django.db.models.functions.comparison.Coalesce(models.F('partner_name_kana'), models.Value('')), models.Value(' '), django.db.models.functions.comparison.Coalesce(models.F('contact_name'), models.Value('')), models.Value(' '), django.db.models.functions.comparison.Coalesce(models.F('email'), models.Value('')), models.Value(' '), django.db.models.functions.comparison.Coalesce(models.F('tel_number'), models.Value('')), models.Value(' '), django.db.models.functions.comparison.Coalesce(models.F('postal_code'), models.Value('')), models.Value(' '), django.db.models.functions.comparison.Coalesce(models.F('state'), models.Value('')), models.Value(' '), django.db.models.functions.comparison.Coalesce(models.F('city'), models.Value('')), models.Value(' '), django.db.models.functions.comparison.Coalesce(models.F('address'), models.Value('')), models.Value(' '), django.db.models.functions.comparison.Coalesce(models.F('address2'), models.Value('')), output_field=models.TextField())), output_field=models.TextField(), verbose_name='検索用テキスト'),
+        ),
+        migrations.AddIndex(
+            model_name='partner',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='idx_partner_search_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
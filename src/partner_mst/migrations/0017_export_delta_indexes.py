@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partner_mst', '0016_normalize_partner_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='partner',
+            index=models.Index(fields=['tenant', 'updated_at', 'id'], name='idx_partner_updated_at'),
+        ),
+    ]
@@ -1,7 +1,16 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from config.base import BaseModel
+from config.common import Common
 from django.core.validators import RegexValidator
 
+# キーワード検索の対象カラム
+SEARCH_FIELDS = [
+    'partner_name', 'partner_name_kana', 'contact_name', 'email', 'tel_number',
+    'postal_code', 'state', 'city', 'address', 'address2',
+]
+
+
 class Partner(BaseModel):
     '''
     取引先マスタ
@@ -111,6 +120,14 @@ class Partner(BaseModel):
         help_text='建物名・部屋番号などを150文字以内で入力してください。（任意）'
     )
 
+    # キーワード検索用（DBで自動生成・正規化済み・トライグラム索引対象）
+    search_text = models.GeneratedField(
+        expression=Common.search_text_expression(SEARCH_FIELDS),
+        output_field=models.TextField(),
+        db_persist=True,
+        verbose_name='検索用テキスト',
+    )
+
     class Meta:
         verbose_name = '取引先'
         verbose_name_plural = '取引先マスタ'
@@ -121,6 +138,10 @@ class Partner(BaseModel):
                 name='unique_tenant_partner_email'
             )
         ]
+        indexes = [
+            GinIndex(fields=['search_text'], opclasses=['gin_trgm_ops'], name='idx_partner_search_trgm'),
+            models.Index(fields=['tenant', 'updated_at', 'id'], name='idx_partner_updated_at'),
+        ]
 
     def __str__(self):
         display_type = dict(self.PARTNER_TYPE_CHOICES).get(self.partner_type, '')
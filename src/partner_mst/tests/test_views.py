@@ -385,6 +385,37 @@ class PartnerViewTests(TestCase):
         # 21件目が2ページ目に含まれる
         self.assertTrue(any('テスト商事21' in p.partner_name for p in partners_page2))
 
+    def test_1_2_1_13(self):
+        '''プルダウン用検索（正常系: キーワード・区分で絞り込み）'''
+        url = reverse('partner_mst:search')
+
+        # キーワードは大文字・小文字を区別しない
+        response = self.client.get(url, {'q': 'ALPHA'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertTrue(results)
+        self.assertLessEqual(len(results), 20)
+        partners = Partner.objects.filter(pk__in=[r['id'] for r in results])
+        self.assertTrue(all(p.tenant_id == self.user.tenant_id for p in partners))
+        self.assertTrue(all('alpha' in p.email.lower() for p in partners))
+
+        # 区分指定
+        response = self.client.get(url, {'partner_type': 'supplier'})
+        ids = [r['id'] for r in response.json()['results']]
+        self.assertFalse(Partner.objects.filter(pk__in=ids).exclude(partner_type='supplier').exists())
+
+        # 該当なし
+        response = self.client.get(url, {'q': 'ZZZZZZZ'})
+        self.assertEqual(response.json()['results'], [])
+
+    def test_1_2_1_14(self):
+        '''検索処理（正常系: キーワードの全角半角・カタカナひらがなの違いを区別しない）'''
+        for key in ['ﾎｯｶｲﾄﾞｳ', 'ほっかいどう', 'ホッカイドウ']:
+            response = self.client.get(reverse('partner_mst:list'), {'search_keyword': key})
+            self.assertEqual(response.status_code, 200)
+            names = [p.partner_name for p in response.context['partners']]
+            self.assertEqual(names, ['北海道フーズ'], key)
+
 
     #----------------
     # CreateView
@@ -1503,7 +1534,7 @@ class PartnerViewTests(TestCase):
 
         # 文字コード確認
         try:
-            content = response.content.decode('utf-8')
+            content = b''.join(response.streaming_content).decode('utf-8')
         except UnicodeDecodeError:
             self.fail('CSVファイルの文字コードがutf-8ではありません。')
 
@@ -2058,6 +2089,55 @@ class PartnerViewTests(TestCase):
         self.assertLessEqual(abs((partner.created_at - timezone.now()).total_seconds()), 5)
         self.assertLessEqual(abs((partner.updated_at - timezone.now()).total_seconds()), 5)
 
+    def test_7_1_1_7(self):
+        '''CSVインポート（正常系：ステージングテーブル経由の取込）'''
+        from partner_mst.views import ImportCSV
+
+        url = reverse('partner_mst:import_csv')
+
+        # データを削除しておく
+        Partner.objects.all().delete()
+
+        # CSVファイルの作成
+        rows = [{
+            '取引先名称': '\tステージング株式会社　',
+            '取引先名称（カナ）': 'ステージングカブシキガイシャ',
+            '取引先区分': 'supplier',
+            '担当者名': '段階一郎',
+            'メールアドレス': ' staging@example.com ',
+            '電話番号': '03-1111-2222',
+            '郵便番号': '100-0001',
+            '都道府県': '東京都',
+            '市区町村': '千代田区',
+            '住所': '丸の内1-1-1',
+            '住所2': '',
+        }]
+        file = self._make_csv_file(rows)
+
+        # ファイルサイズに関係なくステージングテーブル経由で取込
+        ImportCSV.staging_threshold = 0
+        try:
+            response = self.client.post(url, {'file': file})
+        finally:
+            ImportCSV.staging_threshold = settings.IMPORT_STAGING_THRESHOLD
+        res_json = json.loads(response.content)
+
+        # ステータスコード確認
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual('1件をインポートしました。', res_json['message'])
+
+        # 登録値の確認（フォームの検証と同じく前後の空白を除去）
+        partner = Partner.objects.get()
+        self.assertEqual(partner.partner_name, 'ステージング株式会社')
+        self.assertEqual(partner.partner_type, 'supplier')
+        self.assertEqual(partner.email, 'staging@example.com')
+        self.assertEqual(partner.tel_number, '03-1111-2222')
+        self.assertIsNone(partner.address2)
+        self.assertEqual(partner.create_user, self.user)
+        self.assertEqual(partner.update_user, self.user)
+        self.assertEqual(partner.tenant, self.user.tenant)
+        self.assertLessEqual(abs((partner.created_at - timezone.now()).total_seconds()), 5)
+
     def test_7_1_2_1(self):
         '''CSVインポート（異常系：直リンク）'''
         self.client.logout()
@@ -2380,4 +2460,106 @@ class PartnerViewTests(TestCase):
         self.assertEqual('ファイルサイズが上限を超えています。', res_json['error'])
 
         # 件数確認
-        self.assertEqual(Partner.objects.count(), 0)
\ No newline at end of file
+        self.assertEqual(Partner.objects.count(), 0)
+
+    def test_7_1_2_11(self):
+        '''CSVインポート（異常系：ステージングテーブル経由でも通常の取込と同じエラー）'''
+        from partner_mst.views import ImportCSV
+
+        url = reverse('partner_mst:import_csv')
+
+        # データを削除しておく
+        Partner.objects.all().delete()
+        Partner.objects.create(
+            tenant=self.user.tenant, partner_name='登録済取引先', partner_type='customer',
+            email='exists@example.com', create_user=self.user, update_user=self.user,
+        )
+
+        # CSVファイルの作成
+        blank = {header: '' for header in HEADER_MAP}
+        rows = [
+            {**blank, '取引先区分': 'x', 'メールアドレス': 'invalid', '電話番号': 'abc', '郵便番号': '１２３'},
+            {**blank, '取引先名称': 'エラー取引先', '担当者名': 'c' * 51, 'メールアドレス': 'c@example.com', '電話番号': '0' * 21},
+            {**blank, '取引先名称': '登録済取引先', '取引先区分': 'customer', 'メールアドレス': 'exists@example.com'},
+            {**blank, '取引先名称': '重複取引先', '取引先区分': 'both', 'メールアドレス': 'dup@example.com'},
+            {**blank, '取引先名称': '重複取引先', '取引先区分': 'both', 'メールアドレス': 'dup@example.com'},
+            {**blank, '取引先名称': '区分不正', '取引先区分': ' customer', 'メールアドレス': 'e@example.com'},
+        ]
+
+        # 通常の取込・ステージングテーブル経由の取込で同じファイルを登録
+        responses = []
+        for threshold in (settings.IMPORT_STAGING_THRESHOLD, 0):
+            ImportCSV.staging_threshold = threshold
+            try:
+                responses.append(self.client.post(url, {'file': self._make_csv_file(rows)}))
+            finally:
+                ImportCSV.staging_threshold = settings.IMPORT_STAGING_THRESHOLD
+        expected, res_json = [json.loads(response.content) for response in responses]
+
+        # ステータスコード確認
+        self.assertEqual(responses[1].status_code, 400)
+
+        # エラーメッセージ確認（行番号・項目の順序・文言が通常の取込と一致）
+        self.assertEqual(expected, res_json)
+        self.assertEqual([
+            '2行目: 取引先名称: この項目は必須です。; 取引先区分: 正しく選択してください。 x は候補にありません。; '
+            'メールアドレス: 有効なメールアドレスを入力してください。; 電話番号: 数字とハイフンのみ使用できます。; '
+            '郵便番号: 郵便番号の形式が正しくありません。',
+            '3行目: 取引先区分: この項目は必須です。; '
+            '担当者名: この値は 50 文字以下でなければなりません( 51 文字になっています)。; '
+            '電話番号: この値は 20 文字以下でなければなりません( 21 文字になっています)。',
+            '4行目: 取引先名称＋メールアドレス「登録済取引先, exists@example.com」は既に存在します。',
+            '6行目: 取引先名称＋メールアドレス「重複取引先, dup@example.com」は既に存在します。',
+            '7行目: 取引先区分: 正しく選択してください。  customer は候補にありません。',
+        ], res_json['details'])
+
+        # 件数確認
+        self.assertEqual(Partner.objects.count(), 1)
+    def test_7_1_2_12(self):
+        '''CSVインポート（正常系：正規表現の検証はステージングテーブル経由でもPythonの判定と一致）'''
+        from django.core.validators import RegexValidator
+        from unittest import mock
+        from partner_mst.views import ImportCSV
+
+        url = reverse('partner_mst:import_csv')
+
+        # データを削除しておく
+        Partner.objects.all().delete()
+
+        # CSVファイルの作成（全角数字：Python の \d には一致し、PostgreSQL の \d には一致しない）
+        blank = {header: '' for header in HEADER_MAP}
+        rows = [
+            {**blank, '取引先名称': '全角数字取引先', '取引先区分': 'customer', 'メールアドレス': 'a@example.com', '電話番号': '０３-１２３４-５６７８'},
+            {**blank, '取引先名称': '記号取引先', '取引先区分': 'customer', 'メールアドレス': 'b@example.com', '電話番号': '03(1234)5678'},
+        ]
+
+        # 電話番号の検証を \d を使う正規表現に置き換え
+        field = Partner._meta.get_field('tel_number')
+        validators = [RegexValidator(r'^[\d\-]+$', '数字とハイフンのみ使用できます。')]
+        with mock.patch.object(field, '_validators', validators), mock.patch.dict(field.__dict__, {'validators': validators}):
+            # SQLでは検証しない
+            view = ImportCSV()
+            plan = view.staging_plan(
+                view.staging_form_class(), {}, lambda value: repr(value), lambda name: f'"{name}"'
+            )
+            self.assertIn('tel_number', plan['python_fields'])
+            self.assertIn('partner_type', plan['python_fields'])
+            self.assertNotIn('partner_name', plan['python_fields'])
+
+            # 通常の取込・ステージングテーブル経由の取込で同じファイルを登録
+            responses = []
+            for threshold in (settings.IMPORT_STAGING_THRESHOLD, 0):
+                ImportCSV.staging_threshold = threshold
+                try:
+                    responses.append(self.client.post(url, {'file': self._make_csv_file(rows)}))
+                finally:
+                    ImportCSV.staging_threshold = settings.IMPORT_STAGING_THRESHOLD
+        expected, res_json = [json.loads(response.content) for response in responses]
+
+        # エラーメッセージ確認（全角数字は通常の取込と同じく正常）
+        self.assertEqual(responses[1].status_code, 400)
+        self.assertEqual(expected, res_json)
+        self.assertEqual(['3行目: 電話番号: 数字とハイフンのみ使用できます。'], res_json['details'])
+
+        # 件数確認
+        self.assertEqual(Partner.objects.count(), 0)
@@ -12,6 +12,8 @@ urlpatterns = [
     path('import/csv', views.ImportCSV.as_view(), name='import_csv'),
     path('export/csv', views.ExportCSV.as_view(), name='export_csv'),
     path('export/check/', views.ExportCheckView.as_view(), name='export_check'),
+    path('count/', views.ListCountView.as_view(), name='count'),
+    path('search/', views.PartnerSearchView.as_view(), name='search'),
     path('create/', views.PartnerCreateView.as_view(), name='create'),
     path('<int:pk>/update/', views.PartnerUpdateView.as_view(), name='update'),
     path('bulk_delete/', views.PartnerBulkDeleteView.as_view(), name='bulk_delete'),
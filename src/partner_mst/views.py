@@ -5,8 +5,9 @@ from django.urls import reverse_lazy, reverse
 from .models import Partner
 from .form import PartnerSearchForm, PartnerForm
 from config.common import Common
-from config.base import CSVExportBaseView, CSVImportBaseView, ExcelExportBaseView, PrivilegeRequiredMixin
+from config.base import CSVExportBaseView, CSVImportBaseView, EstimatedCountPaginator, ExcelExportBaseView, ListCountBaseView, PrivilegeRequiredMixin
 from django.db.models import Q
+from django.contrib.postgres.search import TrigramWordSimilarity
 from django.contrib import messages
 from django.http import JsonResponse, Http404
 from django.template.loader import render_to_string
@@ -29,9 +30,27 @@ HEADER_MAP = {
     '住所2': 'address2',
 }
 
+# 出力列定義（ヘッダ → ORMパス or 式）
+EXPORT_COLUMNS = {
+    '取引先名称': 'partner_name',
+    '取引先名称（カナ）': 'partner_name_kana',
+    '取引先区分': Common.choice_label_expression('partner_type', Partner.PARTNER_TYPE_CHOICES),
+    '担当者名': 'contact_name',
+    'メールアドレス': 'email',
+    '電話番号': 'tel_number',
+    '郵便番号': 'postal_code',
+    '都道府県': 'state',
+    '市区町村': 'city',
+    '住所': 'address',
+    '住所2': 'address2',
+}
+
 # 出力ファイル名定義
 FILENAME_PREFIX = 'partner_mst'
 
+# プルダウン用検索の最大件数
+SEARCH_RESULT_LIMIT = 20
+
 #-------------------------
 # Partner CRUD
 #-------------------------
@@ -40,6 +59,7 @@ class PartnerListView(LoginRequiredMixin, generic.ListView):
     template_name = 'partner_mst/list.html'
     context_object_name = 'partners'
     paginate_by = settings.DEFAULT_PAGE_SIZE
+    paginator_class = EstimatedCountPaginator
 
     def get_queryset(self):
         req = self.request
@@ -52,9 +72,13 @@ class PartnerListView(LoginRequiredMixin, generic.ListView):
         if form.is_valid():
             queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset)
 
-        # 並び替え
+        # 並び替え（キーワード検索時、並び替え未指定なら類似度順）
         sort = form.cleaned_data.get('sort') if form.is_valid() else ''
-        queryset = set_table_sort(queryset=queryset, sort=sort)
+        keyword = form.cleaned_data.get('search_keyword', '').strip() if form.is_valid() else ''
+        if keyword and not sort:
+            queryset = rank_partners(queryset=queryset, keyword=keyword)
+        else:
+            queryset = set_table_sort(queryset=queryset, sort=sort)
 
         return queryset
 
@@ -265,14 +289,44 @@ class PartnerBulkDeleteView(LoginRequiredMixin, PrivilegeRequiredMixin, generic.
 class ExportExcel(LoginRequiredMixin, ExcelExportBaseView):
     model_class = Partner
     filename_prefix = FILENAME_PREFIX
-    headers = list(HEADER_MAP.values())
+    columns = EXPORT_COLUMNS
 
     def get_queryset(self, request):
+        form = PartnerSearchForm(request.GET or None)
         queryset = super().get_queryset(request)
-        return filter_data(request=request, queryset=queryset).order_by('partner_name')
+        if form.is_valid():
+            queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset)
+        return queryset.order_by('partner_name')
+
+class ListCountView(LoginRequiredMixin, ListCountBaseView):
+    '''取引先一覧の正確な件数を返す'''
+    list_view_class = PartnerListView
+
+
+class PartnerSearchView(LoginRequiredMixin, generic.View):
+    '''
+    取引先のキーワード検索（プルダウン用）
+    - select2のAjax形式（results: [{id, text}]）で類似度順に返す
+    '''
+    def get(self, request):
+        keyword = (request.GET.get('q') or '').strip()
+        queryset = Partner.objects.filter(is_deleted=False, tenant=request.user.tenant)
+
+        partner_types = request.GET.getlist('partner_type')
+        if partner_types:
+            queryset = queryset.filter(partner_type__in=partner_types)
+
+        if keyword:
+            queryset = rank_partners(queryset=queryset.filter(keyword_condition(keyword)), keyword=keyword)
+        else:
+            queryset = queryset.order_by('partner_name', 'id')
+
+        results = [
+            {'id': partner.pk, 'text': partner.partner_name}
+            for partner in queryset.only('id', 'partner_name')[:SEARCH_RESULT_LIMIT]
+        ]
+        return JsonResponse({'results': results})
 
-    def row(self, rec):
-        return get_row(rec)
 
 class ExportCheckView(LoginRequiredMixin, generic.View):
     '''CSV出力前の件数チェック'''
@@ -283,8 +337,7 @@ class ExportCheckView(LoginRequiredMixin, generic.View):
         if form.is_valid():
             queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset)
 
-        count = queryset.count()
-        if count > settings.MAX_EXPORT_ROWS:
+        if Common.exceeds_count(queryset, settings.MAX_EXPORT_ROWS):
             return JsonResponse({
                 'warning': f"出力件数が上限（{settings.MAX_EXPORT_ROWS:,}件）を超えています。"
                            f"先頭{settings.MAX_EXPORT_ROWS:,}件のみを出力します。"
@@ -295,15 +348,15 @@ class ExportCheckView(LoginRequiredMixin, generic.View):
 class ExportCSV(LoginRequiredMixin, CSVExportBaseView):
     model_class = Partner
     filename_prefix = FILENAME_PREFIX
-    headers = list(HEADER_MAP.keys())
+    columns = EXPORT_COLUMNS
 
 
     def get_queryset(self, request):
         req = self.request
         form = PartnerSearchForm(req.GET or None)
 
-        # 初期クエリセット（削除フラグ：False, 所属テナント限定）
-        queryset = Partner.objects.filter(is_deleted=False, tenant=req.user.tenant)
+        # 初期クエリセット（所属テナント限定、差分出力時以外は削除フラグ：False）
+        queryset = self.get_base_queryset(req)
 
         # 検索フォーム有効時のフィルタ
         if form.is_valid():
@@ -313,9 +366,10 @@ class ExportCSV(LoginRequiredMixin, CSVExportBaseView):
         sort = form.cleaned_data.get('sort') if form.is_valid() else ''
         queryset = set_table_sort(queryset=queryset, sort=sort)
 
-        # 出力件数制限処理（n件超の場合はメッセージ＋上限件数まで）
-        total_count = queryset.count()
-        if total_count > settings.MAX_EXPORT_ROWS:
+        # 出力件数制限処理（n件超の場合はメッセージ＋上限件数まで、バックグラウンド・差分出力時は全件）
+        if self.is_background or self.delta_since is not None:
+            return queryset
+        if Common.exceeds_count(queryset, settings.MAX_EXPORT_ROWS):
             messages.warning(
                 req,
                 f"出力件数が上限（{settings.MAX_EXPORT_ROWS:,}件）を超えています。"
@@ -325,32 +379,30 @@ class ExportCSV(LoginRequiredMixin, CSVExportBaseView):
 
         return queryset
 
-    def row(self, rec):
-        return get_row(rec=rec)
-
 
 class ImportCSV(LoginRequiredMixin, PrivilegeRequiredMixin, CSVImportBaseView):
     expected_headers = list(HEADER_MAP.keys())
     model_class = Partner
     unique_field = ('tenant_id', 'partner_name', 'email')
+    upsert_unique_fields = ('tenant', 'partner_name', 'email')
     HEADER_MAP = HEADER_MAP
+    import_form_class = PartnerForm
+    staging_form_class = PartnerForm
+    staging_duplicate_message = '取引先名称＋メールアドレス「{partner_name}, {email}」は既に存在します。'
 
     def validate_row(self, row, idx, existing, request):
-        data = row.copy()
-
         # ------------------------------------------------------
-        # Djangoフォームバリデーション
+        # フォームの検証結果（チャンク単位で列ごとに検証済み）
         # ------------------------------------------------------
-        form = PartnerForm(data=data)
-        if not form.is_valid():
-            error_text = '; '.join(self._format_errors_with_verbose_name(form))
-            return None, f'{idx}行目: {error_text}'
+        result = self.validated[idx]
+        if result.errors:
+            return None, self.format_column_errors(result, idx)
 
         # ------------------------------------------------------
         # 重複チェック（tenant + name + email）
         # ------------------------------------------------------
-        partner_name = data.get('partner_name')
-        email = data.get('email')
+        partner_name = row.get('partner_name')
+        email = row.get('email')
         key = (request.user.tenant_id, partner_name, email)
         if key in existing:
             return None, f'{idx}行目: 取引先名称＋メールアドレス「{partner_name}, {email}」は既に存在します。'
@@ -359,7 +411,7 @@ class ImportCSV(LoginRequiredMixin, PrivilegeRequiredMixin, CSVImportBaseView):
         # ------------------------------------------------------
         # オブジェクト作成
         # ------------------------------------------------------
-        obj = form.save(commit=False)
+        obj = result.instance
         obj.tenant = request.user.tenant
         obj.create_user = request.user
         obj.update_user = request.user
@@ -370,20 +422,21 @@ class ImportCSV(LoginRequiredMixin, PrivilegeRequiredMixin, CSVImportBaseView):
 #-------------------------
 # 共通関数
 #-------------------------
-def get_row(rec):
-    return [
-        rec.partner_name,
-        rec.partner_name_kana,
-        rec.get_partner_type_display(),
-        rec.contact_name,
-        rec.email,
-        rec.tel_number,
-        rec.postal_code,
-        rec.state,
-        rec.city,
-        rec.address,
-        rec.address2
-    ]
+def keyword_condition(keyword):
+    '''
+    キーワード検索の条件（検索用カラムのトライグラム索引を使用）
+    - 全角半角・カタカナひらがなの違いは検索用カラムと同じ正規化で吸収
+    '''
+    return Q(search_text__contains=Common.normalize_search_text(keyword))
+
+
+def rank_partners(queryset, keyword):
+    '''
+    キーワードとの類似度（トライグラム）の高い順に並び替え
+    '''
+    return queryset.annotate(
+        rank=TrigramWordSimilarity(Common.normalize_search_text(keyword), 'search_text')
+    ).order_by('-rank', 'partner_name', 'id')
 
 
 def filter_data(cleaned_data, queryset):
@@ -392,18 +445,7 @@ def filter_data(cleaned_data, queryset):
 
     # キーワード検索
     if keyword:
-        q = (
-            Q(partner_name__icontains=keyword)
-            | Q(partner_name_kana__icontains=keyword)
-            | Q(contact_name__icontains=keyword)
-            | Q(email__icontains=keyword)
-            | Q(tel_number__icontains=keyword)
-            | Q(postal_code__icontains=keyword)
-            | Q(state__icontains=keyword)
-            | Q(city__icontains=keyword)
-            | Q(address__icontains=keyword)
-            | Q(address2__icontains=keyword)
-        )
+        q = keyword_condition(keyword)
 
     # キーワードが取引先区分にあれば値に変換
     mapped_value = None
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_mst', '0013_normalize_product_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['tenant', 'updated_at', 'id'], name='idx_product_updated_at'),
+        ),
+    ]
@@ -1,8 +1,15 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from config.base import BaseModel
+from config.common import Common
 from django.urls import reverse
 from django.core.exceptions import ValidationError
 
+
+# キーワード検索の対象カラム
+SEARCH_FIELDS = ['product_name', 'unit', 'description']
+
+
 class Product(BaseModel):
     '''
     商品マスタ
@@ -17,6 +24,11 @@ class Product(BaseModel):
                 name='uq_product_name_tenant'
             )
         ]
+        indexes = [
+            GinIndex(fields=['search_text'], opclasses=['gin_trgm_ops'], name='idx_product_search_trgm'),
+            models.Index(fields=['tenant', 'unit_price'], name='idx_product_unit_price'),
+            models.Index(fields=['tenant', 'updated_at', 'id'], name='idx_product_updated_at'),
+        ]
         ordering = ['product_name']
 
     product_name = models.CharField(
@@ -57,6 +69,14 @@ class Product(BaseModel):
         help_text='商品の仕様や補足情報などを255文字以内で記入できます。（任意）'
     )
 
+    # キーワード検索用（商品名・単位・説明を連結して正規化した生成カラム）
+    search_text = models.GeneratedField(
+        expression=Common.search_text_expression(SEARCH_FIELDS),
+        output_field=models.TextField(),
+        db_persist=True,
+        verbose_name='検索用テキスト',
+    )
+
     def __str__(self):
         return f'{self.product_name}（{self.product_category}）'
 
@@ -1,7 +1,12 @@
-from django.test import TestCase, Client, RequestFactory
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.db.models import F
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.core.cache import cache
+from config.common import Common
 from product_mst.models import Product, ProductCategory
 from product_mst.views import ProductUpdateView, ProductDeleteView, ProductBulkDeleteView, HEADER_MAP
 from django.contrib import messages
@@ -12,11 +17,15 @@ from django.contrib.messages.storage.fallback import FallbackStorage
 from django.core.management import call_command
 from bs4 import BeautifulSoup
 from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
 from django.contrib.messages import get_messages
 import csv
 import io
 import json
+import tempfile
+import threading
+from unittest import mock
 
 User = get_user_model()
 
@@ -273,6 +282,71 @@ class ProductViewTests(TestCase):
         self.assertEqual(response.context['search_form']['search_unit_price_min'].value(), str(200))
         self.assertEqual(response.context['search_form']['search_unit_price_max'].value(), str(400))
 
+    def test_1_2_1_6(self):
+        '''検索処理（正常系: キーワードの単価範囲指定）'''
+        for key in ['200-400', '200〜400', '2,00-400']:
+            response = self.client.get(reverse('product_mst:list'), {'search_keyword': key})
+            self.assertEqual(response.status_code, 200)
+            names = list(response.context['products'].values_list('product_name', flat=True))
+            if key == '2,00-400':
+                # 不正な数値表記は文字列として扱う
+                self.assertEqual(names, [])
+            else:
+                self.assertEqual(names, ['商品002', '商品003', '商品004'])
+
+        # 上限のみ指定
+        response = self.client.get(reverse('product_mst:list'), {'search_keyword': '~200'})
+        prices = list(response.context['products'].values_list('unit_price', flat=True))
+        self.assertTrue(prices)
+        self.assertTrue(all(p <= 200 for p in prices))
+
+    def test_1_2_1_7(self):
+        '''検索処理（正常系: キーワードのカテゴリ名・複数語指定）'''
+        # カテゴリ名のみ
+        response = self.client.get(reverse('product_mst:list'), {'search_keyword': '家電'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['products'].values_list('product_name', flat=True)), ['商品005'])
+
+        # カテゴリ名＋単価（AND条件）
+        response = self.client.get(reverse('product_mst:list'), {'search_keyword': '文房具 400'})
+        self.assertEqual(list(response.context['products'].values_list('product_name', flat=True)), ['商品004'])
+
+        # 他テナントのカテゴリ名では絞り込まれない
+        response = self.client.get(reverse('product_mst:list'), {'search_keyword': 'other tenant category'})
+        self.assertEqual(response.context['products'].count(), 0)
+
+    def test_1_2_1_8(self):
+        '''検索処理（正常系: カテゴリ名は正規化して同一クエリ内で照合）'''
+        c = ProductCategory.objects.create(
+            tenant=self.user.tenant,
+            product_category_name='ガーデン用品',
+            create_user=self.user,
+            update_user=self.user,
+        )
+        Product.objects.create(
+            tenant=self.user.tenant,
+            product_name='スコップ',
+            product_category=c,
+            unit_price=100,
+            unit='個',
+            description='テスト用',
+            create_user=self.user,
+            update_user=self.user,
+        )
+
+        # ひらがな・半角カナでもカテゴリ名に一致する
+        for key in ['がーでん', 'ｶﾞｰﾃﾞﾝ']:
+            response = self.client.get(reverse('product_mst:list'), {'search_keyword': key})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.context['products'].values_list('product_name', flat=True)), ['スコップ'])
+
+        # キーワードの語数が増えてもクエリ数は増えない
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(reverse('product_mst:list'), {'search_keyword': '家電'})
+        with CaptureQueriesContext(connection) as multiple:
+            self.client.get(reverse('product_mst:list'), {'search_keyword': '家電 家電 家電'})
+        self.assertEqual(len(multiple), len(single))
+
     def test_1_3_1_1(self):
         '''単価昇順ソートの確認（正常）'''
         url = reverse('product_mst:list') + '?sort=unit_price'
@@ -350,6 +424,55 @@ class ProductViewTests(TestCase):
         # 21件目が2ページ目に含まれる
         self.assertTrue(any('商品21' in p.product_name for p in products_page2))
 
+    @override_settings(COUNT_ESTIMATE_THRESHOLD=0)
+    def test_1_4_1_2(self):
+        '''ページング（正常系: 推定件数表示）'''
+        url = reverse('product_mst:list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        # 推定件数で表示され、正確な件数取得用のURLが設定されていること
+        self.assertTrue(response.context['paginator'].is_estimated)
+        soup = BeautifulSoup(response.content, 'html.parser')
+        count_span = soup.select_one('[data-count-action]')
+        self.assertIsNotNone(count_span)
+        self.assertEqual(count_span['data-count-action'], reverse('product_mst:count'))
+
+        # 推定件数を超えるページ番号でもエラーにならないこと
+        response = self.client.get(url + '?page=100')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['products']), 0)
+
+    def test_1_4_1_3(self):
+        '''件数取得（正常系: 検索条件を反映した正確な件数）'''
+        url = reverse('product_mst:count')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 13)
+
+        response = self.client.get(url, {'search_product_name': '存在しない商品'})
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_1_4_1_4(self):
+        '''件数取得（正常系: テーブル全体が閾値未満・PostgreSQL以外は実行計画を取得しない）'''
+        queryset = Product.objects.filter(tenant=self.user.tenant, is_deleted=False)
+
+        # 統計情報の収集後：テーブル全体の推定行数（キャッシュ）のみ確認して COUNT
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Product._meta.db_table}')
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Common.get_count(queryset), (13, False))
+            self.assertEqual(Common.get_count(queryset), (13, False))
+        self.assertFalse(any('EXPLAIN' in q['sql'] for q in queries))
+        self.assertEqual(sum('pg_class' in q['sql'] for q in queries), 1)
+
+        # PostgreSQL以外：COUNT のみ
+        cache.clear()
+        with mock.patch.object(connection, 'vendor', 'sqlite'), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Common.get_count(queryset), (13, False))
+        self.assertEqual(len(queries), 1)
+
     #----------------
     # CreateView
     #----------------
@@ -1687,7 +1810,7 @@ class ProductViewTests(TestCase):
 
         # 文字コード確認
         try:
-            content = response.content.decode('utf-8')
+            content = b''.join(response.streaming_content).decode('utf-8')
         except UnicodeDecodeError:
             self.fail('CSVファイルの文字コードがutf-8ではありません。')
 
@@ -1810,6 +1933,204 @@ class ProductViewTests(TestCase):
         self.assertEqual('出力件数が上限（10,000件）を超えています。先頭10,000件のみを出力します。', data['warning'])
         self.assertNotIn('ok', data)
 
+    def test_6_1_1_6(self):
+        '''CSVエクスポート（正常系：ストリーミング出力・チャンク分割）'''
+        from product_mst.views import ExportCSV
+
+        # 5行ごとに送信
+        ExportCSV.chunk_size = 5
+        try:
+            response = self.client.get(reverse('product_mst:export_csv'))
+            self.assertTrue(response.streaming)
+            chunks = list(response.streaming_content)
+        finally:
+            ExportCSV.chunk_size = settings.EXPORT_CHUNK_SIZE
+
+        # ヘッダ＋13件を5行ずつ送信（3チャンク）
+        self.assertEqual(len(chunks), 3)
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+        self.assertEqual(rows[0], list(HEADER_MAP.keys()))
+        self.assertEqual(len(rows) - 1, 13)
+
+    def test_6_1_1_7(self):
+        '''CSVエクスポート（正常系：COPY の出力とPythonでの書き出しがバイト単位で一致）'''
+        from product_mst.views import ExportCSV
+
+        # 値の中の改行・引用符・カンマ、空欄
+        Product.objects.filter(pk=1).update(description='1行目\n"2行目",3行目')
+        Product.objects.filter(pk=2).update(description='')
+
+        url = reverse('product_mst:export_csv') + '?sort=product_name'
+        request = self.factory.get(url)
+        request.user = get_user_model().objects.get(pk=3)
+
+        def make_view(use_copy):
+            view = ExportCSV()
+            view.setup(request)
+            view.use_copy = use_copy
+            return view
+
+        # 画面からの出力（COPY をストリーミング）
+        view = make_view(True)
+        self.assertTrue(view.can_copy(view.get_export_data(request)))
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        streamed = b''.join(response.streaming_content)
+
+        # バックグラウンド出力（COPY）・Pythonでの書き出し
+        copied = io.BytesIO()
+        view.write_file(view.get_export_data(request), copied)
+        view = make_view(False)
+        written = b''.join(view.stream(view.get_export_data(request)))
+
+        self.assertEqual(streamed, written)
+        self.assertEqual(copied.getvalue(), written)
+
+        # 改行コードは CRLF（値の中の改行はそのまま）
+        self.assertIn('"1行目\n""2行目"",3行目"\r\n'.encode('utf-8'), written)
+        rows = list(csv.reader(io.StringIO(written.decode('utf-8'), newline='')))
+        self.assertEqual(rows[0], list(HEADER_MAP.keys()))
+        self.assertEqual(len(rows) - 1, 13)
+
+    def test_6_1_1_8(self):
+        '''CSVエクスポート（正常系：出力形式 TSV・NDJSON）'''
+        url = reverse('product_mst:export_csv') + '?sort=product_name'
+        expected = list(csv.reader(io.StringIO(b''.join(self.client.get(url).streaming_content).decode('utf-8'))))
+
+        response = self.client.get(url + '&format=tsv')
+        self.assertEqual(response['Content-Type'], 'text/tab-separated-values')
+        self.assertIn('.tsv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(list(csv.reader(io.StringIO(content), delimiter='\t')), expected)
+
+        response = self.client.get(url + '&format=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 13)
+        record = json.loads(lines[0])
+        self.assertEqual(list(record), list(HEADER_MAP.keys()))
+        self.assertEqual([record[h] or '' for h in record], expected[1])
+
+    def test_6_1_1_9(self):
+        '''CSVエクスポート（正常系：gzip 圧縮・Parquet）'''
+        import gzip
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        url = reverse('product_mst:export_csv') + '?sort=product_name'
+        expected = list(csv.reader(io.StringIO(b''.join(self.client.get(url).streaming_content).decode('utf-8'))))
+
+        response = self.client.get(url + '&format=csv&compress=gzip')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        content = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        self.assertEqual(list(csv.reader(io.StringIO(content))), expected)
+
+        response = self.client.get(url + '&format=parquet')
+        self.assertIn('.parquet', response['Content-Disposition'])
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.schema.names, list(HEADER_MAP.keys()))
+        self.assertEqual([['' if v is None else str(v) for v in r.values()] for r in table.to_pylist()], expected[1:])
+
+        # 列の型はモデル項目に対応（単価：Decimal、その他：文字列）
+        field = Product._meta.get_field('unit_price')
+        self.assertEqual(table.schema.field('単価').type, pa.decimal128(field.max_digits, field.decimal_places))
+        self.assertEqual(table.schema.field('商品名').type, pa.string())
+
+    def test_6_1_1_10(self):
+        '''CSVエクスポート（異常系：未対応の出力形式・圧縮方式）'''
+        for query in ['?format=xml', '?compress=zip']:
+            response = self.client.get(reverse('product_mst:export_csv') + query)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], '出力形式が不正です。')
+
+    def test_6_1_1_11(self):
+        '''CSVエクスポート（正常系：差分出力・カーソルによる継続）'''
+        def export(query):
+            response = self.client.get(reverse('product_mst:export_csv') + query)
+            self.assertEqual(response.status_code, 200)
+            rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+            return response, rows
+
+        # 登録から差分出力の安全マージン以上経過した状態にする
+        Product.objects.update(updated_at=F('updated_at') - timedelta(hours=1))
+
+        # 初回：基準日時以降の全件（論理削除済みを含む）＋削除フラグ列
+        response, rows = export('?since=2000-01-01')
+        self.assertEqual(rows[0], list(HEADER_MAP.keys()) + ['削除フラグ'])
+        self.assertEqual(len(rows) - 1, Product.objects.filter(tenant=self.user.tenant).count())
+        cursor = response['X-Export-Next-Cursor']
+        self.assertTrue(response['X-Export-Watermark'])
+
+        # 変更なし：0件、カーソルは変わらない
+        response, rows = export(f'?cursor={cursor}')
+        self.assertEqual(len(rows) - 1, 0)
+        self.assertEqual(response['X-Export-Next-Cursor'], cursor)
+
+        # 更新・論理削除した行のみ、更新順に出力
+        updated, deleted = Product.objects.filter(tenant=self.user.tenant, is_deleted=False).order_by('id')[:2]
+        updated.unit = '箱'
+        updated.save()
+        deleted.is_deleted = True
+        deleted.save()
+
+        # 安全マージン内の更新は次回に出力（カーソルは変わらない）
+        response, rows = export(f'?cursor={cursor}')
+        self.assertEqual(len(rows) - 1, 0)
+        self.assertEqual(response['X-Export-Next-Cursor'], cursor)
+
+        # 安全マージン経過後
+        Product.objects.filter(pk__in=[updated.pk, deleted.pk]).update(
+            updated_at=F('updated_at') - timedelta(seconds=settings.EXPORT_DELTA_MARGIN_SECONDS + 1)
+        )
+        response, rows = export(f'?cursor={cursor}')
+        self.assertEqual([(r[0], r[3], r[-1]) for r in rows[1:]], [
+            (updated.product_name, '箱', '0'),
+            (deleted.product_name, deleted.unit, '1'),
+        ])
+
+        # 続きから：0件
+        response, rows = export(f"?cursor={response['X-Export-Next-Cursor']}")
+        self.assertEqual(len(rows) - 1, 0)
+
+    def test_6_1_1_12(self):
+        '''CSVエクスポート（異常系：差分出力の基準が不正）'''
+        for query, message in [
+            ('?since=abc', '差分出力の基準日時が不正です。'),
+            ('?cursor=abc', '差分出力のカーソルが不正です。'),
+        ]:
+            response = self.client.get(reverse('product_mst:export_csv') + query)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], message)
+
+    def test_6_1_1_13(self):
+        '''CSVエクスポート（正常系：COPY のストリーミングを途中で閉じてもスレッドが終了する）'''
+        from product_mst.views import ExportCSV
+
+        request = self.factory.get(reverse('product_mst:export_csv'))
+        request.user = get_user_model().objects.get(pk=3)
+        view = ExportCSV()
+        view.setup(request)
+        view.chunk_size = 1
+
+        threads = threading.active_count()
+        chunks = view.copy_stream(view.get_export_data(request))
+        self.assertTrue(next(chunks).startswith(','.join(HEADER_MAP.keys()).encode('utf-8')))
+        self.assertEqual(threading.active_count(), threads + 1)
+
+        # 閉じるとスレッドの終了まで待機
+        chunks.close()
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_6_1_1_14(self):
+        '''CSVエクスポート（正常系：上限のチェックは推定件数ではなく上限＋1件までの件数で判定）'''
+        url = reverse('product_mst:export_check')
+
+        # 推定件数が上限を超えていても、実件数が上限以下なら警告しない
+        with mock.patch.object(Common, 'estimate_count', return_value=settings.MAX_EXPORT_ROWS * 10):
+            response = self.client.get(url)
+        self.assertEqual(response.json(), {'ok': True})
+
     def test_6_1_2_1(self):
         '''CSVエクスポート（異常系：直リンク）'''
         url = reverse('product_mst:export_csv')
@@ -2059,6 +2380,111 @@ class ProductViewTests(TestCase):
         self.assertLessEqual(abs((product.created_at - timezone.now()).total_seconds()), 5)
         self.assertLessEqual(abs((product.updated_at - timezone.now()).total_seconds()), 5)
 
+    def test_7_1_1_6(self):
+        '''CSVインポート（正常系：商品カテゴリはファイル単位で1回のクエリで解決）'''
+        url = reverse('product_mst:import_csv')
+
+        # データを削除しておく
+        Product.objects.all().delete()
+
+        rows = [
+            {'商品名': f'カテゴリ解決商品{i}', '商品カテゴリ': ['食品', '文房具'][i % 2], '単価': '100', '単位': '個', '説明': ''}
+            for i in range(6)
+        ]
+        file = self._make_csv_file(rows)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'file': file})
+
+        # ステータスコード確認
+        self.assertEqual(response.status_code, 200, response.content)
+
+        # 商品カテゴリ名での検索は1回のみ
+        lookups = [q['sql'] for q in queries.captured_queries if '"product_category_name" IN' in q['sql']]
+        self.assertEqual(len(lookups), 1)
+
+        # 登録値の確認
+        for row in rows:
+            product = Product.objects.get(product_name=row['商品名'])
+            self.assertEqual(product.product_category.product_category_name, row['商品カテゴリ'])
+
+    def test_7_1_1_7(self):
+        '''CSVインポート（正常系：文字コード判定の範囲で文字が途切れる場合もUTF-8として読込）'''
+        from product_mst.views import ImportCSV
+
+        url = reverse('product_mst:import_csv')
+
+        # データを削除しておく
+        Product.objects.all().delete()
+
+        rows = [
+            {'商品名': '判定境界商品', '商品カテゴリ': '食品', '単価': '100', '単位': '個', '説明': '説明'},
+        ]
+        file = self._make_csv_file(rows)
+
+        # 先頭1バイト（「商」の途中）のみで文字コードを判定
+        ImportCSV.encoding_sample_size = 1
+        try:
+            response = self.client.post(url, {'file': file})
+        finally:
+            ImportCSV.encoding_sample_size = 64 * 1024
+
+        # ステータスコード確認
+        self.assertEqual(response.status_code, 200, response.content)
+
+        # 登録値の確認
+        self.assertTrue(Product.objects.filter(product_name='判定境界商品').exists())
+
+    def test_7_1_1_8(self):
+        '''CSVインポート（正常系：ステージングテーブル経由の取込）'''
+        from dashboard.models import SearchEntry
+        from product_mst.views import ImportCSV
+
+        url = reverse('product_mst:import_csv')
+
+        # データを削除しておく
+        Product.objects.all().delete()
+
+        rows = [
+            {'商品名': ' ステージング商品A ', '商品カテゴリ': '食品', '単価': '1234.5', '単位': '個', '説明': '説明A'},
+            {'商品名': 'ステージング商品B', '商品カテゴリ': '', '単価': '200', '単位': '', '説明': ''},
+        ]
+        file = self._make_csv_file(rows)
+
+        # ファイルサイズに関係なくステージングテーブル経由で取込
+        ImportCSV.staging_threshold = 0
+        try:
+            response = self.client.post(url, {'file': file})
+        finally:
+            ImportCSV.staging_threshold = settings.IMPORT_STAGING_THRESHOLD
+        res_json = json.loads(response.content)
+
+        # ステータスコード確認
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual('2件をインポートしました。', res_json['message'])
+
+        # 登録値の確認（フォームの検証と同じく前後の空白を除去・空の単位は NULL）
+        product = Product.objects.get(product_name='ステージング商品A')
+        self.assertEqual(product.product_category.product_category_name, '食品')
+        self.assertEqual(product.unit_price, Decimal('1234.50'))
+        self.assertEqual(product.unit, '個')
+        self.assertEqual(product.description, '説明A')
+        self.assertEqual(product.tenant, self.user.tenant)
+        self.assertEqual(product.create_user, self.user)
+        self.assertEqual(product.update_user, self.user)
+        self.assertFalse(product.is_deleted)
+        self.assertLessEqual(abs((product.created_at - timezone.now()).total_seconds()), 5)
+
+        product = Product.objects.get(product_name='ステージング商品B')
+        self.assertIsNone(product.product_category)
+        self.assertIsNone(product.unit)
+        self.assertEqual(product.description, '')
+
+        # 検索インデックスへの反映
+        self.assertEqual(
+            SearchEntry.objects.filter(entity_type='product', object_id__in=Product.objects.values('id')).count(), 2
+        )
+
     def test_7_1_2_1(self):
         '''CSVインポート（異常系：直リンク）'''
         self.client.logout()
@@ -2366,6 +2792,394 @@ class ProductViewTests(TestCase):
         # 件数確認
         self.assertEqual(Product.objects.count(), 0)
 
+    def test_7_1_2_12(self):
+        '''CSVインポート（異常系：後続チャンクのエラーで登録済みのチャンクもロールバック）'''
+        from product_mst.views import ImportCSV
+
+        url = reverse('product_mst:import_csv')
+
+        # データを削除しておく
+        Product.objects.all().delete()
+
+        rows = [
+            {'商品名': 'チャンク商品1', '商品カテゴリ': '食品', '単価': '100', '単位': '個', '説明': ''},
+            {'商品名': 'チャンク商品2', '商品カテゴリ': '文房具', '単価': '200', '単位': '箱', '説明': ''},
+            {'商品名': 'チャンク商品3', '商品カテゴリ': '存在しないカテゴリ', '単価': '300', '単位': '個', '説明': ''},
+        ]
+        file = self._make_csv_file(rows)
+
+        # 1件ずつ検証・登録
+        ImportCSV.batch_size = 1
+        try:
+            response = self.client.post(url, {'file': file})
+        finally:
+            ImportCSV.batch_size = settings.IMPORT_BATCH_SIZE
+        res_json = json.loads(response.content)
+
+        # ステータスコード確認
+        self.assertEqual(response.status_code, 400)
+
+        # エラーメッセージ確認
+        self.assertEqual(['4行目: 商品カテゴリ「存在しないカテゴリ」が存在しません。'], res_json['details'])
+
+        # 件数確認
+        self.assertEqual(Product.objects.count(), 0)
+
+    def test_7_1_2_13(self):
+        '''CSVインポート（異常系：ステージングテーブル経由でも通常の取込と同じエラー）'''
+        from product_mst.views import ImportCSV
+
+        url = reverse('product_mst:import_csv')
+
+        # データを削除しておく
+        Product.objects.all().delete()
+        Product.objects.create(
+            tenant=self.user.tenant, product_name='登録済商品', unit_price=100,
+            create_user=self.user, update_user=self.user,
+        )
+
+        rows = [
+            {'商品名': '', '商品カテゴリ': '食品', '単価': 'abc', '単位': 'u' * 21, '説明': 'x' * 256},
+            {'商品名': 'エラー商品', '商品カテゴリ': '存在しないカテゴリ', '単価': '', '単位': '', '説明': ''},
+            {'商品名': '登録済商品', '商品カテゴリ': '', '単価': '100', '単位': '', '説明': ''},
+            {'商品名': '重複商品', '商品カテゴリ': '', '単価': '1.234', '単位': '', '説明': ''},
+            {'商品名': '重複商品', '商品カテゴリ': '', '単価': '100', '単位': '', '説明': ''},
+            {'商品名': '重複商品', '商品カテゴリ': '', '単価': '100', '単位': '', '説明': ''},
+            {'商品名': 'p' * 101, '商品カテゴリ': '', '単価': '99999999999', '単位': '', '説明': ''},
+        ]
+
+        # 通常の取込・ステージングテーブル経由の取込で同じファイルを登録
+        responses = []
+        for threshold in (settings.IMPORT_STAGING_THRESHOLD, 0):
+            ImportCSV.staging_threshold = threshold
+            try:
+                responses.append(self.client.post(url, {'file': self._make_csv_file(rows)}))
+            finally:
+                ImportCSV.staging_threshold = settings.IMPORT_STAGING_THRESHOLD
+        expected, res_json = [json.loads(response.content) for response in responses]
+
+        # ステータスコード確認
+        self.assertEqual(responses[1].status_code, 400)
+
+        # エラーメッセージ確認（行番号・項目の順序・文言が通常の取込と一致）
+        self.assertEqual(expected, res_json)
+        self.assertEqual([
+            '2行目: 商品名称: この項目は必須です。; 単価: 数値を入力してください。; '
+            '単位: この値は 20 文字以下でなければなりません( 21 文字になっています)。; '
+            '商品説明: この値は 255 文字以下でなければなりません( 256 文字になっています)。',
+            '3行目: 商品カテゴリ「存在しないカテゴリ」が存在しません。',
+            '4行目: 商品「登録済商品」は既に存在します。',
+            '5行目: 単価: この値は小数点以下が合計 2 桁以内でなければなりません。',
+            '7行目: 商品「重複商品」は既に存在します。',
+            '8行目: 商品名称: この値は 100 文字以下でなければなりません( 101 文字になっています)。; '
+            '単価: この値は小数点より前が合計 10 桁以内でなければなりません。',
+        ], res_json['details'])
+
+        # 件数確認
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_7_1_1_9(self):
+        '''CSVインポート（正常系：更新モードで登録・更新・変更なしを判定）'''
+        url = reverse('product_mst:import_csv')
+
+        # データを削除しておく
+        Product.objects.all().delete()
+        common = {'tenant': self.user.tenant, 'create_user': self.user, 'update_user': self.user}
+        changed = Product.objects.create(product_name='更新商品', unit_price=100, unit='個', **common)
+        unchanged = Product.objects.create(product_name='変更なし商品', unit_price=200, unit='箱', description='', **common)
+        deleted = Product.objects.create(product_name='削除済商品', unit_price=300, is_deleted=True, **common)
+        unchanged_at = unchanged.updated_at
+
+        rows = [
+            {'商品名': '更新商品', '商品カテゴリ': '食品', '単価': '150', '単位': '個', '説明': ''},
+            {'商品名': '変更なし商品', '商品カテゴリ': '', '単価': '200.00', '単位': '箱', '説明': ''},
+            {'商品名': '削除済商品', '商品カテゴリ': '', '単価': '300', '単位': '', '説明': ''},
+            {'商品名': '新規商品', '商品カテゴリ': '', '単価': '400', '単位': '', '説明': ''},
+        ]
+
+        # 1バッチに新規・更新・変更なしが混在する場合も件数を判定
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'file': self._make_csv_file(rows), 'mode': 'upsert'})
+        res_json = json.loads(response.content)
+
+        # ステータスコード・件数確認
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((res_json['inserted'], res_json['updated'], res_json['unchanged']), (1, 2, 1))
+        self.assertEqual(res_json['message'], '1件を登録、2件を更新しました。（変更なし 1件）')
+
+        # 登録・更新は1回の INSERT ... ON CONFLICT
+        upserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "product_mst_product"')]
+        self.assertEqual(len(upserts), 1)
+        self.assertIn('ON CONFLICT', upserts[0])
+
+        # 更新：主キーはそのままで取込項目を更新
+        product = Product.objects.get(pk=changed.pk)
+        self.assertEqual(product.unit_price, Decimal('150.00'))
+        self.assertEqual(product.product_category.product_category_name, '食品')
+
+        # 変更なし：更新日時も変更しない
+        self.assertEqual(Product.objects.get(pk=unchanged.pk).updated_at, unchanged_at)
+
+        # 論理削除済み：削除を取り消して更新
+        self.assertFalse(Product.objects.get(pk=deleted.pk).is_deleted)
+
+        # 件数確認
+        self.assertEqual(Product.objects.count(), 4)
+
+    def test_7_1_2_14(self):
+        '''CSVインポート（異常系：インポートモード不正・更新モードでもファイル内の重複はエラー）'''
+        url = reverse('product_mst:import_csv')
+
+        # データを削除しておく
+        Product.objects.all().delete()
+
+        rows = [
+            {'商品名': '重複商品', '商品カテゴリ': '', '単価': '100', '単位': '', '説明': ''},
+            {'商品名': '重複商品', '商品カテゴリ': '', '単価': '200', '単位': '', '説明': ''},
+        ]
+        response = self.client.post(url, {'file': self._make_csv_file(rows), 'mode': 'replace'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['error'], 'インポートモードが不正です。')
+
+        response = self.client.post(url, {'file': self._make_csv_file(rows), 'mode': 'upsert'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(['3行目: 商品「重複商品」は既に存在します。'], json.loads(response.content)['details'])
+
+        # 件数確認
+        self.assertEqual(Product.objects.count(), 0)
+
+    def test_7_1_1_10(self):
+        '''CSVインポート（正常系：列単位の検証で行数によらずクエリ数が一定）'''
+        url = reverse('product_mst:import_csv')
+
+        def import_queries(count):
+            Product.objects.all().delete()
+            rows = [
+                {'商品名': f'列検証商品{i}', '商品カテゴリ': '食品', '単価': '100.5', '単位': '個', '説明': ''}
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(url, {'file': self._make_csv_file(rows)})
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(Product.objects.count(), count)
+            return len(queries)
+
+        # 行ごとのフォーム検証（関連先の存在確認等）のクエリが発行されないこと
+        self.assertEqual(import_queries(5), import_queries(50))
+
+    def test_7_1_1_11(self):
+        '''CSVインポート（正常系：判定範囲がASCIIのみの場合は最初の日本語で文字コードを判定）'''
+        from product_mst.views import ImportCSV
+
+        view = ImportCSV()
+        view.encoding_sample_size = 64
+
+        # 判定範囲（先頭64バイト）を超えるASCIIのみの行の後に日本語の行
+        lines = ['product_name,unit_price'] + [f'ITEM-{i:03},100' for i in range(20)] + ['後続の日本語商品,200']
+        content = '\r\n'.join(lines) + '\r\n'
+        for encoding in ('cp932', 'utf-8', 'utf-8-sig'):
+            with self.subTest(encoding=encoding):
+                data = content.encode(encoding)
+                self.assertTrue(data[:64].isascii() or encoding == 'utf-8-sig')
+                file = SimpleUploadedFile('test.csv', data)
+
+                rows = list(csv.reader(view.open_csv(file)))
+                self.assertEqual(rows[0], ['product_name', 'unit_price'])
+                self.assertEqual(rows[-1], ['後続の日本語商品', '200'])
+                self.assertEqual(len(rows), 22)
+
+    def test_7_1_2_15(self):
+        '''CSVインポート（異常系：列単位の検証のエラーメッセージがフォームの検証と同じ）'''
+        from product_mst.form import ProductForm
+        from product_mst.views import ImportCSV
+
+        url = reverse('product_mst:import_csv')
+
+        # データを削除しておく
+        Product.objects.all().delete()
+
+        rows = [
+            {'商品名': '', '商品カテゴリ': '', '単価': 'abc', '単位': '', '説明': ''},
+            {'商品名': 'あ' * 101, '商品カテゴリ': '食品', '単価': '1.234', '単位': 'x' * 21, '説明': 'x' * 256},
+            {'商品名': ' ', '商品カテゴリ': '', '単価': '12345678901', '単位': '', '説明': ''},
+            {'商品名': '正常商品', '商品カテゴリ': '', '単価': ' 100 ', '単位': '', '説明': ''},
+        ]
+        response = self.client.post(url, {'file': self._make_csv_file(rows)})
+        self.assertEqual(response.status_code, 400)
+
+        # 1行ずつフォームで検証した場合のエラーメッセージ
+        view = ImportCSV()
+        expected = []
+        for idx, row in enumerate(rows[:3], start=2):
+            data = {HEADER_MAP[key]: value for key, value in row.items()}
+            if data['product_category']:
+                data['product_category'] = ProductCategory.objects.get(
+                    tenant=self.user.tenant, product_category_name=data['product_category']
+                ).pk
+            form = ProductForm(data=data)
+            self.assertFalse(form.is_valid())
+            expected.append(f"{idx}行目: {'; '.join(view._format_errors_with_verbose_name(form))}")
+        self.assertEqual(expected, json.loads(response.content)['details'])
+
+        # 件数確認
+        self.assertEqual(Product.objects.count(), 0)
+
+    def _run_import_job(self, rows, chunk_size):
+        '''インポートジョブを登録し、ワーカーで実行（戻り値：ジョブの進捗のJSON）'''
+        response = self.client.post(reverse('dashboard:import_job_create'), {
+            'action': reverse('product_mst:import_csv'),
+            'file': self._make_csv_file(rows),
+            'chunk_size': chunk_size,
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        status_url = json.loads(response.content)['status_url']
+
+        call_command('run_import_worker', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+        return json.loads(self.client.get(status_url).content)
+
+    def test_7_1_3_1(self):
+        '''CSVインポート（インポートジョブ：チャンク単位で登録し、エラー行はエラーファイルに出力）'''
+        # データを削除しておく
+        Product.objects.all().delete()
+
+        rows = [
+            {'商品名': 'ジョブ商品1', '商品カテゴリ': '食品', '単価': '100', '単位': '個', '説明': ''},
+            {'商品名': 'ジョブ商品2', '商品カテゴリ': '存在しないカテゴリ', '単価': '200', '単位': '箱', '説明': ''},
+            {'商品名': 'ジョブ商品3', '商品カテゴリ': '', '単価': '300', '単位': '個', '説明': ''},
+            {'商品名': 'ジョブ商品1', '商品カテゴリ': '', '単価': '400', '単位': '個', '説明': ''},
+            {'商品名': 'ジョブ商品5', '商品カテゴリ': '', '単価': 'abc', '単位': '個', '説明': ''},
+        ]
+        with tempfile.TemporaryDirectory() as directory, override_settings(IMPORT_JOB_DIR=directory):
+            job = self._run_import_job(rows, chunk_size=2)
+
+            # 進捗確認
+            self.assertEqual(job['status'], 'done')
+            self.assertEqual(job['progress'], 100)
+            self.assertEqual((job['total_rows'], job['processed_rows']), (5, 5))
+            self.assertEqual((job['imported_rows'], job['error_rows']), (2, 3))
+            self.assertEqual(job['message'], '2件をインポートしました。（エラー 3件）')
+
+            # エラーのない行は登録（エラーのあるチャンクもロールバックしない）
+            self.assertEqual(
+                set(Product.objects.values_list('product_name', flat=True)), {'ジョブ商品1', 'ジョブ商品3'}
+            )
+
+            # エラーファイル確認（行番号・エラー内容・行データ）
+            response = self.client.get(job['error_file_url'])
+            self.assertEqual(response.status_code, 200)
+            errors = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(errors, [
+            ['行番号', 'エラー内容', '商品名', '商品カテゴリ', '単価', '単位', '説明'],
+            ['3', '商品カテゴリ「存在しないカテゴリ」が存在しません。', 'ジョブ商品2', '存在しないカテゴリ', '200', '箱', ''],
+            ['5', '商品「ジョブ商品1」は既に存在します。', 'ジョブ商品1', '', '400', '個', ''],
+            ['6', '単価: 数値を入力してください。', 'ジョブ商品5', '', 'abc', '個', ''],
+        ])
+
+    def test_7_1_3_2(self):
+        '''CSVインポート（インポートジョブ：中断したジョブを最後にコミットしたチャンクの次の行から再開）'''
+        from dashboard.models import ImportJob
+        from product_mst.views import ImportCSV
+
+        # データを削除しておく
+        Product.objects.all().delete()
+
+        rows = [
+            {'商品名': f'再開商品{i}', '商品カテゴリ': '', '単価': '100' if i % 3 else 'abc', '単位': '', '説明': ''}
+            for i in range(1, 8)
+        ]
+
+        # 3チャンク目の登録中にワーカーが停止した状態を再現（ジョブは実行中のまま）
+        save_objects = ImportCSV.save_objects
+        calls = []
+
+        def interrupted(view, objects):
+            calls.append(len(objects))
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return save_objects(view, objects)
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(IMPORT_JOB_DIR=directory):
+            ImportCSV.save_objects = interrupted
+            try:
+                with self.assertRaises(KeyboardInterrupt):
+                    self._run_import_job(rows, chunk_size=2)
+            finally:
+                ImportCSV.save_objects = save_objects
+
+            job = ImportJob.objects.get()
+            self.assertEqual(job.status, 'running')
+            self.assertEqual((job.processed_rows, job.imported_rows, job.error_rows), (4, 3, 1))
+
+            # 更新が途絶えたジョブを再開
+            ImportJob.objects.filter(pk=job.pk).update(
+                updated_at=timezone.now() - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS + 1)
+            )
+            call_command('run_import_worker', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'done')
+            self.assertEqual((job.processed_rows, job.imported_rows, job.error_rows), (7, 5, 2))
+
+            # 中断前のチャンクを重複して登録・出力しない
+            self.assertEqual(Product.objects.count(), 5)
+            with open(job.error_file_path, encoding='utf-8') as file:
+                errors = [row[0] for row in csv.reader(file)]
+        self.assertEqual(errors, ['行番号', '4', '7'])
+
+    def test_7_1_3_3(self):
+        '''CSVインポート（インポートジョブ：大きなファイルはステージングテーブル経由で登録し、エラー行はエラーファイルに出力）'''
+        from product_mst.views import ImportCSV
+
+        # データを削除しておく
+        Product.objects.all().delete()
+
+        rows = [
+            {'商品名': 'ステージングジョブ商品1', '商品カテゴリ': '食品', '単価': '100', '単位': '個', '説明': ''},
+            {'商品名': 'ステージングジョブ商品2', '商品カテゴリ': '存在しないカテゴリ', '単価': '200', '単位': '箱', '説明': ''},
+            {'商品名': 'ステージングジョブ商品3', '商品カテゴリ': '', '単価': '300', '単位': '個', '説明': ''},
+            {'商品名': 'ステージングジョブ商品1', '商品カテゴリ': '', '単価': '400', '単位': '個', '説明': ''},
+            {'商品名': 'ステージングジョブ商品5', '商品カテゴリ': '', '単価': 'abc', '単位': '個', '説明': ''},
+        ]
+
+        # ステージング取込を行わせ、チャンク単位の登録が呼ばれないことを確認
+        save_objects = ImportCSV.save_objects
+
+        def not_called(view, objects):
+            raise AssertionError('save_objects が呼ばれました。')
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(IMPORT_JOB_DIR=directory):
+            ImportCSV.staging_threshold = 0
+            ImportCSV.save_objects = not_called
+            try:
+                job = self._run_import_job(rows, chunk_size=2)
+            finally:
+                ImportCSV.staging_threshold = settings.IMPORT_STAGING_THRESHOLD
+                ImportCSV.save_objects = save_objects
+
+            # 進捗確認（チャンク単位の登録と同じ件数・メッセージ）
+            self.assertEqual(job['status'], 'done')
+            self.assertEqual((job['total_rows'], job['processed_rows']), (5, 5))
+            self.assertEqual((job['imported_rows'], job['error_rows']), (2, 3))
+            self.assertEqual(job['message'], '2件をインポートしました。（エラー 3件）')
+
+            # エラーのない行は登録
+            self.assertEqual(
+                set(Product.objects.values_list('product_name', flat=True)),
+                {'ステージングジョブ商品1', 'ステージングジョブ商品3'},
+            )
+            self.assertEqual(Product.objects.get(product_name='ステージングジョブ商品1').unit_price, Decimal('100'))
+
+            # エラーファイル確認（行番号・エラー内容・行データ）
+            response = self.client.get(job['error_file_url'])
+            self.assertEqual(response.status_code, 200)
+            errors = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(errors, [
+            ['行番号', 'エラー内容', '商品名', '商品カテゴリ', '単価', '単位', '説明'],
+            ['3', '商品カテゴリ「存在しないカテゴリ」が存在しません。', 'ステージングジョブ商品2', '存在しないカテゴリ', '200', '箱', ''],
+            ['5', '商品「ステージングジョブ商品1」は既に存在します。', 'ステージングジョブ商品1', '', '400', '個', ''],
+            ['6', '単価: 数値を入力してください。', 'ステージングジョブ商品5', '', 'abc', '個', ''],
+        ])
+
 class ProductCategoryViewTests(TestCase):
     """商品マスタ - 商品カテゴリ管理のテスト"""
 
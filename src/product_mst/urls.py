@@ -12,6 +12,7 @@ urlpatterns = [
     path("import/csv", views.ImportCSV.as_view(), name='import_csv'),
     path('export/csv', views.ExportCSV.as_view(), name='export_csv'),
     path('export/check/', views.ExportCheckView.as_view(), name='export_check'),
+    path('count/', views.ListCountView.as_view(), name='count'),
     path('create/', views.ProductCreateView.as_view(), name='create'),
     path('<int:pk>/update/', views.ProductUpdateView.as_view(), name='update'),
     path('bulk_delete/', views.ProductBulkDeleteView.as_view(), name='bulk_delete'),
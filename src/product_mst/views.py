@@ -1,11 +1,14 @@
+import re
+from decimal import Decimal
 from django.views import generic
 from django.db import transaction
 from django.urls import reverse_lazy, reverse
 from .models import Product, ProductCategory
 from .form import ProductSearchForm, ProductForm, ProductCategoryForm
 from config.common import Common
-from config.base import CSVExportBaseView, CSVImportBaseView, ExcelExportBaseView, PrivilegeRequiredMixin
+from config.base import CSVExportBaseView, CSVImportBaseView, EstimatedCountPaginator, ExcelExportBaseView, ImportLookup, ListCountBaseView, PrivilegeRequiredMixin
 from django.db.models import Q
+from django.core.validators import MaxLengthValidator
 from django.contrib import messages
 from django.http import JsonResponse, Http404
 from django.template.loader import render_to_string
@@ -25,9 +28,22 @@ HEADER_MAP = {
     '説明': 'description',
 }
 
+# 出力列定義（ヘッダ → ORMパス）
+EXPORT_COLUMNS = {
+    '商品名': 'product_name',
+    '商品カテゴリ': 'product_category__product_category_name',
+    '単価': 'unit_price',
+    '単位': 'unit',
+    '説明': 'description',
+}
+
 # 出力ファイル名定義
 FILENAME_PREFIX = 'product_mst'
 
+# キーワード中の単価指定（数値・範囲）
+PRICE_PATTERN = re.compile(r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?')
+PRICE_RANGE_PATTERN = re.compile(r'(%s)?[-~〜～](%s)?' % (PRICE_PATTERN.pattern, PRICE_PATTERN.pattern))
+
 
 #--------------------------
 # Product CRUD
@@ -42,6 +58,7 @@ class ProductListView(LoginRequiredMixin, generic.ListView):
     template_name = 'product_mst/list.html'
     context_object_name = 'products'
     paginate_by = settings.DEFAULT_PAGE_SIZE
+    paginator_class = EstimatedCountPaginator
 
     def get_queryset(self):
         req = self.request
@@ -52,7 +69,7 @@ class ProductListView(LoginRequiredMixin, generic.ListView):
 
         # フォームが有効なら検索条件を反映
         if form.is_valid():
-            queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset)
+            queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset, tenant=req.user.tenant)
 
         # 並び替え
         sort = form.cleaned_data.get('sort') if form.is_valid() else ''
@@ -354,21 +371,25 @@ class ProductCategoryManageView(LoginRequiredMixin, PrivilegeRequiredMixin, gene
 class ExportExcel(LoginRequiredMixin, ExcelExportBaseView):
     '''
     商品マスタのExcel出力
-    - 共通の get_row を利用
+    - 出力列は EXPORT_COLUMNS で定義
     - 検索条件を適用
     '''
     model_class = Product
     filename_prefix = FILENAME_PREFIX
-    headers = list(HEADER_MAP.keys())
+    columns = EXPORT_COLUMNS
 
     def get_queryset(self, request):
         '''検索条件を適用したクエリセットを返す'''
+        form = ProductSearchForm(request.GET or None)
         queryset = super().get_queryset(request)
-        return filter_data(request=request, queryset=queryset).order_by('product_name')
+        if form.is_valid():
+            queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset, tenant=request.user.tenant)
+        return queryset.order_by('product_name')
 
-    def row(self, rec):
-        '''1行分のデータを返す'''
-        return get_row(rec=rec)
+
+class ListCountView(LoginRequiredMixin, ListCountBaseView):
+    '''商品一覧の正確な件数を返す'''
+    list_view_class = ProductListView
 
 
 class ExportCheckView(LoginRequiredMixin, generic.View):
@@ -378,10 +399,9 @@ class ExportCheckView(LoginRequiredMixin, generic.View):
         queryset = Product.objects.filter(is_deleted=False, tenant=request.user.tenant)
 
         if form.is_valid():
-            queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset)
+            queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset, tenant=request.user.tenant)
 
-        count = queryset.count()
-        if count > settings.MAX_EXPORT_ROWS:
+        if Common.exceeds_count(queryset, settings.MAX_EXPORT_ROWS):
             return JsonResponse({
                 'warning': f'出力件数が上限（{settings.MAX_EXPORT_ROWS:,}件）を超えています。'
                            f'先頭{settings.MAX_EXPORT_ROWS:,}件のみを出力します。'
@@ -393,22 +413,22 @@ class ExportCheckView(LoginRequiredMixin, generic.View):
 class ExportCSV(LoginRequiredMixin, CSVExportBaseView):
     '''
     商品マスタのCSV出力
-    - 共通の get_row を利用
+    - 出力列は EXPORT_COLUMNS で定義
     - 検索条件を適用
     '''
     model_class = Product
     filename_prefix = FILENAME_PREFIX
-    headers = list(HEADER_MAP.keys())
+    columns = EXPORT_COLUMNS
 
     def get_queryset(self, request):
         form = ProductSearchForm(request.GET or None)
 
-        # クエリセットを初期化（削除フラグ：False, 所属テナント限定）
-        queryset = Product.objects.filter(is_deleted=False, tenant=request.user.tenant)
+        # クエリセットを初期化（所属テナント限定、差分出力時以外は削除フラグ：False）
+        queryset = self.get_base_queryset(request)
 
         # フォームが有効なら検索条件を反映
         if form.is_valid():
-            queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset)
+            queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset, tenant=request.user.tenant)
 
         # 並び替え
         sort = form.cleaned_data.get('sort') if form.is_valid() else ''
@@ -416,53 +436,69 @@ class ExportCSV(LoginRequiredMixin, CSVExportBaseView):
 
         return queryset
 
-    def row(self, rec):
-        '''1行分のデータを返す'''
-        return get_row(rec=rec)
-
 
 class ImportCSV(LoginRequiredMixin, PrivilegeRequiredMixin, CSVImportBaseView):
     '''
     商品マスタのCSVインポート
-    - ヘッダ検証と1行ごとのバリデーション
+    - ヘッダ検証とチャンク単位の列ごとのバリデーション（ProductForm と同じ検証内容）
     - 正常データをProductオブジェクトに変換
     '''
     expected_headers = list(HEADER_MAP.keys())
     model_class = Product
     unique_field = ('tenant_id', 'product_name')
+    upsert_unique_fields = ('tenant', 'product_name')
     HEADER_MAP = HEADER_MAP
-
-    def validate_row(self, row, idx, existing, request):
+    import_form_class = ProductForm
+    staging_form_class = ProductForm
+    staging_duplicate_message = '商品「{product_name}」は既に存在します。'
+    # Product.clean() の説明の文字数チェック
+    staging_clean_validators = {
+        'description': [MaxLengthValidator(255, 'この値は 255 文字以下でなければなりません( 256 文字になっています)。')],
+    }
+
+    def get_staging_references(self, request):
+        return {
+            'product_category': (
+                ProductCategory.objects.filter(tenant=request.user.tenant),
+                'product_category_name',
+                '商品カテゴリ「{value}」が存在しません。',
+            ),
+        }
+
+    def get_lookups(self, rows, request):
+        return {
+            'product_category': ImportLookup(
+                ProductCategory.objects.filter(tenant=request.user.tenant),
+                'product_category_name',
+                [row.get('product_category') for row in rows],
+            ),
+        }
+
+    def get_form_data(self, row):
         data = row.copy()
+        category_name = row.get('product_category')
+        data['product_category'] = self.lookups['product_category'].get(category_name) if category_name else None
+        return data
 
+    def validate_row(self, row, idx, existing, request):
         #---------------------------------------------------
         # 商品カテゴリチェック
         #---------------------------------------------------
-        category_name = data.get('product_category')
-        if category_name:
-            try:
-                category = ProductCategory.objects.get(
-                    product_category_name=category_name,
-                    tenant=request.user.tenant
-                )
-                data['product_category'] = category.id
-            except ProductCategory.DoesNotExist:
-                return None, f'{idx}行目: 商品カテゴリ「{category_name}」が存在しません。'
-        else:
-            data['product_category'] = None
+        category_name = row.get('product_category')
+        if category_name and self.lookups['product_category'].get(category_name) is None:
+            return None, f'{idx}行目: 商品カテゴリ「{category_name}」が存在しません。'
 
         #---------------------------------------------------
-        # Djangoフォームバリデーション
+        # フォームの検証結果（チャンク単位で列ごとに検証済み）
         #---------------------------------------------------
-        form = ProductForm(data=data)
-        if not form.is_valid():
-            error_text = '; '.join(self._format_errors_with_verbose_name(form))
-            return None, f'{idx}行目: {error_text}'
+        result = self.validated[idx]
+        if result.errors:
+            return None, self.format_column_errors(result, idx)
 
         #---------------------------------------------------
         # 重複チェック（tenant + product_name）
         #---------------------------------------------------
-        product_name = data.get('product_name')
+        product_name = row.get('product_name')
         key = (request.user.tenant_id, product_name)
         if key in existing:
             return None, f'{idx}行目: 商品「{product_name}」は既に存在します。'
@@ -471,7 +507,7 @@ class ImportCSV(LoginRequiredMixin, PrivilegeRequiredMixin, CSVImportBaseView):
         #---------------------------------------------------
         # Productオブジェクト作成
         #---------------------------------------------------
-        obj = form.save(commit=False)
+        obj = result.instance
         obj.tenant = request.user.tenant
         obj.create_user = request.user
         obj.update_user = request.user
@@ -482,27 +518,66 @@ class ImportCSV(LoginRequiredMixin, PrivilegeRequiredMixin, CSVImportBaseView):
 #--------------------------
 # 共通関数
 #--------------------------
-def get_row(rec):
-    '''CSV/Excel出力用: 1行分のリストを返す'''
-    return [
-        rec.product_name,
-        rec.product_category.product_category_name if rec.product_category else '',
-        rec.unit_price,
-        rec.unit,
-        rec.description,
-    ]
-
-
-def filter_data(cleaned_data, queryset):
+def parse_keyword(keyword):
+    '''
+    キーワードを空白で分割し、種類ごとのトークンに振り分ける
+    - 数値（例: 1000, 1,000）: 単価の完全一致 ＋ 文字列検索
+    - 範囲（例: 100-500, 100~, ~500）: 単価の範囲検索
+    - 上記以外: 文字列検索
+    '''
+    tokens = []
+    for token in keyword.split():
+        match = PRICE_RANGE_PATTERN.fullmatch(token)
+        if match and (match.group(1) or match.group(2)):
+            tokens.append(('range', (to_price(match.group(1)), to_price(match.group(2)))))
+        elif PRICE_PATTERN.fullmatch(token):
+            tokens.append(('number', token))
+        else:
+            tokens.append(('text', token))
+    return tokens
+
+
+def to_price(value):
+    '''数値文字列（カンマ区切り可）をDecimalに変換（空はNone）'''
+    return Decimal(value.replace(',', '')) if value else None
+
+
+def keyword_condition(keyword, tenant):
+    '''
+    キーワード検索の条件（トークンごとの条件をANDで結合）
+    - 文字列: 検索用カラム（トライグラム索引）の部分一致
+    - カテゴリ名: 同じ正規化をしたカテゴリ名の部分一致（同一クエリ内のサブクエリ）
+    - 数値・範囲: 単価（テナント＋単価の索引）で比較
+    '''
+    categories = ProductCategory.objects.filter(tenant=tenant).annotate(
+        search_name=Common.search_text_expression(['product_category_name'])
+    )
+    condition = Q()
+    for kind, value in parse_keyword(keyword):
+        if kind == 'range':
+            lower, upper = value
+            token_q = Q()
+            if lower is not None:
+                token_q &= Q(unit_price__gte=lower)
+            if upper is not None:
+                token_q &= Q(unit_price__lte=upper)
+            condition &= token_q
+            continue
+
+        text = Common.normalize_search_text(value)
+        token_q = Q(search_text__contains=text)
+        if kind == 'number':
+            token_q |= Q(unit_price=to_price(value))
+        token_q |= Q(product_category__in=categories.filter(search_name__contains=text).values('pk'))
+
+        condition &= token_q
+    return condition
+
+
+def filter_data(cleaned_data, queryset, tenant):
     keyword = cleaned_data.get('search_keyword', '').strip()
     if keyword:
-        queryset = queryset.filter(
-            Q(product_name__icontains=keyword)
-            | Q(description__icontains=keyword)
-            | Q(unit__icontains=keyword)
-            | Q(unit_price__icontains=keyword)
-            | Q(product_category__product_category_name__icontains=keyword)
-        )
+        queryset = queryset.filter(keyword_condition(keyword, tenant))
 
     if cleaned_data.get('search_product_name'):
         queryset = queryset.filter(product_name__icontains=cleaned_data['search_product_name'])
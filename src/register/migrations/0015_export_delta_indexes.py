@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('register', '0014_customuser_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['tenant', 'updated_at', 'id'], name='idx_user_updated_at'),
+        ),
+    ]
@@ -2,10 +2,15 @@ from django.db import models
 from django.urls import reverse
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
+from django.contrib.postgres.indexes import GinIndex
 from .constants import GENDER_CHOICES, PRIVILEGE_CHOICES
 from config.base import BaseModel
+from config.common import Common
 import register.constants as Constant
 
+# キーワード検索の対象カラム
+SEARCH_FIELDS = ['username', 'username_kana', 'email', 'tel_number']
+
 class CustomUser(AbstractUser, BaseModel):
     '''
     独自ユーザーモデル
@@ -82,10 +87,22 @@ class CustomUser(AbstractUser, BaseModel):
         help_text='ユーザーが所属するグループを選択してください。（複数選択可）'
     )
 
+    # キーワード検索用（DBで自動生成・正規化済み・トライグラム索引対象）
+    search_text = models.GeneratedField(
+        expression=Common.search_text_expression(SEARCH_FIELDS),
+        output_field=models.TextField(),
+        db_persist=True,
+        verbose_name='検索用テキスト',
+    )
+
     class Meta:
         verbose_name = 'ユーザー'
         verbose_name_plural = 'ユーザーマスタ'
         ordering = ['username']
+        indexes = [
+            GinIndex(fields=['search_text'], opclasses=['gin_trgm_ops'], name='idx_user_search_trgm'),
+            models.Index(fields=['tenant', 'updated_at', 'id'], name='idx_user_updated_at'),
+        ]
 
     def __str__(self):
         return self.username
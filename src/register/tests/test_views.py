@@ -1,5 +1,7 @@
 from django.conf import settings
 from django.test import TestCase, Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from register.models import UserGroup, CustomUser
 from sales_order.models import SalesOrder
 from register.views import UserUpdateView, UserDeleteView, UserBulkDeleteView, HEADER_MAP
@@ -459,6 +461,14 @@ class RegisterViewTests(TestCase):
         self.assertEqual(len(users_p2), 1, '2ページ目の件数が1件であること')
         self.assertTrue(any('user_20' in p.username for p in users_p2))
 
+    def test_1_2_1_13(self):
+        '''検索処理（正常系: キーワードの全角半角・カタカナひらがなの違いを区別しない）'''
+        for key in ['ｶﾝﾘ ﾕｰｻﾞｰ', 'かんり', 'ＭＡＮＡＧＥＲ＿ＵＳＥＲ']:
+            response = self.client.get(reverse('register:list'), {'search_keyword': key})
+            self.assertEqual(response.status_code, 200)
+            names = [u.username for u in response.context['users']]
+            self.assertEqual(names, ['manager_user'], key)
+
     #----------------
     # CreateView
     #----------------
@@ -1595,7 +1605,7 @@ class RegisterViewTests(TestCase):
 
         # 文字コード確認
         try:
-            content = response.content.decode('utf-8')
+            content = b''.join(response.streaming_content).decode('utf-8')
         except UnicodeDecodeError:
             self.fail('CSVファイルの文字コードがutf-8ではありません。')
 
@@ -1723,6 +1733,38 @@ class RegisterViewTests(TestCase):
         self.assertEqual('出力件数が上限（10,000件）を超えています。先頭10,000件のみを出力します。', data['warning'])
         self.assertNotIn('ok', data)
 
+    def test_6_1_1_5(self):
+        '''CSVエクスポート（正常系：所属グループ付きでもクエリ数が件数に依存しない）'''
+        group1 = UserGroup.objects.create(
+            tenant=self.user.tenant,
+            group_name='開発チーム',
+            create_user=self.user,
+            update_user=self.user,
+        )
+        group2 = UserGroup.objects.create(
+            tenant=self.user.tenant,
+            group_name='営業チーム',
+            create_user=self.user,
+            update_user=self.user,
+        )
+        url = reverse('register:export_csv')
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self._request_and_parse(url)
+            return len(queries)
+
+        before = count_queries()
+        for user in self._create_max_data(20):
+            user.groups_custom.add(group1, group2)
+        after = count_queries()
+        self.assertEqual(before, after)
+
+        # 所属グループはグループ名順にカンマ区切りで出力
+        rows = self._request_and_parse(url)
+        row = next(r for r in rows if r[0] == 'テストユーザー0')
+        self.assertEqual(row[-1], '営業チーム, 開発チーム')
+
     def test_6_1_2_1(self):
         '''CSVエクスポート（異常系：直リンク）'''
         url = reverse('register:export_csv')
@@ -2064,6 +2106,273 @@ class RegisterViewTests(TestCase):
         self.assertLessEqual(abs((user.created_at - timezone.now()).total_seconds()), 5)
         self.assertLessEqual(abs((user.updated_at - timezone.now()).total_seconds()), 5)
 
+    def test_7_1_1_6(self):
+        '''CSVインポート（正常系：一括登録・所属グループ経由の参照権限と検索インデックス）'''
+        from dashboard.models import SearchEntry
+        from register.views import ImportCSV
+        from sales_order.models import SalesOrderVisibility
+
+        url = reverse('register:import_csv')
+        CustomUser.objects.exclude(pk=self.user.pk).delete()
+        group = UserGroup.objects.create(
+            tenant=self.user.tenant,
+            group_name='営業チーム',
+            create_user=self.user,
+            update_user=self.user,
+        )
+        sales_order = SalesOrder.objects.create(
+            tenant=self.user.tenant,
+            assignee=self.user,
+            sales_order_no='SO-001',
+            sales_order_date='2025-09-30',
+            create_user=self.user,
+            update_user=self.user,
+        )
+        sales_order.reference_groups.add(group)
+
+        rows = [
+            {
+                'ユーザー名': f'一括ユーザー{i}',
+                'ユーザー名（カナ）': 'イッカツユーザー',
+                'メールアドレス': f'bulk{i}@example.com',
+                '電話番号': '111-1111-1111',
+                '性別': '男性',
+                '雇用状態': '在職中',
+                '権限': '参照',
+                '所属グループ': '営業チーム',
+            }
+            for i in range(5)
+        ]
+
+        # 2件ずつ一括登録（ユーザー・所属グループともにバッチ単位でINSERT）
+        ImportCSV.batch_size = 2
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(url, {'file': self._make_csv_file(rows)})
+        finally:
+            ImportCSV.batch_size = settings.IMPORT_BATCH_SIZE
+        self.assertEqual(response.status_code, 200, response.content)
+
+        inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT INTO')]
+        self.assertEqual(len([sql for sql in inserts if sql.startswith('INSERT INTO "register_customuser" ')]), 3)
+        self.assertEqual(len([sql for sql in inserts if sql.startswith('INSERT INTO "register_customuser_groups_custom" ')]), 3)
+
+        users = CustomUser.objects.filter(email__startswith='bulk')
+        self.assertEqual(users.count(), 5)
+        for user in users:
+            self.assertEqual(list(user.groups_custom.all()), [group])
+
+        # 所属グループ経由で受注を参照可能
+        self.assertEqual(
+            SalesOrderVisibility.objects.filter(sales_order=sales_order, user__in=users).count(), 5
+        )
+
+        # 横断検索のインデックスに登録
+        self.assertEqual(
+            SearchEntry.objects.filter(entity_type='user', object_id__in=users.values('pk')).count(), 5
+        )
+
+    def test_7_1_1_7(self):
+        '''CSVインポート（正常系：更新モードでメールアドレスが一致するユーザーを更新・所属グループを入れ替え）'''
+        url = reverse('register:import_csv')
+        CustomUser.objects.exclude(pk=self.user.pk).delete()
+        sales = UserGroup.objects.create(
+            tenant=self.user.tenant, group_name='営業チーム', create_user=self.user, update_user=self.user,
+        )
+        support = UserGroup.objects.create(
+            tenant=self.user.tenant, group_name='サポートチーム', create_user=self.user, update_user=self.user,
+        )
+        updated = CustomUser.objects.create(
+            tenant=self.user.tenant, username='更新前ユーザー', email='update@example.com',
+            employment_status='1', privilege=PRIVILEGE_VIEWER, create_user=self.user, update_user=self.user,
+        )
+        updated.groups_custom.add(sales)
+        unchanged = CustomUser.objects.create(
+            tenant=self.user.tenant, username='変更なしユーザー', email='same@example.com',
+            employment_status='1', privilege=PRIVILEGE_VIEWER, create_user=self.user, update_user=self.user,
+        )
+        unchanged.groups_custom.add(support)
+        unchanged_at = unchanged.updated_at
+
+        row = {
+            'ユーザー名（カナ）': '', '性別': '', '電話番号': '', '雇用状態': '在職中', '権限': '参照',
+        }
+        rows = [
+            {**row, 'ユーザー名': '更新後ユーザー', 'メールアドレス': 'update@example.com', '所属グループ': 'サポートチーム'},
+            {**row, 'ユーザー名': '変更なしユーザー', 'メールアドレス': 'same@example.com', '所属グループ': 'サポートチーム'},
+            {**row, 'ユーザー名': '新規ユーザー', 'メールアドレス': 'new@example.com', '所属グループ': '営業チーム'},
+        ]
+        response = self.client.post(url, {'file': self._make_csv_file(rows), 'mode': 'upsert'})
+        res_json = json.loads(response.content)
+
+        # ステータスコード・件数確認
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((res_json['inserted'], res_json['updated'], res_json['unchanged']), (1, 1, 1))
+        self.assertEqual(res_json['message'], '1件を登録、1件を更新しました。（変更なし 1件）')
+
+        # 更新：主キー・作成者はそのままで取込項目・所属グループを更新
+        user = CustomUser.objects.get(email='update@example.com')
+        self.assertEqual(user.pk, updated.pk)
+        self.assertEqual(user.username, '更新後ユーザー')
+        self.assertEqual(list(user.groups_custom.all()), [support])
+
+        # 変更なし：更新日時も変更しない
+        self.assertEqual(CustomUser.objects.get(pk=unchanged.pk).updated_at, unchanged_at)
+
+        # 新規登録
+        self.assertEqual(list(CustomUser.objects.get(email='new@example.com').groups_custom.all()), [sales])
+
+    def test_7_1_1_8(self):
+        '''CSVインポート（正常系：システム権限のユーザーはシステム権限のユーザーを更新可能）'''
+        url = reverse('register:import_csv')
+        self.user.privilege = PRIVILEGE_SYSTEM
+        self.user.save()
+        CustomUser.objects.exclude(pk=self.user.pk).delete()
+        system_user = CustomUser.objects.create(
+            tenant=self.user.tenant, username='更新前ユーザー', email='system-user@example.com',
+            employment_status='1', privilege=PRIVILEGE_SYSTEM,
+        )
+
+        rows = [{
+            'ユーザー名': '更新後ユーザー', 'ユーザー名（カナ）': '', '性別': '', 'メールアドレス': 'system-user@example.com',
+            '電話番号': '', '雇用状態': '在職中', '権限': 'システム', '所属グループ': '',
+        }]
+        response = self.client.post(url, {'file': self._make_csv_file(rows), 'mode': 'upsert'})
+        res_json = json.loads(response.content)
+
+        # ステータスコード・件数確認
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((res_json['inserted'], res_json['updated']), (0, 1))
+
+        # 主キーはそのままで更新
+        system_user.refresh_from_db()
+        self.assertEqual((system_user.username, system_user.privilege), ('更新後ユーザー', PRIVILEGE_SYSTEM))
+
+    def test_7_1_2_12(self):
+        '''CSVインポート（異常系：更新モードでも他テナントのメールアドレスは重複エラー）'''
+        url = reverse('register:import_csv')
+        CustomUser.objects.exclude(pk=self.user.pk).delete()
+        other_tenant = Tenant.objects.create(tenant_name='他テナント', representative_name='代表', email='other@example.com')
+        CustomUser.objects.create(
+            tenant=other_tenant, username='他テナントユーザー', email='other-user@example.com',
+            employment_status='1', privilege=PRIVILEGE_VIEWER,
+        )
+
+        rows = [{
+            'ユーザー名': '上書きユーザー', 'ユーザー名（カナ）': '', '性別': '', 'メールアドレス': 'other-user@example.com',
+            '電話番号': '', '雇用状態': '在職中', '権限': '参照', '所属グループ': '',
+        }]
+        response = self.client.post(url, {'file': self._make_csv_file(rows), 'mode': 'upsert'})
+        res_json = json.loads(response.content)
+
+        # ステータスコード・エラーメッセージ確認
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(['2行目: メールアドレス「other-user@example.com」は既に存在します。'], res_json['details'])
+
+        # 他テナントのユーザーは変更されない
+        self.assertEqual(CustomUser.objects.get(email='other-user@example.com').username, '他テナントユーザー')
+
+    def test_7_1_2_13(self):
+        '''CSVインポート（異常系：正規化後に登録済みと一致するメールアドレスはフォームと同じ一意エラー）'''
+        url = reverse('register:import_csv')
+        CustomUser.objects.exclude(pk=self.user.pk).delete()
+        CustomUser.objects.create(
+            tenant=self.user.tenant, username='登録済みユーザー', email='exists@example.com',
+            employment_status='1', privilege=PRIVILEGE_VIEWER,
+        )
+
+        rows = [
+            {
+                'ユーザー名': f'新規ユーザー{i}', 'ユーザー名（カナ）': '', '性別': '', 'メールアドレス': email,
+                '電話番号': '', '雇用状態': '在職中', '権限': '参照', '所属グループ': '',
+            }
+            for i, email in enumerate(['new@example.com', 'exists@EXAMPLE.com', ' exists@example.com'])
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'file': self._make_csv_file(rows)})
+        res_json = json.loads(response.content)
+
+        # ステータスコード・エラーメッセージ確認（ドメインの大文字・前後の空白は正規化して判定）
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([
+            '3行目: メールアドレス: この メールアドレス を持った ユーザー が既に存在します。',
+            '4行目: メールアドレス: この メールアドレス を持った ユーザー が既に存在します。',
+        ], res_json['details'])
+
+        # 一意チェックはチャンクで1回のみ
+        self.assertEqual(sum('"register_customuser"."email" IN' in query['sql'] for query in queries), 1)
+
+        # 件数確認
+        self.assertFalse(CustomUser.objects.filter(email='new@example.com').exists())
+
+    def test_7_1_2_14(self):
+        '''CSVインポート（異常系：更新モードでもシステム権限・削除済みのユーザーは更新しない）'''
+        url = reverse('register:import_csv')
+        CustomUser.objects.exclude(pk=self.user.pk).delete()
+        system_user = CustomUser.objects.create(
+            tenant=self.user.tenant, username='システムユーザー', email='system-user@example.com',
+            employment_status='1', privilege=PRIVILEGE_SYSTEM,
+        )
+        deleted_user = CustomUser.objects.create(
+            tenant=self.user.tenant, username='削除済みユーザー', email='deleted-user@example.com',
+            employment_status='1', privilege=PRIVILEGE_VIEWER, is_deleted=True,
+        )
+
+        row = {
+            'ユーザー名': '上書きユーザー', 'ユーザー名（カナ）': '', '性別': '',
+            '電話番号': '', '雇用状態': '在職中', '権限': '参照', '所属グループ': '',
+        }
+        rows = [
+            {**row, 'メールアドレス': 'system-user@example.com'},
+            {**row, 'メールアドレス': 'deleted-user@example.com'},
+        ]
+        response = self.client.post(url, {'file': self._make_csv_file(rows), 'mode': 'upsert'})
+        res_json = json.loads(response.content)
+
+        # ステータスコード・エラーメッセージ確認
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([
+            '2行目: メールアドレス: この メールアドレス を持った ユーザー が既に存在します。',
+            '3行目: メールアドレス: この メールアドレス を持った ユーザー が既に存在します。',
+        ], res_json['details'])
+
+        # システム権限のユーザーは変更されない
+        system_user.refresh_from_db()
+        self.assertEqual((system_user.username, system_user.privilege), ('システムユーザー', PRIVILEGE_SYSTEM))
+
+        # 削除済みのユーザーは復元されない
+        deleted_user.refresh_from_db()
+        self.assertEqual((deleted_user.username, deleted_user.is_deleted), ('削除済みユーザー', True))
+
+    def test_7_1_2_15(self):
+        '''CSVインポート（異常系：ログインユーザーより上位の権限は指定不可）'''
+        url = reverse('register:import_csv')
+        CustomUser.objects.exclude(pk=self.user.pk).delete()
+        updated = CustomUser.objects.create(
+            tenant=self.user.tenant, username='更新前ユーザー', email='update@example.com',
+            employment_status='1', privilege=PRIVILEGE_VIEWER,
+        )
+
+        row = {
+            'ユーザー名': 'システムユーザー', 'ユーザー名（カナ）': '', '性別': '',
+            '電話番号': '', '雇用状態': '在職中', '権限': 'システム', '所属グループ': '',
+        }
+        for mode, email in [('insert', 'new@example.com'), ('upsert', 'update@example.com')]:
+            with self.subTest(mode=mode):
+                rows = [{**row, 'メールアドレス': email}]
+                response = self.client.post(url, {'file': self._make_csv_file(rows), 'mode': mode})
+                res_json = json.loads(response.content)
+
+                # ステータスコード・エラーメッセージ確認
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(len(res_json['details']), 1)
+                self.assertTrue(res_json['details'][0].startswith('2行目: '), res_json['details'])
+
+        # 登録・更新されない
+        self.assertFalse(CustomUser.objects.filter(email='new@example.com').exists())
+        updated.refresh_from_db()
+        self.assertEqual((updated.username, updated.privilege), ('更新前ユーザー', PRIVILEGE_VIEWER))
+
     def test_7_1_2_1(self):
         '''CSVインポート（異常系：直リンク）'''
         self.client.logout()
@@ -13,6 +13,7 @@ urlpatterns = [
     path('import/csv', views.ImportCSV.as_view(), name='import_csv'),
     path('export/csv', views.ExportCSV.as_view(), name='export_csv'),
     path('export/check/', views.ExportCheckView.as_view(), name='export_check'),
+    path('count/', views.ListCountView.as_view(), name='count'),
     path('export/excel', views.ExportExcel.as_view(), name='export_excel'),
     path('bulk_delete/', views.UserBulkDeleteView.as_view(), name='bulk_delete'),
     path('group_manage/', views.UserGroupManageView.as_view(), name='group_manage'),
@@ -13,7 +13,7 @@ from django.db.models import Q
 from .models import CustomUser, UserGroup
 from .forms import UserSearchForm, SignUpForm, ChangePasswordForm, UserGroupForm, InitialUserForm, SignUpForm
 from config.common import Common
-from config.base import CSVExportBaseView, CSVImportBaseView, ExcelExportBaseView, PrivilegeRequiredMixin, SystemUserOnlyMixin, ManagerOverMixin
+from config.base import CSVExportBaseView, CSVImportBaseView, EstimatedCountPaginator, ExcelExportBaseView, ImportLookup, ListCountBaseView, PrivilegeRequiredMixin, SystemUserOnlyMixin, ManagerOverMixin
 from django.contrib.auth.views import PasswordChangeView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.conf import settings
@@ -42,6 +42,18 @@ HEADER_MAP = {
     '所属グループ': 'groups_custom'
 }
 
+# 出力列定義（ヘッダ → ORMパス or 式）
+EXPORT_COLUMNS = {
+    'ユーザー名': 'username',
+    'ユーザー名（カナ）': 'username_kana',
+    'メールアドレス': 'email',
+    '性別': Common.choice_label_expression('gender', GENDER_CHOICES),
+    '電話番号': 'tel_number',
+    '雇用状態': Common.choice_label_expression('employment_status', EMPLOYMENT_STATUS_CHOICES),
+    '権限': Common.choice_label_expression('privilege', PRIVILEGE_CHOICES),
+    '所属グループ': Common.related_names_expression(CustomUser.groups_custom, 'group_name'),
+}
+
 # 出力ファイル名定義
 FILENAME_PREFIX = 'user_mst'
 
@@ -56,6 +68,7 @@ class UserListView(LoginRequiredMixin, PrivilegeRequiredMixin, generic.ListView)
     template_name = 'register/list.html'
     context_object_name = 'users'
     paginate_by = settings.DEFAULT_PAGE_SIZE
+    paginator_class = EstimatedCountPaginator
 
     def get_queryset(self):
         req = self.request
@@ -448,14 +461,19 @@ class UserGroupManageView(LoginRequiredMixin, ManagerOverMixin, generic.FormView
 class ExportExcel(LoginRequiredMixin, ExcelExportBaseView):
     model_class = CustomUser
     filename_prefix = FILENAME_PREFIX
-    headers = HEADER_MAP
+    columns = EXPORT_COLUMNS
 
     def get_queryset(self, request):
+        form = UserSearchForm(request.GET or None, user=request.user)
         queryset = super().get_queryset(request)
-        return filter_data(request, queryset).order_by('username')
+        if form.is_valid():
+            queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset)
+        return queryset.order_by('username')
+
+class ListCountView(LoginRequiredMixin, PrivilegeRequiredMixin, ListCountBaseView):
+    '''ユーザー一覧の正確な件数を返す'''
+    list_view_class = UserListView
 
-    def row(self, rec):
-        return get_row(rec)
 
 class ExportCheckView(LoginRequiredMixin, generic.View):
     '''CSV出力前の件数チェック'''
@@ -466,8 +484,7 @@ class ExportCheckView(LoginRequiredMixin, generic.View):
         if form.is_valid():
             queryset = filter_data(cleaned_data=form.cleaned_data, queryset=queryset)
 
-        count = queryset.count()
-        if count > settings.MAX_EXPORT_ROWS:
+        if Common.exceeds_count(queryset, settings.MAX_EXPORT_ROWS):
             return JsonResponse({
                 'warning': f"出力件数が上限（{settings.MAX_EXPORT_ROWS:,}件）を超えています。"
                            f"先頭{settings.MAX_EXPORT_ROWS:,}件のみを出力します。"
@@ -478,19 +495,19 @@ class ExportCheckView(LoginRequiredMixin, generic.View):
 class ExportCSV(LoginRequiredMixin, CSVExportBaseView):
     '''
     ユーザーマスタのCSV出力
-    - 共通の get_row を利用
+    - 出力列は EXPORT_COLUMNS で定義
     - 検索条件を適用
     '''
     model_class = CustomUser
     filename_prefix = FILENAME_PREFIX
-    headers = list(HEADER_MAP.keys())
+    columns = EXPORT_COLUMNS
 
     def get_queryset(self, request):
         req = self.request
         form = UserSearchForm(req.GET or None)
 
-        # 初期クエリセット（削除フラグ：False, 所属テナント限定）
-        queryset = CustomUser.objects.filter(is_deleted=False, tenant=req.user.tenant)
+        # 初期クエリセット（所属テナント限定、差分出力時以外は削除フラグ：False）
+        queryset = self.get_base_queryset(req)
 
         # 検索フォーム有効時のフィルタ
         if form.is_valid():
@@ -502,18 +519,46 @@ class ExportCSV(LoginRequiredMixin, CSVExportBaseView):
 
         return queryset
 
-    def row(self, rec):
-        '''1行分のデータを返す'''
-        return get_row(rec=rec)
-
 
 class ImportCSV(LoginRequiredMixin, ManagerOverMixin, CSVImportBaseView):
     expected_headers = list(HEADER_MAP.keys())
     model_class = CustomUser
     unique_field = ('email')
+    upsert_unique_fields = ('email',)
     HEADER_MAP = HEADER_MAP
+    import_form_class = SignUpForm
+
+    def get_lookups(self, rows, request):
+        lookups = {
+            'groups_custom': ImportLookup(
+                UserGroup.objects.filter(tenant=request.user.tenant, is_deleted=False),
+                'group_name',
+                [name for row in rows for name in ImportLookup.split(row.get('groups_custom'))],
+            ),
+        }
+        if self.import_mode == 'upsert':
+            # 更新モード：更新対象の登録済みユーザー（メールアドレスで一致）
+            lookups['email'] = ImportLookup(self.get_upsert_queryset(), 'email', [row.get('email') for row in rows])
+        return lookups
+
+    def get_upsert_queryset(self):
+        '''
+        更新モードで更新対象とするユーザー
+        - 自テナントの削除されていないユーザーのみ（削除済みのユーザーは復元しない）
+        - システム権限以外のユーザーはシステム権限のユーザーを更新しない
+        - 対象外のユーザーと同じメールアドレスの行は、メールアドレスの一意チェックでエラー
+        '''
+        user = self.request.user
+        queryset = CustomUser.objects.filter(tenant=user.tenant, is_deleted=False)
+        if user.privilege != PRIVILEGE_SYSTEM:
+            queryset = queryset.exclude(privilege=PRIVILEGE_SYSTEM)
+        return queryset
 
-    def validate_row(self, row, idx, existing, request):
+    def get_import_form_kwargs(self):
+        # 権限はログインユーザーと同等・下位のみ指定可能（登録画面と同じ）
+        return {'user': self.request.user}
+
+    def get_form_data(self, row):
         data = row.copy()
 
         # ------------------------------------------------------
@@ -535,45 +580,39 @@ class ImportCSV(LoginRequiredMixin, ManagerOverMixin, CSVImportBaseView):
             data['privilege'] = privilege_map[val]
 
         # ------------------------------------------------------
-        # 所属グループ（カンマ区切り）を ID リストに変換
+        # 所属グループ（カンマ区切り）をオブジェクトのリストに変換
         # ------------------------------------------------------
-        group_value = data.get('groups_custom')
-        group_ids = []
-        if group_value:
-            group_names = [g.strip() for g in group_value.split(',') if g.strip()]
-            group_ids = list(
-                UserGroup.objects.filter(
-                    tenant=request.user.tenant,
-                    group_name__in=group_names,
-                    is_deleted=False
-                ).values_list('id', flat=True)
-            )
-        data['groups_custom'] = group_ids
+        group_names = ImportLookup.split(data.get('groups_custom'))
+        data['groups_custom'] = self.lookups['groups_custom'].get_many(group_names)
+        return data
+
+    def get_form_instance(self, row):
+        # 更新モードで登録済みのユーザーは、メールアドレスの一意チェックで自身を除く
+        return self.lookups['email'].get(row.get('email')) if self.import_mode == 'upsert' else None
 
+    def validate_row(self, row, idx, existing, request):
         # ------------------------------------------------------
         # 重複チェック（email）
         # ------------------------------------------------------
-        email = data.get('email')
+        email = row.get('email')
         if email in existing:
             return None, f'{idx}行目: メールアドレス「{email}」は既に存在します。'
         existing.add(email)
 
         # ------------------------------------------------------
-        # Djangoフォームバリデーション
+        # フォームの検証結果（チャンク単位で列ごとに検証済み）
         # ------------------------------------------------------
-        form = SignUpForm(data=data)
-        if not form.is_valid():
-            error_text = '; '.join(self._format_errors_with_verbose_name(form))
-            return None, f'{idx}行目: {error_text}'
+        result = self.validated[idx]
+        if result.errors:
+            return None, self.format_column_errors(result, idx)
 
         # ------------------------------------------------------
-        # オブジェクト作成
+        # オブジェクト作成（更新モードで登録済みのユーザーも新規のオブジェクトとして upsert する）
         # ------------------------------------------------------
-        obj = form.save(commit=False)
+        obj = result.instance
         obj.tenant = request.user.tenant
         obj.create_user = request.user
         obj.update_user = request.user
-        obj._form_instance = form
         return obj, None
 
 
@@ -660,20 +699,6 @@ class InitialUserRegisterDoneView(LoginRequiredMixin, SystemUserOnlyMixin, gener
 #--------------------------
 # 共通関数
 #--------------------------
-def get_row(rec):
-    group_names = ', '.join(rec.groups_custom.values_list('group_name', flat=True))
-
-    return [
-        rec.username,
-        rec.username_kana or '',
-        rec.email or '',
-        rec.get_gender_display(),
-        rec.tel_number or '',
-        rec.get_employment_status_display(),
-        rec.get_privilege_display(),
-        group_names,
-    ]
-
 def filter_data(cleaned_data, queryset):
     """ユーザーマスタ一覧の検索条件付与"""
     keyword = cleaned_data.get('search_keyword', '').strip()
@@ -683,11 +708,9 @@ def filter_data(cleaned_data, queryset):
     # キーワード検索
     #------------------------
     if keyword:
+        # ユーザー名・カナ・メール・電話番号は正規化済みの検索用カラム（トライグラム索引）で検索
         q |= (
-            Q(username__icontains=keyword)
-            | Q(username_kana__icontains=keyword)
-            | Q(email__icontains=keyword)
-            | Q(tel_number__icontains=keyword)
+            Q(search_text__contains=Common.normalize_search_text(keyword))
             | Q(groups_custom__group_name__icontains=keyword)
         )
 
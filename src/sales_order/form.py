@@ -1,6 +1,7 @@
 from django import forms
 from django.forms import inlineformset_factory
 from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
 from partner_mst.models import Partner
 from django.contrib.auth import get_user_model
 from register.models import UserGroup
@@ -125,8 +126,8 @@ class SalesOrderSearchForm(forms.Form):
             ('-delivery_due_date', '納入予定日：降順 ▼'),
         ],
         '合計金額': [
-            ('total_amount', '合計金額：昇順 ▲'),
-            ('-total_amount', '合計金額：降順 ▼'),
+            ('grand_total', '合計金額：昇順 ▲'),
+            ('-grand_total', '合計金額：降順 ▼'),
         ],
     }
 
@@ -237,6 +238,18 @@ class SalesOrderForm(forms.ModelForm):
                 )
             )
 
+            # 取引先は件数が多いため選択中のみ描画し、候補はAjaxで類似度順に取得
+            partner_field = self.fields['partner']
+            partner_field.widget.attrs['data-ajax--url'] = (
+                reverse('partner_mst:search') + '?partner_type=customer&partner_type=both'
+            )
+            partner_field.widget.attrs['data-ajax--delay'] = 250
+            selected = str(self['partner'].value() or '')
+            partner_field.widget.choices = [('', partner_field.empty_label)] + [
+                (partner.pk, str(partner))
+                for partner in (partner_field.queryset.filter(pk=selected) if selected.isdigit() else [])
+            ]
+
             # reference_users: 同じテナント所属 & 管理者以上のユーザーを候補に
             queryset = User.objects.filter(
                 tenant=user.tenant,
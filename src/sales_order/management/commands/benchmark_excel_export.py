@@ -0,0 +1,75 @@
+import multiprocessing
+import resource
+import tempfile
+import time
+from datetime import date
+from decimal import Decimal
+
+import openpyxl
+from django.core.management.base import BaseCommand
+from sales_order.views import HEADER_MAP
+
+
+def sample_row(i):
+    '''受注明細のCSV/Excel出力と同じ列構成のダミー行'''
+    return [
+        f'SO-2026-{i // 5 + 1:06d}', f'取引先{i % 200:03d}', date(2026, 1, 1), f'担当者{i % 20:02d}',
+        date(2026, 2, 1), '東京都千代田区', '備考', '', '', '', '', '四捨五入',
+        i % 5 + 1, f'商品{i % 500:03d}', Decimal('3'), Decimal('1200.00'), Decimal('1100.00'),
+        '課税', Decimal('0.10'), 'user_a, user_b', 'group_a',
+    ]
+
+
+def write_legacy(rows, file):
+    '''従来方式：通常のWorkbookにセル単位で書き込み'''
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'data'
+    for col, header in enumerate(HEADER_MAP, start=1):
+        ws.cell(row=1, column=col, value=header)
+    for row_idx in range(rows):
+        for col_idx, val in enumerate(sample_row(row_idx), start=1):
+            ws.cell(row=row_idx + 2, column=col_idx, value=val)
+    wb.save(file)
+
+
+def write_streamed(rows, file):
+    '''書き込み専用モード：行単位で追記（ExcelExportBaseView と同じ方式）'''
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title='data')
+    ws.append(list(HEADER_MAP))
+    for row_idx in range(rows):
+        ws.append(sample_row(row_idx))
+    wb.save(file)
+
+
+def measure(writer, rows, queue):
+    '''別プロセスで実行し、処理時間と最大常駐メモリ（KB）を返す'''
+    start = time.perf_counter()
+    with tempfile.TemporaryFile(suffix='.xlsx') as spool:
+        writer(rows, spool)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+class Command(BaseCommand):
+    '''
+    受注明細のExcel出力について、従来方式と書き込み専用モードの処理時間・最大メモリを比較する
+    '''
+    help = 'Excel出力の従来方式と書き込み専用モードの処理時間・最大メモリ使用量を比較します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help='出力行数')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        context = multiprocessing.get_context('fork')
+
+        # 計測ごとにプロセスを分け、最大常駐メモリが前の計測の影響を受けないようにする
+        for label, writer in [('従来方式', write_legacy), ('書き込み専用', write_streamed)]:
+            queue = context.Queue()
+            process = context.Process(target=measure, args=(writer, rows, queue))
+            process.start()
+            elapsed, max_rss = queue.get()
+            process.join()
+            self.stdout.write(f'{label}: {rows:,}行 {elapsed:.1f}秒 最大メモリ {max_rss / 1024:,.0f}MB')
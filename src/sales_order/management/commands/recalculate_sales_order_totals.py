@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sales_order.models import SalesOrder, SalesOrderDetail
+from sales_order.services import price_orders
+
+
+class Command(BaseCommand):
+    '''
+    受注ヘッダの金額集計（小計・消費税合計・総合計）を明細から一括再計算する
+    '''
+    help = '受注ヘッダの金額集計カラムを明細から一括で再計算します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='対象テナントID（未指定時は全テナント）')
+        parser.add_argument('--batch-size', type=int, default=1000, help='1回の更新件数')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = SalesOrder.objects.all()
+        if options.get('tenant'):
+            queryset = queryset.filter(tenant_id=options['tenant'])
+
+        updated = 0
+        last_pk = 0
+        while True:
+            # 主キー順にバッチ単位で取得
+            orders = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not orders:
+                break
+
+            # バッチ内の明細をまとめて金額計算
+            details = SalesOrderDetail.objects.filter(sales_order__in=orders)
+            pricing = price_orders(orders, details)
+
+            changed = []
+            for order in orders:
+                result = pricing[order.pk]
+                totals = (result['subtotal'], result['tax_total'], result['grand_total'])
+                if totals != (order.subtotal, order.tax_total, order.grand_total):
+                    order.subtotal, order.tax_total, order.grand_total = totals
+                    changed.append(order)
+
+            with transaction.atomic():
+                SalesOrder.objects.bulk_update(changed, ['subtotal', 'tax_total', 'grand_total'])
+
+            updated += len(changed)
+            last_pk = orders[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f'{updated}件の受注金額を更新しました。'))
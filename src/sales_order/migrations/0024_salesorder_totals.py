@@ -0,0 +1,102 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:32
+
+from collections import defaultdict
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR, ROUND_HALF_UP
+from django.db import migrations, models
+
+
+# 端数処理方法 → Decimalの丸めモード（マイグレーション作成時点の sales_order.services.ROUNDING_MODES）
+ROUNDING_MODES = {
+    'floor': ROUND_FLOOR,
+    'ceil': ROUND_CEILING,
+    'round': ROUND_HALF_UP,
+}
+
+
+def calculate_totals(rounding_method, details):
+    '''
+    1受注分の明細から (小計, 消費税合計, 総合計) を算出（マイグレーション作成時点の price_order と同じ計算）
+    - 商品のない行は計算対象外、消費税は税率ごとに課税対象額を合算してから端数処理
+    '''
+    rounding = ROUNDING_MODES.get(rounding_method, ROUND_HALF_UP)
+    subtotal = Decimal('0')
+    taxable_by_rate = defaultdict(Decimal)
+
+    for d in details:
+        if not d.product_id:
+            continue
+        base = Decimal(d.quantity or 0) * Decimal(d.billing_unit_price or 0)
+        subtotal += base
+        if not d.is_tax_exempt:
+            taxable_by_rate[Decimal(d.tax_rate or 0)] += base
+
+    subtotal = subtotal.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    tax_total = sum(
+        ((taxable * rate).to_integral_value(rounding=rounding) for rate, taxable in taxable_by_rate.items()),
+        Decimal('0'),
+    ).quantize(Decimal('0.01'))
+    return subtotal, tax_total, subtotal + tax_total
+
+
+def backfill_totals(apps, schema_editor):
+    '''
+    既存の受注ヘッダの金額集計カラムを明細から算出（アプリケーションのコードに依存しないよう計算はこのファイルに記述）
+    '''
+    SalesOrder = apps.get_model('sales_order', 'SalesOrder')
+    SalesOrderDetail = apps.get_model('sales_order', 'SalesOrderDetail')
+
+    last_pk = 0
+    while True:
+        orders = list(SalesOrder.objects.filter(pk__gt=last_pk).order_by('pk')[:1000])
+        if not orders:
+            break
+
+        grouped = defaultdict(list)
+        for d in SalesOrderDetail.objects.filter(sales_order__in=orders):
+            grouped[d.sales_order_id].append(d)
+        for order in orders:
+            order.subtotal, order.tax_total, order.grand_total = calculate_totals(
+                order.rounding_method, grouped[order.pk]
+            )
+        SalesOrder.objects.bulk_update(orders, ['subtotal', 'tax_total', 'grand_total'])
+        last_pk = orders[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_order', '0023_alter_salesorderdetail_billing_unit_price_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesorder',
+            name='grand_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='総合計'),
+        ),
+        migrations.AddField(
+            model_name='salesorder',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='小計'),
+        ),
+        migrations.AddField(
+            model_name='salesorder',
+            name='tax_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='消費税合計'),
+        ),
+        migrations.AlterField(
+            model_name='salesorderdetail',
+            name='billing_unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='請求単価'),
+        ),
+        migrations.AlterField(
+            model_name='salesorderdetail',
+            name='quantity',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='数量'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['tenant', 'grand_total'], name='idx_sales_order_grand_total'),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:42
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    '''
+    既存の受注番号（SO-YYYY-NNNNNN）からテナント・年度ごとの最終番号を初期化
+    '''
+    SalesOrder = apps.get_model('sales_order', 'SalesOrder')
+    SalesOrderNoSequence = apps.get_model('sales_order', 'SalesOrderNoSequence')
+
+    pattern = re.compile(r'^SO-(\d{4})-(\d+)$')
+    last_values = {}
+    for tenant_id, sales_order_no in SalesOrder.objects.values_list('tenant_id', 'sales_order_no').iterator():
+        match = pattern.match(sales_order_no or '')
+        if not match:
+            continue
+        key = (tenant_id, int(match.group(1)))
+        last_values[key] = max(last_values.get(key, 0), int(match.group(2)))
+
+    SalesOrderNoSequence.objects.bulk_create([
+        SalesOrderNoSequence(tenant_id=tenant_id, year=year, last_value=last_value)
+        for (tenant_id, year), last_value in last_values.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_order', '0024_salesorder_totals'),
+        ('tenant_mst', '0005_rename_contact_email_tenant_email_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesOrderNoSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='年度')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='最終番号')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenant_mst.tenant', verbose_name='所属テナント')),
+            ],
+            options={
+                'verbose_name': '受注番号採番',
+                'verbose_name_plural': '受注番号採番',
+                'db_table': 'sales_order_no_sequence',
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'year'), name='unique_sales_order_no_sequence')],
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
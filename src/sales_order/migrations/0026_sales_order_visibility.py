@@ -0,0 +1,55 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_visibility(apps, schema_editor):
+    '''
+    既存受注の参照ユーザー・参照グループ所属ユーザーを展開して登録
+    '''
+    SalesOrder = apps.get_model('sales_order', 'SalesOrder')
+    SalesOrderVisibility = apps.get_model('sales_order', 'SalesOrderVisibility')
+
+    pairs = set(
+        SalesOrder.objects
+        .filter(reference_users__isnull=False)
+        .values_list('pk', 'reference_users')
+    )
+    pairs |= set(
+        SalesOrder.objects
+        .filter(reference_groups__users__isnull=False)
+        .values_list('pk', 'reference_groups__users')
+    )
+    SalesOrderVisibility.objects.bulk_create(
+        [SalesOrderVisibility(sales_order_id=order_id, user_id=user_id) for order_id, user_id in pairs],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_order', '0025_sales_order_no_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesOrderVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sales_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibilities', to='sales_order.salesorder', verbose_name='受注')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visible_sales_orders', to=settings.AUTH_USER_MODEL, verbose_name='参照可能ユーザー')),
+            ],
+            options={
+                'verbose_name': '受注参照権限',
+                'verbose_name_plural': '受注参照権限',
+                'db_table': 'sales_order_visibility',
+                'indexes': [models.Index(fields=['user', 'sales_order'], name='idx_sales_order_visibility')],
+                'constraints': [models.UniqueConstraint(fields=('sales_order', 'user'), name='unique_sales_order_visibility')],
+            },
+        ),
+        migrations.RunPython(build_visibility, migrations.RunPython.noop),
+    ]
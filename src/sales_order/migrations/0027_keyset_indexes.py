@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 03:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_order', '0026_sales_order_visibility'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['tenant', 'sales_order_date', 'id'], name='idx_sales_order_date'),
+        ),
+    ]
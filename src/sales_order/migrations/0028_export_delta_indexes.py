@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-18 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_order', '0027_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['tenant', 'updated_at', 'id'], name='idx_sales_order_updated_at'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorderdetail',
+            index=models.Index(fields=['tenant', 'updated_at', 'id'], name='idx_sales_order_detail_updated'),
+        ),
+    ]
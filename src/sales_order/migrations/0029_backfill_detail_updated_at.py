@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:12
+
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery
+
+
+def backfill_detail_updated_at(apps, schema_editor):
+    '''
+    既存の受注明細の更新日時を、受注ヘッダの更新日時が新しい場合はヘッダに揃える
+    （差分出力で明細の updated_at のみを判定に使うため）
+    '''
+    SalesOrder = apps.get_model('sales_order', 'SalesOrder')
+    SalesOrderDetail = apps.get_model('sales_order', 'SalesOrderDetail')
+
+    SalesOrderDetail.objects.filter(sales_order__updated_at__gt=F('updated_at')).update(
+        updated_at=Subquery(SalesOrder.objects.filter(pk=OuterRef('sales_order_id')).values('updated_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_order', '0028_export_delta_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_detail_updated_at, migrations.RunPython.noop),
+    ]
@@ -1,36 +1,94 @@
-from django.db import models
-from config.base import BaseModel
+from django.db import connection, models, transaction
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+from config.base import BaseModel, bulk_created
 from django.utils import timezone
-from django.db.models import Max
-from django.utils import timezone
-from django.db.models import Max
-from decimal import Decimal, ROUND_FLOOR, ROUND_CEILING, ROUND_HALF_UP
+from decimal import Decimal
 from .constants import STATUS_CHOICES
 from django.contrib.auth import get_user_model
 from register.models import UserGroup
+import re
 
 User = get_user_model()
 
+SALES_ORDER_NO_FORMAT = 'SO-{year}-{seq:06d}'
+SALES_ORDER_NO_PATTERN = re.compile(r'^SO-(\d{4})-(\d+)$')
+
+
+def reserve_sales_order_nos(tenant, count=1):
+    '''
+    受注番号をテナント・年度単位の採番テーブルからまとめて払い出す
+    - 1回のUPSERTで採番し、同時実行時も番号が重複しない
+    - 一括登録時はcount件分をまとめて確保する
+    '''
+    if count < 1:
+        return []
+
+    year = timezone.now().year
+    table = SalesOrderNoSequence._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            INSERT INTO {table} (tenant_id, year, last_value)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (tenant_id, year)
+            DO UPDATE SET last_value = {table}.last_value + EXCLUDED.last_value
+            RETURNING last_value
+            ''',
+            [tenant.pk, year, count],
+        )
+        last_value = cursor.fetchone()[0]
+
+    first_value = last_value - count + 1
+    return [SALES_ORDER_NO_FORMAT.format(year=year, seq=seq) for seq in range(first_value, last_value + 1)]
+
+
 def generate_sales_order_no(tenant):
-    year = timezone.now().strftime('%Y')
-    prefix = f'SO-{year}-'
+    return reserve_sales_order_nos(tenant)[0]
 
-    # 同一テナント＆同じ年の最大番号を取得
-    last_order = (
-        SalesOrder.objects
-        .filter(tenant=tenant, sales_order_no__startswith=prefix)
-        .aggregate(max_no=Max('sales_order_no'))
-    )
 
-    if last_order['max_no']:
-        # 既存の最大番号を取り出して +1
-        last_seq = int(last_order['max_no'].replace(prefix, ''))
-        new_seq = last_seq + 1
-    else:
-        new_seq = 1
+def advance_sales_order_no_sequence(tenant_id, sales_order_nos):
+    '''
+    明示的に指定された受注番号（CSVインポート・フィクスチャ）まで採番テーブルを進める
+    - 年度ごとの最大番号より小さい場合のみ更新し、以降の払い出しで番号が重複しないようにする
+    '''
+    last_values = {}
+    for sales_order_no in sales_order_nos:
+        match = SALES_ORDER_NO_PATTERN.match(sales_order_no or '')
+        if not match:
+            continue
+        year = int(match.group(1))
+        last_values[year] = max(last_values.get(year, 0), int(match.group(2)))
+
+    table = SalesOrderNoSequence._meta.db_table
+    with connection.cursor() as cursor:
+        for year, last_value in last_values.items():
+            cursor.execute(
+                f'''
+                INSERT INTO {table} (tenant_id, year, last_value)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (tenant_id, year)
+                DO UPDATE SET last_value = GREATEST({table}.last_value, EXCLUDED.last_value)
+                ''',
+                [tenant_id, year, last_value],
+            )
+
+
+class SalesOrderNoSequence(models.Model):
+    '''
+    受注番号の採番管理（テナント・年度単位）
+    '''
+    tenant = models.ForeignKey('tenant_mst.Tenant', on_delete=models.CASCADE, verbose_name='所属テナント')
+    year = models.PositiveSmallIntegerField(verbose_name='年度')
+    last_value = models.PositiveIntegerField(default=0, verbose_name='最終番号')
 
-    # 桁数は柔軟に、ゼロパディングは任意（例では6桁）
-    return f'{prefix}{new_seq:06d}'
+    class Meta:
+        db_table = 'sales_order_no_sequence'
+        verbose_name = '受注番号採番'
+        verbose_name_plural = '受注番号採番'
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'year'], name='unique_sales_order_no_sequence')
+        ]
 
 class SalesOrder(BaseModel):
     '''
@@ -163,6 +221,28 @@ class SalesOrder(BaseModel):
         help_text='この受注を参照できるユーザーグループを選択してください。（任意）'
     )
 
+    # 金額集計（明細の保存時に更新）
+    subtotal = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='小計',
+    )
+
+    tax_total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='消費税合計',
+    )
+
+    grand_total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='総合計',
+    )
+
     class Meta:
         db_table = 'sales_order'
         verbose_name = '受注ヘッダ'
@@ -170,42 +250,42 @@ class SalesOrder(BaseModel):
         constraints = [
             models.UniqueConstraint(fields=['tenant', 'sales_order_no'], name='unique_sales_order_per_tenant')
         ]
+        indexes = [
+            models.Index(fields=['tenant', 'grand_total'], name='idx_sales_order_grand_total'),
+            models.Index(fields=['tenant', 'sales_order_date', 'id'], name='idx_sales_order_date'),
+            models.Index(fields=['tenant', 'updated_at', 'id'], name='idx_sales_order_updated_at'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.sales_order_no:
             self.sales_order_no = generate_sales_order_no(self.tenant)
+        adding = self._state.adding
         super().save(*args, **kwargs)
 
-    @property
-    def subtotal(self):
-        """小計（明細単価×数量）"""
-        if not self.pk:
-            return Decimal('0.00')
-        return sum([
-            (Decimal(d.quantity or 0) * Decimal(d.billing_unit_price or 0))
-            for d in self.details.all()
-        ], Decimal('0.00')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-    @property
-    def tax_total(self):
-        """消費税合計（課税対象のみ）"""
-        if not self.pk:
-            return Decimal('0.00')
-        total_tax = Decimal('0.00')
-        for d in self.details.all():
-            if not d.is_tax_exempt:
-                qty = Decimal(d.quantity or 0)
-                unit = Decimal(d.billing_unit_price or 0)
-                rate = Decimal(str(d.tax_rate or 0))  # float→Decimal変換
-                total_tax += (qty * unit * rate / Decimal('100'))
-        return total_tax.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-    @property
-    def grand_total(self):
-        """総合計（小計＋税）"""
+        # 差分出力：ヘッダの更新日時を明細にも反映（明細の updated_at のインデックスだけで差分を判定する）
+        update_fields = kwargs.get('update_fields')
+        if not adding and (update_fields is None or 'updated_at' in update_fields):
+            self.details.filter(updated_at__lt=self.updated_at).update(updated_at=self.updated_at)
+
+    def calculate_totals(self):
+        '''
+        明細から小計・消費税合計・総合計を算出
+        '''
+        from .services import price_order
+
         if not self.pk:
-            return Decimal('0.00')
-        return (self.subtotal + self.tax_total).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            return Decimal('0.00'), Decimal('0.00'), Decimal('0.00')
+
+        pricing = price_order(self.rounding_method, list(self.details.all()))
+        return pricing['subtotal'], pricing['tax_total'], pricing['grand_total']
+
+    def refresh_totals(self, save=True):
+        '''
+        明細の登録・更新後に金額集計カラムを最新化
+        '''
+        self.subtotal, self.tax_total, self.grand_total = self.calculate_totals()
+        if save:
+            self.save(update_fields=['subtotal', 'tax_total', 'grand_total'])
 
 class SalesOrderDetail(BaseModel):
     '''
@@ -262,34 +342,13 @@ class SalesOrderDetail(BaseModel):
         verbose_name = '受注明細'
         verbose_name_plural = '受注明細'
         unique_together = ('sales_order', 'line_no')
+        indexes = [
+            models.Index(fields=['tenant', 'updated_at', 'id'], name='idx_sales_order_detail_updated'),
+        ]
 
     def __str__(self):
         return f'{self.sales_order.sales_order_no} - {self.line_no}: {self.product.product_name}'
 
-    @property
-    def amount(self):
-        # 商品のない行は処理しない
-        if not self.product:
-            return ''
-
-        # 数量 * 単価
-        base = Decimal(self.quantity or 0) * Decimal(self.billing_unit_price or 0)
-
-        # 消費税率を加味
-        if not self.is_tax_exempt:
-            base = base * (1 + self.tax_rate)
-
-        # 小数点以下の処理を実施
-        if self.sales_order.rounding_method == 'floor':
-            value = base.to_integral_value(rounding=ROUND_FLOOR)
-        elif self.sales_order.rounding_method == 'ceil':
-            value = base.to_integral_value(rounding=ROUND_CEILING)
-        else:
-            value = base.to_integral_value(rounding=ROUND_HALF_UP)
-
-        # 整数値にして返却
-        return f'¥{int(value):,}'
-
 class ApprovalToken(models.Model):
     token = models.CharField(max_length=255, unique=True)
     sales_order = models.ForeignKey('sales_order.SalesOrder', on_delete=models.CASCADE)
@@ -301,4 +360,133 @@ class ApprovalToken(models.Model):
     def mark_used(self):
         self.used = True
         self.used_at = timezone.now()
-        self.save(update_fields=['used', 'used_at'])
\ No newline at end of file
+        self.save(update_fields=['used', 'used_at'])
+
+
+class SalesOrderVisibility(models.Model):
+    '''
+    受注の参照可能ユーザー（参照ユーザー・参照グループ所属ユーザーを展開して保持）
+    - 一覧・エクスポートの権限判定を1回の索引検索で行うための非正規化テーブル
+    - 担当者・全社参照可は受注ヘッダのカラムで判定するため含めない
+    '''
+    sales_order = models.ForeignKey(SalesOrder, on_delete=models.CASCADE, related_name='visibilities', verbose_name='受注')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='visible_sales_orders', verbose_name='参照可能ユーザー')
+
+    class Meta:
+        db_table = 'sales_order_visibility'
+        verbose_name = '受注参照権限'
+        verbose_name_plural = '受注参照権限'
+        constraints = [
+            models.UniqueConstraint(fields=['sales_order', 'user'], name='unique_sales_order_visibility')
+        ]
+        indexes = [
+            models.Index(fields=['user', 'sales_order'], name='idx_sales_order_visibility'),
+        ]
+
+
+def sync_sales_order_visibility(order_ids):
+    '''
+    指定受注の参照可能ユーザーを再作成
+    '''
+    order_ids = list(order_ids)
+    if not order_ids:
+        return
+
+    pairs = set(
+        SalesOrder.objects
+        .filter(pk__in=order_ids, reference_users__isnull=False)
+        .values_list('pk', 'reference_users')
+    )
+    pairs |= set(
+        SalesOrder.objects
+        .filter(pk__in=order_ids, reference_groups__users__isnull=False)
+        .values_list('pk', 'reference_groups__users')
+    )
+
+    with transaction.atomic():
+        SalesOrderVisibility.objects.filter(sales_order_id__in=order_ids).delete()
+        SalesOrderVisibility.objects.bulk_create([
+            SalesOrderVisibility(sales_order_id=order_id, user_id=user_id) for order_id, user_id in pairs
+        ])
+
+
+def sync_user_visibility(user_ids):
+    '''
+    指定ユーザーの参照可能受注を再作成（所属グループ変更時）
+    '''
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    pairs = set(
+        User.objects
+        .filter(pk__in=user_ids, referenced_sales_orders__isnull=False)
+        .values_list('referenced_sales_orders', 'pk')
+    )
+    pairs |= set(
+        User.objects
+        .filter(pk__in=user_ids, groups_custom__referenced_sales_orders__isnull=False)
+        .values_list('groups_custom__referenced_sales_orders', 'pk')
+    )
+
+    with transaction.atomic():
+        SalesOrderVisibility.objects.filter(user_id__in=user_ids).delete()
+        SalesOrderVisibility.objects.bulk_create([
+            SalesOrderVisibility(sales_order_id=order_id, user_id=user_id) for order_id, user_id in pairs
+        ])
+
+
+@receiver(post_save, sender=SalesOrder)
+def sales_order_loaded(sender, instance, raw, **kwargs):
+    '''
+    フィクスチャから登録した受注の番号まで採番テーブルを進める
+    '''
+    if raw:
+        advance_sales_order_no_sequence(instance.tenant_id, [instance.sales_order_no])
+
+
+@receiver(m2m_changed, sender=SalesOrder.reference_users.through)
+@receiver(m2m_changed, sender=SalesOrder.reference_groups.through)
+def sales_order_references_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    '''
+    参照ユーザー・参照グループ変更時に参照可能ユーザーを同期
+    '''
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            sync_sales_order_visibility([instance.pk])
+        return
+
+    # ユーザー・グループ側からの変更は対象受注を特定して同期
+    if action == 'pre_clear':
+        instance._visibility_order_ids = list(instance.referenced_sales_orders.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        sync_sales_order_visibility(pk_set)
+    elif action == 'post_clear':
+        sync_sales_order_visibility(getattr(instance, '_visibility_order_ids', []))
+
+
+@receiver(m2m_changed, sender=User.groups_custom.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    '''
+    ユーザーの所属グループ変更時に参照可能受注を同期
+    '''
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            sync_user_visibility([instance.pk])
+        return
+
+    # グループ側からの変更は対象ユーザーを特定して同期
+    if action == 'pre_clear':
+        instance._visibility_user_ids = list(instance.users.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        sync_user_visibility(pk_set)
+    elif action == 'post_clear':
+        sync_user_visibility(getattr(instance, '_visibility_user_ids', []))
+
+
+@receiver(bulk_created, sender=User)
+def users_bulk_created(sender, instances, **kwargs):
+    '''
+    一括登録（CSVインポート）したユーザーの参照可能受注を所属グループから同期
+    '''
+    sync_user_visibility([user.pk for user in instances])
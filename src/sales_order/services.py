@@ -1,10 +1,19 @@
 from .constants import *
 from .form import  SalesOrderDetailForm
-from .models import SalesOrder, SalesOrderDetail
+from .models import SalesOrder, SalesOrderDetail, SalesOrderVisibility
 from django.contrib import messages
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from django.forms import inlineformset_factory
+from collections import defaultdict
+from decimal import Decimal, ROUND_FLOOR, ROUND_CEILING, ROUND_HALF_UP
+
+# 端数処理方法 → Decimalの丸めモード
+ROUNDING_MODES = {
+    'floor': ROUND_FLOOR,
+    'ceil': ROUND_CEILING,
+    'round': ROUND_HALF_UP,
+}
 
 def fill_formset(formset, min_forms=10):
     '''FormSetを指定数まで補充する'''
@@ -12,31 +21,6 @@ def fill_formset(formset, min_forms=10):
         formset.forms.append(formset.empty_form)
     return formset
 
-def get_row(header, detail):
-    return [
-        header.sales_order_no,
-        header.partner.partner_name,
-        header.sales_order_date.strftime('%Y-%m-%d'),
-        header.assignee,
-        header.delivery_due_date.strftime('%Y-%m-%d'),
-        header.delivery_place,
-        header.remarks or '',
-        header.quotation_manager_comment or '',
-        header.quotation_customer_comment or '',
-        header.order_manager_comment or '',
-        header.order_customer_comment or '',
-        get_rounding_label(method=header.rounding_method),
-        detail.line_no,
-        detail.product.product_name,
-        detail.quantity,
-        detail.master_unit_price,
-        detail.billing_unit_price,
-        '非課税' if detail.is_tax_exempt else '課税',
-        detail.tax_rate,
-        ', '.join([u.username for u in header.reference_users.all()]) if hasattr(header, 'reference_users') else '',
-        ', '.join([g.group_name for g in header.reference_groups.all()]) if hasattr(header, 'reference_groups') else '',
-    ]
-
 def get_rounding_label(method):
     choices_dict = dict(SalesOrder.ROUNDING_CHOICES)
     return choices_dict.get(method, method or '')
@@ -54,6 +38,21 @@ def search_order_data(request, query_set):
         )
     return query_set
 
+def filter_visible(queryset, user):
+    '''
+    ログインユーザーが参照可能な受注に絞り込む
+    - 担当者、全社参照可、または参照権限テーブルに登録されたユーザー
+    '''
+    return queryset.filter(
+        Q(assignee=user)
+        | Q(is_visible_all=True)
+        | Exists(SalesOrderVisibility.objects.filter(sales_order=OuterRef('pk'), user=user))
+    )
+
+def is_reference_user(order, user):
+    '''参照ユーザー（承認依頼先）に指定されているか判定する'''
+    return order.reference_users.filter(pk=user.pk).exists()
+
 def sales_order_message(request, action, sales_order_no):
     '''CRUD後のメッセージ表示'''
     messages.success(request, f'受注「{sales_order_no}」を{action}しました。')
@@ -75,7 +74,8 @@ def get_sales_order_detail_formset(instance=None, data=None):
         can_delete=True
     )
 
-    return DynamicFormSet(data=data, instance=instance)
+    queryset = instance.details.select_related('product') if instance else None
+    return DynamicFormSet(data=data, instance=instance, queryset=queryset)
 
 def get_submittable(user, form):
     '''ログインユーザーと受注ステータスから、ボタン操作可否を判定する'''
@@ -86,8 +86,6 @@ def get_submittable(user, form):
     instance = getattr(form, 'instance', None)
     status_code = getattr(instance, 'status_code', None)  # 受注ステータス
     assignee = instance.assignee  # 受注担当者
-    reference_users_manager = getattr(instance, 'reference_users', None)
-    reference_users = reference_users_manager.all() if reference_users_manager else []  # 参照ユーザー
 
     # 新規作成：作成者未設定は新規作成とし、可
     if not instance.create_user:
@@ -97,7 +95,7 @@ def get_submittable(user, form):
         return assignee == login_user
     # 見積書：提出済 = 承認依頼先の人のみ可
     if status_code == STATUS_CODE_QUOTATION_SUBMITTED:
-        return login_user in reference_users
+        return bool(instance.pk) and is_reference_user(instance, login_user)
     # 見積書：社内却下 = 担当者のみ可
     if status_code == STATUS_CODE_QUOTATION_REJECTED_IN:
         return assignee == login_user
@@ -109,7 +107,7 @@ def get_submittable(user, form):
         return assignee == login_user
     # 注文書：提出済 = 承認依頼先の人のみ可
     if status_code == STATUS_CODE_ORDER_SUBMITTED:
-        return login_user in reference_users
+        return bool(instance.pk) and is_reference_user(instance, login_user)
     # 注文書：社内却下 = 担当者のみ可
     if status_code == STATUS_CODE_ORDER_REJECTED_IN:
         return assignee == login_user
@@ -147,6 +145,9 @@ def save_details(form, formset, user, action_type):
                 if not detail.master_unit_price and detail.product:
                     detail.master_unit_price = detail.product.unit_price
                 detail.save()
+
+        # 金額集計を更新
+        order.refresh_totals()
     return order
 
 def apply_field_permissions(form, user):
@@ -169,11 +170,11 @@ def apply_field_permissions(form, user):
         form.fields['remarks'].widget.attrs.pop('readonly', None)
 
     # 見積書：提出済 = 承認権限者のみ見積書コメント（承認者）の編集可
-    if status == STATUS_CODE_QUOTATION_SUBMITTED and user in form.instance.reference_users.all():
+    if status == STATUS_CODE_QUOTATION_SUBMITTED and is_reference_user(form.instance, user):
         form.fields['quotation_manager_comment'].widget.attrs.pop('readonly', None)
 
     # 注文書：提出済 = 承認権限者のみ注文書コメント（承認者）の編集可
-    if status == STATUS_CODE_ORDER_SUBMITTED and user in form.instance.reference_users.all():
+    if status == STATUS_CODE_ORDER_SUBMITTED and is_reference_user(form.instance, user):
         form.fields['order_manager_comment'].widget.attrs.pop('readonly', None)
 
     # 見積書：顧客承諾済 = 担当者のみ納入日と納入場所の編集可
@@ -182,3 +183,60 @@ def apply_field_permissions(form, user):
         form.fields['delivery_place'].widget.attrs.pop('readonly', None)
 
     return form
+
+def price_order(rounding_method, details):
+    '''
+    1受注分の明細をまとめて金額計算する
+    - 明細金額（税込・端数処理済み）は各明細の line_amount に設定
+    - 消費税は税率ごとに課税対象額を合算してから端数処理
+    '''
+    rounding = ROUNDING_MODES.get(rounding_method, ROUND_HALF_UP)
+    subtotal = Decimal('0')
+    taxable_by_rate = {}
+
+    for d in details:
+        # 商品のない行は計算対象外
+        if not d.product_id:
+            d.line_amount = None
+            continue
+
+        base = Decimal(d.quantity or 0) * Decimal(d.billing_unit_price or 0)
+        subtotal += base
+
+        if d.is_tax_exempt:
+            d.line_amount = base.to_integral_value(rounding=rounding)
+        else:
+            rate = Decimal(d.tax_rate or 0)
+            d.line_amount = (base * (1 + rate)).to_integral_value(rounding=rounding)
+            taxable_by_rate[rate] = taxable_by_rate.get(rate, Decimal('0')) + base
+
+    tax_by_rate = {
+        rate: (taxable * rate).to_integral_value(rounding=rounding)
+        for rate, taxable in sorted(taxable_by_rate.items(), reverse=True)
+    }
+    subtotal = subtotal.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    tax_total = sum(tax_by_rate.values(), Decimal('0')).quantize(Decimal('0.01'))
+
+    return {
+        'lines': {d.pk: d.line_amount for d in details if d.pk},
+        'tax_by_rate': tax_by_rate,
+        'subtotal': subtotal,
+        'tax_total': tax_total,
+        'grand_total': subtotal + tax_total,
+    }
+
+def price_orders(orders, details):
+    '''
+    複数受注の明細をまとめて金額計算する（受注IDをキーにした結果を返す）
+    '''
+    grouped = defaultdict(list)
+    for d in details:
+        grouped[d.sales_order_id].append(d)
+    return {o.pk: price_order(o.rounding_method, grouped[o.pk]) for o in orders}
+
+def price_formset(order, formset):
+    '''
+    受注明細フォームセットの各明細に金額を設定する（モーダル表示用）
+    '''
+    details = [f.instance for f in formset.forms if f.instance.product_id]
+    return price_order(order.rounding_method if order else None, details)
@@ -0,0 +1,327 @@
+from django.test import TestCase
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core import serializers
+from django.utils import timezone
+from django.db.models import Q
+from sales_order.models import SalesOrder, SalesOrderDetail, SalesOrderNoSequence, reserve_sales_order_nos
+from sales_order.services import filter_visible
+from register.models import UserGroup
+from tenant_mst.models import Tenant
+from decimal import Decimal
+from datetime import timedelta
+import importlib
+import json
+
+User = get_user_model()
+
+
+class SalesOrderModelTests(TestCase):
+    '''受注モデル 単体テスト'''
+
+    def setUp(self):
+        '''共通データ作成'''
+        call_command('loaddata', 'test_tenants.json')
+        call_command('loaddata', 'test_registers.json')
+        call_command('loaddata', 'test_partners.json')
+        call_command('loaddata', 'test_product_categories.json')
+        call_command('loaddata', 'test_products.json')
+
+        self.user = User.objects.get(pk=3)
+        self.tenant = Tenant.objects.get(pk=1)
+
+    def _create_order(self, sales_order_no=None, details=(), **kwargs):
+        '''
+        受注を作成
+        - details: (商品ID, 数量, 請求単価, 税率, 非課税) のリスト
+        '''
+        kwargs.setdefault('assignee', self.user)
+        order = SalesOrder.objects.create(
+            tenant=self.tenant,
+            sales_order_no=sales_order_no,
+            partner_id=1,
+            create_user=self.user,
+            update_user=self.user,
+            **kwargs,
+        )
+        for line_no, (product_id, quantity, price, tax_rate, exempt) in enumerate(details, 1):
+            SalesOrderDetail.objects.create(
+                tenant=self.tenant,
+                sales_order=order,
+                line_no=line_no,
+                product_id=product_id,
+                quantity=Decimal(quantity),
+                master_unit_price=Decimal(price),
+                billing_unit_price=Decimal(price),
+                tax_rate=Decimal(tax_rate),
+                is_tax_exempt=exempt,
+                create_user=self.user,
+                update_user=self.user,
+            )
+        return order
+
+    def _load_order(self, sales_order_no):
+        '''受注をフィクスチャから登録（loaddata と同様に raw で保存）'''
+        data = json.dumps([{
+            'model': 'sales_order.salesorder',
+            'pk': 100,
+            'fields': {
+                'tenant': self.tenant.pk,
+                'sales_order_no': sales_order_no,
+                'sales_order_date': '2026-04-01',
+                'partner': 1,
+                'is_deleted': False,
+                'created_at': '2026-04-01T00:00:00Z',
+                'updated_at': '2026-04-01T00:00:00Z',
+                'create_user': self.user.pk,
+                'update_user': self.user.pk,
+            },
+        }])
+        for obj in serializers.deserialize('json', data):
+            obj.save()
+
+    #----------------
+    # 金額集計
+    #----------------
+    def test_1_1_1_1(self):
+        '''金額集計（正常系：明細からの再計算）'''
+        order = self._create_order(details=[(1, '3', '333', '0.10', False), (2, '1', '150', '0.08', False)])
+
+        order.refresh_totals()
+        order.refresh_from_db()
+        self.assertEqual(order.subtotal, Decimal('1149.00'))
+        self.assertEqual(order.tax_total, Decimal('111.00'))
+        self.assertEqual(order.grand_total, Decimal('1260.00'))
+
+    def test_1_1_1_2(self):
+        '''金額集計（正常系：マイグレーションでの既存データの補完）'''
+        order = self._create_order(details=[(1, '3', '333', '0.10', False), (3, '2', '500', '0.10', True)])
+        empty = self._create_order()
+        self.assertEqual(order.grand_total, Decimal('0.00'))
+
+        migration = importlib.import_module('sales_order.migrations.0024_salesorder_totals')
+        migration.backfill_totals(apps, None)
+
+        order.refresh_from_db()
+        self.assertEqual(order.subtotal, Decimal('1999.00'))
+        self.assertEqual(order.tax_total, Decimal('99.00'))
+        self.assertEqual(order.grand_total, Decimal('2098.00'))
+
+        empty.refresh_from_db()
+        self.assertEqual(empty.grand_total, Decimal('0.00'))
+
+    #----------------
+    # 受注番号の採番
+    #----------------
+    def test_2_1_1_1(self):
+        '''受注番号の採番（正常系：まとめて確保した番号の次から払い出す）'''
+        year = timezone.now().year
+
+        # 3件まとめて確保
+        self.assertEqual(
+            reserve_sales_order_nos(self.tenant, 3),
+            [f'SO-{year}-000001', f'SO-{year}-000002', f'SO-{year}-000003'],
+        )
+        self.assertEqual(reserve_sales_order_nos(self.tenant, 0), [])
+
+        # 個別の採番は確保済みの次の番号
+        order = self._create_order()
+        self.assertEqual(order.sales_order_no, f'SO-{year}-000004')
+
+        # 採番テーブルはテナント単位
+        self.assertEqual(reserve_sales_order_nos(Tenant.objects.get(pk=2)), [f'SO-{year}-000001'])
+        self.assertEqual(SalesOrderNoSequence.objects.get(tenant=self.tenant, year=year).last_value, 4)
+
+    def test_2_1_1_2(self):
+        '''受注番号の採番（正常系：フィクスチャで登録した番号の次から払い出す）'''
+        year = timezone.now().year
+        reserve_sales_order_nos(self.tenant, 2)
+
+        # フィクスチャから登録
+        self._load_order(f'SO-{year}-000010')
+
+        order = self._create_order()
+        self.assertEqual(order.sales_order_no, f'SO-{year}-000011')
+
+    def test_2_1_1_3(self):
+        '''受注番号の採番（正常系：登録済みより小さい番号では採番テーブルを戻さない）'''
+        year = timezone.now().year
+        reserve_sales_order_nos(self.tenant, 5)
+
+        self._load_order(f'SO-{year}-000002')
+
+        self.assertEqual(SalesOrderNoSequence.objects.get(tenant=self.tenant, year=year).last_value, 5)
+
+    #----------------
+    # 参照権限（SalesOrderVisibility）
+    #----------------
+    def _visible_users(self, order):
+        '''参照権限テーブルに登録された受注の参照可能ユーザー'''
+        return set(order.visibilities.values_list('user_id', flat=True))
+
+    def test_3_1_1_1(self):
+        '''参照権限の同期（正常系：受注側からの参照ユーザー変更）'''
+        order = self._create_order()
+
+        order.reference_users.add(4, 6)
+        self.assertEqual(self._visible_users(order), {4, 6})
+
+        order.reference_users.remove(4)
+        self.assertEqual(self._visible_users(order), {6})
+
+        order.reference_users.set([7, 8])
+        self.assertEqual(self._visible_users(order), {7, 8})
+
+        order.reference_users.clear()
+        self.assertEqual(self._visible_users(order), set())
+
+    def test_3_1_1_2(self):
+        '''参照権限の同期（正常系：ユーザー側からの参照受注変更）'''
+        order1, order2 = self._create_order(), self._create_order()
+        viewer = User.objects.get(pk=4)
+
+        viewer.referenced_sales_orders.add(order1, order2)
+        self.assertEqual(self._visible_users(order1), {4})
+        self.assertEqual(self._visible_users(order2), {4})
+
+        viewer.referenced_sales_orders.remove(order1)
+        self.assertEqual(self._visible_users(order1), set())
+        self.assertEqual(self._visible_users(order2), {4})
+
+        viewer.referenced_sales_orders.clear()
+        self.assertEqual(self._visible_users(order2), set())
+
+    def test_3_1_1_3(self):
+        '''参照権限の同期（正常系：受注側からの参照グループ変更）'''
+        order = self._create_order()
+        group1, group2 = UserGroup.objects.get(pk=1), UserGroup.objects.get(pk=2)
+        group2.users.add(7, 8)
+
+        # グループ1：manager_user（pk=2）
+        order.reference_groups.add(group1, group2)
+        self.assertEqual(self._visible_users(order), {2, 7, 8})
+
+        order.reference_groups.remove(group2)
+        self.assertEqual(self._visible_users(order), {2})
+
+        # 参照ユーザーとしても指定されている場合はグループを外しても残る
+        order.reference_users.add(7)
+        order.reference_groups.add(group2)
+        order.reference_groups.clear()
+        self.assertEqual(self._visible_users(order), {7})
+
+    def test_3_1_1_4(self):
+        '''参照権限の同期（正常系：グループ側からの参照受注変更）'''
+        order1, order2 = self._create_order(), self._create_order()
+        group = UserGroup.objects.get(pk=1)
+
+        group.referenced_sales_orders.add(order1, order2)
+        self.assertEqual(self._visible_users(order1), {2})
+        self.assertEqual(self._visible_users(order2), {2})
+
+        group.referenced_sales_orders.remove(order2)
+        self.assertEqual(self._visible_users(order2), set())
+
+        group.referenced_sales_orders.clear()
+        self.assertEqual(self._visible_users(order1), set())
+
+    def test_3_1_1_5(self):
+        '''参照権限の同期（正常系：ユーザー側からの所属グループ変更）'''
+        order = self._create_order()
+        group = UserGroup.objects.get(pk=2)
+        order.reference_groups.add(group)
+        viewer = User.objects.get(pk=4)
+
+        viewer.groups_custom.add(group)
+        self.assertEqual(self._visible_users(order), {4})
+
+        viewer.groups_custom.remove(group)
+        self.assertEqual(self._visible_users(order), set())
+
+        viewer.groups_custom.add(group)
+        viewer.groups_custom.clear()
+        self.assertEqual(self._visible_users(order), set())
+
+    def test_3_1_1_6(self):
+        '''参照権限の同期（正常系：グループ側からの所属ユーザー変更）'''
+        order = self._create_order()
+        group = UserGroup.objects.get(pk=2)
+        order.reference_groups.add(group)
+
+        group.users.add(6, 7)
+        self.assertEqual(self._visible_users(order), {6, 7})
+
+        group.users.remove(6)
+        self.assertEqual(self._visible_users(order), {7})
+
+        group.users.clear()
+        self.assertEqual(self._visible_users(order), set())
+
+    def test_3_1_2_1(self):
+        '''参照可能な受注の絞り込み（正常系：従来の条件と同じ結果）'''
+        group1, group2 = UserGroup.objects.get(pk=1), UserGroup.objects.get(pk=2)
+        group2.users.add(4, 6)
+
+        self._create_order(assignee=User.objects.get(pk=4))
+        self._create_order(is_visible_all=True)
+        self._create_order().reference_users.add(6, 7)
+        self._create_order().reference_groups.add(group1)
+        self._create_order().reference_groups.add(group2)
+        order = self._create_order()
+        order.reference_users.add(4)
+        order.reference_groups.add(group2)
+        self._create_order(assignee=None)
+
+        # 一部のグループ所属を変更（受注登録後の変更も反映されること）
+        User.objects.get(pk=6).groups_custom.clear()
+        User.objects.get(pk=8).groups_custom.add(group1)
+
+        orders = SalesOrder.objects.filter(tenant=self.tenant)
+        for user in User.objects.filter(tenant=self.tenant):
+            with self.subTest(user=user.pk):
+                expected = orders.filter(
+                    Q(assignee=user)
+                    | Q(is_visible_all=True)
+                    | (
+                        Q(reference_users=user)
+                        | Q(reference_groups__in=user.groups_custom.all())
+                    )
+                ).distinct()
+                self.assertEqual(
+                    set(filter_visible(orders, user).values_list('pk', flat=True)),
+                    set(expected.values_list('pk', flat=True)),
+                )
+
+    #----------------
+    # 差分出力用の更新日時
+    #----------------
+    def test_4_1_1_1(self):
+        '''明細の更新日時（正常系：受注ヘッダの更新日時を明細に反映）'''
+        order = self._create_order(details=[(1, '1', '100', '0.10', False), (2, '1', '100', '0.10', False)])
+        past = timezone.now() - timedelta(days=1)
+        SalesOrderDetail.objects.filter(sales_order=order).update(updated_at=past)
+
+        # 更新日時を含まない部分更新では反映しない
+        order.refresh_totals()
+        self.assertEqual(set(order.details.values_list('updated_at', flat=True)), {past})
+
+        order.remarks = '更新'
+        order.save()
+        self.assertEqual(set(order.details.values_list('updated_at', flat=True)), {order.updated_at})
+
+    def test_4_1_1_2(self):
+        '''明細の更新日時（正常系：マイグレーションでの既存データの補完）'''
+        order = self._create_order(details=[(1, '1', '100', '0.10', False)])
+        other = self._create_order(details=[(1, '1', '100', '0.10', False)])
+        now = timezone.now()
+        SalesOrder.objects.filter(pk=order.pk).update(updated_at=now)
+        SalesOrderDetail.objects.filter(sales_order=order).update(updated_at=now - timedelta(days=1))
+        SalesOrderDetail.objects.filter(sales_order=other).update(updated_at=now + timedelta(days=1))
+
+        migration = importlib.import_module('sales_order.migrations.0029_backfill_detail_updated_at')
+        migration.backfill_detail_updated_at(apps, None)
+
+        # ヘッダの方が新しい明細のみヘッダに揃える
+        self.assertEqual(order.details.get().updated_at, now)
+        self.assertEqual(other.details.get().updated_at, now + timedelta(days=1))
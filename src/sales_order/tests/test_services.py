@@ -0,0 +1,129 @@
+from django.test import SimpleTestCase
+from sales_order.services import price_order, price_orders
+from types import SimpleNamespace
+from decimal import Decimal
+
+
+def make_detail(pk, quantity, price, tax_rate='0.10', exempt=False, product_id=1, sales_order_id=1):
+    '''金額計算に必要な項目だけを持つ明細'''
+    return SimpleNamespace(
+        pk=pk,
+        sales_order_id=sales_order_id,
+        product_id=product_id,
+        quantity=Decimal(quantity),
+        billing_unit_price=Decimal(price),
+        tax_rate=Decimal(tax_rate),
+        is_tax_exempt=exempt,
+    )
+
+
+class PriceOrderTests(SimpleTestCase):
+    '''受注金額計算 単体テスト'''
+
+    #----------------
+    # price_order
+    #----------------
+    def test_1_1_1_1(self):
+        '''税率ごとの端数処理（正常系：丸め方法ごと）'''
+        # (丸め方法, 10%の税額, 8%の税額, 明細金額)
+        # 10%：999 × 0.10 = 99.9、8%：155 × 0.08 = 12.4
+        cases = [
+            ('floor', Decimal('99'), Decimal('12'), {1: Decimal('1098'), 2: Decimal('167')}),
+            ('ceil', Decimal('100'), Decimal('13'), {1: Decimal('1099'), 2: Decimal('168')}),
+            ('round', Decimal('100'), Decimal('12'), {1: Decimal('1099'), 2: Decimal('167')}),
+        ]
+        for rounding_method, tax_10, tax_8, lines in cases:
+            with self.subTest(rounding_method=rounding_method):
+                details = [
+                    make_detail(1, '3', '333', '0.10'),
+                    make_detail(2, '1', '155', '0.08'),
+                ]
+                result = price_order(rounding_method, details)
+
+                self.assertEqual(result['tax_by_rate'], {Decimal('0.10'): tax_10, Decimal('0.08'): tax_8})
+                self.assertEqual(result['lines'], lines)
+                self.assertEqual(result['subtotal'], Decimal('1154.00'))
+                self.assertEqual(result['tax_total'], tax_10 + tax_8)
+                self.assertEqual(result['grand_total'], Decimal('1154.00') + tax_10 + tax_8)
+
+    def test_1_1_1_2(self):
+        '''税率ごとの端数処理（正常系：明細ごとではなく税率ごとの合計で丸める）'''
+        # 明細ごとでは 15 × 0.10 = 1.5 → 1 が2行で 2、合計 30 × 0.10 = 3
+        details = [make_detail(1, '1', '15'), make_detail(2, '1', '15', product_id=2)]
+        result = price_order('floor', details)
+
+        self.assertEqual(result['tax_by_rate'], {Decimal('0.10'): Decimal('3')})
+        self.assertEqual(result['tax_total'], Decimal('3.00'))
+        self.assertEqual(result['grand_total'], Decimal('33.00'))
+
+    def test_1_1_1_3(self):
+        '''税率（正常系：小数の税率をそのまま乗算する）'''
+        # (税率, 税額)
+        cases = [
+            ('0.10', Decimal('100.00')),
+            ('0.08', Decimal('80.00')),
+        ]
+        for tax_rate, tax_total in cases:
+            with self.subTest(tax_rate=tax_rate):
+                result = price_order('round', [make_detail(1, '1', '1000', tax_rate)])
+                self.assertEqual(result['tax_total'], tax_total)
+                self.assertEqual(result['grand_total'], Decimal('1000.00') + tax_total)
+
+    def test_1_1_1_4(self):
+        '''非課税（正常系：課税対象額・税額に含めない）'''
+        # (丸め方法, 非課税明細の金額)
+        cases = [
+            ('floor', Decimal('100')),
+            ('ceil', Decimal('101')),
+            ('round', Decimal('101')),
+        ]
+        for rounding_method, exempt_amount in cases:
+            with self.subTest(rounding_method=rounding_method):
+                details = [
+                    make_detail(1, '1', '1000', '0.10'),
+                    make_detail(2, '1', '100.50', '0.10', exempt=True, product_id=2),
+                ]
+                result = price_order(rounding_method, details)
+
+                self.assertEqual(result['tax_by_rate'], {Decimal('0.10'): Decimal('100')})
+                self.assertEqual(result['lines'][2], exempt_amount)
+                self.assertEqual(result['subtotal'], Decimal('1100.50'))
+                self.assertEqual(result['tax_total'], Decimal('100.00'))
+                self.assertEqual(result['grand_total'], Decimal('1200.50'))
+
+    def test_1_1_1_5(self):
+        '''非課税（正常系：全明細が非課税）'''
+        result = price_order('floor', [make_detail(1, '2', '500', exempt=True)])
+
+        self.assertEqual(result['tax_by_rate'], {})
+        self.assertEqual(result['tax_total'], Decimal('0.00'))
+        self.assertEqual(result['grand_total'], Decimal('1000.00'))
+
+    def test_1_1_1_6(self):
+        '''商品なしの明細（正常系：計算対象外）'''
+        details = [make_detail(1, '1', '1000'), make_detail(2, '5', '999', product_id=None)]
+        result = price_order('floor', details)
+
+        self.assertIsNone(details[1].line_amount)
+        self.assertEqual(result['subtotal'], Decimal('1000.00'))
+        self.assertEqual(result['grand_total'], Decimal('1100.00'))
+
+    #----------------
+    # price_orders
+    #----------------
+    def test_1_2_1_1(self):
+        '''複数受注の一括計算（正常系：受注ごとの丸め方法で計算）'''
+        orders = [
+            SimpleNamespace(pk=1, rounding_method='floor'),
+            SimpleNamespace(pk=2, rounding_method='ceil'),
+            SimpleNamespace(pk=3, rounding_method='round'),
+        ]
+        details = [
+            make_detail(1, '3', '333', sales_order_id=1),
+            make_detail(2, '3', '333', sales_order_id=2),
+        ]
+        result = price_orders(orders, details)
+
+        self.assertEqual(result[1]['grand_total'], Decimal('1098.00'))
+        self.assertEqual(result[2]['grand_total'], Decimal('1099.00'))
+        self.assertEqual(result[3]['grand_total'], Decimal('0.00'))
@@ -0,0 +1,563 @@
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from sales_order.form import SalesOrderForm, SalesOrderDetailFormSet
+from sales_order.models import SalesOrder, SalesOrderDetail, SalesOrderNoSequence
+from sales_order.services import save_details
+from sales_order.views import HEADER_MAP
+from register.models import UserGroup
+from tenant_mst.models import Tenant
+from django.utils import timezone
+from django.conf import settings
+from django.core import signing
+from datetime import date, timedelta
+from decimal import Decimal
+from bs4 import BeautifulSoup
+import csv
+import io
+
+User = get_user_model()
+
+
+class SalesOrderViewTests(TestCase):
+    '''受注管理 単体テスト'''
+
+    def setUp(self):
+        '''共通データ作成'''
+        # テストクライアント生成
+        self.client = Client()
+
+        # テストデータ投入
+        call_command('loaddata', 'test_tenants.json')
+        call_command('loaddata', 'test_registers.json')
+        call_command('loaddata', 'test_partners.json')
+        call_command('loaddata', 'test_product_categories.json')
+        call_command('loaddata', 'test_products.json')
+
+        # 基本は更新ユーザーで実施
+        self.user = User.objects.get(pk=3)
+        self.tenant = Tenant.objects.get(pk=1)
+        self.client.login(email='editor@example.com', password='pass')
+
+    def _make_csv_file(self, rows):
+        '''CSVファイルを作成'''
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=list(HEADER_MAP.keys()))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+        bytes_file = io.BytesIO(output.getvalue().encode('utf-8'))
+        bytes_file.name = 'test.csv'
+        return bytes_file
+
+    def _make_row(self, **kwargs):
+        '''CSVの1行（明細）を作成'''
+        row = {
+            '受注番号': '',
+            '取引先': '株式会社アルファ',
+            '受注日': '2026-04-01',
+            '受注担当者': 'editor_user',
+            '納入予定日': '2026-04-30',
+            '納入場所': '東京倉庫',
+            '備考': '',
+            '見積書_承認者コメント': '',
+            '見積書_顧客コメント': '',
+            '注文書_承認者コメント': '',
+            '注文書_顧客コメント': '',
+            '端数処理方法': '切り捨て',
+            '行番号': '1',
+            '商品': '商品001',
+            '数量': '1',
+            '原単価': '100',
+            '請求単価': '100',
+            '課税対象外': '課税',
+            '税率': '0.10',
+            '参照ユーザー': '',
+            '参照グループ': '',
+        }
+        row.update(kwargs)
+        return row
+
+    #----------------
+    # save_details
+    #----------------
+    def test_1_1_1_1(self):
+        '''登録・更新の共通処理（正常系：金額集計の更新）'''
+        data = {
+            'header-sales_order_date': '2026-04-01',
+            'header-assignee': self.user.pk,
+            'header-partner': 1,
+            'header-rounding_method': 'floor',
+            'details-TOTAL_FORMS': 3,
+            'details-INITIAL_FORMS': 0,
+            'details-MIN_NUM_FORMS': 0,
+            'details-MAX_NUM_FORMS': 1000,
+            # 10%：333 × 3 = 999（税 99.9 → 99）
+            'details-0-product': 1,
+            'details-0-quantity': '3',
+            'details-0-billing_unit_price': '333',
+            'details-0-tax_rate': '0.10',
+            # 8%：150 × 1 = 150（税 12）
+            'details-1-product': 2,
+            'details-1-quantity': '1',
+            'details-1-billing_unit_price': '150',
+            'details-1-tax_rate': '0.08',
+            # 非課税：500 × 2 = 1000
+            'details-2-product': 3,
+            'details-2-quantity': '2',
+            'details-2-billing_unit_price': '500',
+            'details-2-tax_rate': '0.10',
+            'details-2-is_tax_exempt': 'on',
+        }
+        form = SalesOrderForm(data, prefix='header', user=self.user)
+        formset = SalesOrderDetailFormSet(data, prefix='details')
+        self.assertTrue(form.is_valid() and formset.is_valid())
+
+        # 登録
+        order = save_details(form=form, formset=formset, user=self.user, action_type='DRAFT')
+
+        # 金額集計の確認
+        order.refresh_from_db()
+        self.assertEqual(order.subtotal, Decimal('2149.00'))
+        self.assertEqual(order.tax_total, Decimal('111.00'))
+        self.assertEqual(order.grand_total, Decimal('2260.00'))
+
+        # 明細を変更して更新
+        data.update({'details-0-quantity': '1', 'details-2-product': '', 'details-2-quantity': '', 'details-2-billing_unit_price': ''})
+        form = SalesOrderForm(data, instance=order, prefix='header', user=self.user)
+        formset = SalesOrderDetailFormSet(data, prefix='details')
+        self.assertTrue(form.is_valid() and formset.is_valid())
+        save_details(form=form, formset=formset, user=self.user, action_type='DRAFT')
+
+        # 金額集計の確認（10%：333 → 税 33、8%：150 → 税 12）
+        order.refresh_from_db()
+        self.assertEqual(order.subtotal, Decimal('483.00'))
+        self.assertEqual(order.tax_total, Decimal('45.00'))
+        self.assertEqual(order.grand_total, Decimal('528.00'))
+
+    #----------------
+    # ImportCSV
+    #----------------
+    def test_2_1_1_1(self):
+        '''CSVインポート（正常系：金額集計の更新）'''
+        rows = [
+            self._make_row(**{'受注番号': 'SO-2026-000001', '行番号': '1', '商品': '商品001', '数量': '3', '請求単価': '333'}),
+            self._make_row(**{'受注番号': 'SO-2026-000001', '行番号': '2', '商品': '商品002', '数量': '1', '請求単価': '150', '税率': '0.08'}),
+            self._make_row(**{'受注番号': 'SO-2026-000002', '行番号': '1', '商品': '商品003', '数量': '2', '請求単価': '500', '課税対象外': '非課税'}),
+        ]
+
+        # レスポンス取得
+        response = self.client.post(reverse('sales_order:import_csv'), {'file': self._make_csv_file(rows)})
+
+        # ステータスコード確認
+        self.assertEqual(response.status_code, 200)
+
+        # 金額集計の確認
+        order = SalesOrder.objects.get(tenant=self.tenant, sales_order_no='SO-2026-000001')
+        self.assertEqual(order.subtotal, Decimal('1149.00'))
+        self.assertEqual(order.tax_total, Decimal('111.00'))
+        self.assertEqual(order.grand_total, Decimal('1260.00'))
+
+        order = SalesOrder.objects.get(tenant=self.tenant, sales_order_no='SO-2026-000002')
+        self.assertEqual(order.subtotal, Decimal('1000.00'))
+        self.assertEqual(order.tax_total, Decimal('0.00'))
+        self.assertEqual(order.grand_total, Decimal('1000.00'))
+
+    def test_2_1_1_2(self):
+        '''CSVインポート（正常系：番号指定の受注の後も採番が重複しない）'''
+        year = timezone.now().year
+        rows = [
+            self._make_row(**{'受注番号': f'SO-{year}-000007'}),
+            self._make_row(**{'受注番号': f'SO-{year}-000003'}),
+            self._make_row(**{'受注番号': ''}),
+        ]
+
+        # レスポンス取得
+        response = self.client.post(reverse('sales_order:import_csv'), {'file': self._make_csv_file(rows)})
+
+        # ステータスコード確認
+        self.assertEqual(response.status_code, 200)
+
+        # 未入力の行は採番
+        self.assertEqual(
+            set(SalesOrder.objects.filter(tenant=self.tenant).values_list('sales_order_no', flat=True)),
+            {f'SO-{year}-000007', f'SO-{year}-000003', f'SO-{year}-000001'},
+        )
+
+        # 以降の採番は指定された最大の番号の次から
+        order = SalesOrder.objects.create(tenant=self.tenant, partner_id=1, create_user=self.user, update_user=self.user)
+        self.assertEqual(order.sales_order_no, f'SO-{year}-000008')
+
+    def _import(self, rows):
+        '''受注CSVをインポート'''
+        response = self.client.post(reverse('sales_order:import_csv'), {'file': self._make_csv_file(rows)})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_2_1_2_1(self):
+        '''CSVインポート（正常系：複数明細の受注は受注ヘッダを1件だけ登録）'''
+        rows = [
+            self._make_row(**{'受注番号': 'SO-2026-000001', '行番号': '1', '商品': '商品001', '納入場所': '大阪倉庫'}),
+            self._make_row(**{'受注番号': 'SO-2026-000001', '行番号': '2', '商品': '商品002', '数量': '2'}),
+            self._make_row(**{'受注番号': 'SO-2026-000001', '行番号': '3', '商品': '商品003', '納入場所': '名古屋倉庫'}),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            self._import(rows)
+
+        # 受注ヘッダ・明細はそれぞれ1回の INSERT で登録
+        inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT INTO')]
+        self.assertEqual(len([sql for sql in inserts if sql.startswith('INSERT INTO "sales_order" ')]), 1)
+        self.assertEqual(len([sql for sql in inserts if sql.startswith('INSERT INTO "sales_order_detail" ')]), 1)
+
+        # 受注ヘッダは1件、ヘッダ項目は最後の行の内容
+        order = SalesOrder.objects.get(tenant=self.tenant)
+        self.assertEqual(order.sales_order_no, 'SO-2026-000001')
+        self.assertEqual(order.delivery_place, '名古屋倉庫')
+        self.assertEqual((order.create_user, order.update_user), (self.user, self.user))
+
+        # 明細は全行を登録
+        self.assertEqual(
+            list(order.details.order_by('line_no').values_list('line_no', 'product__product_name', 'quantity')),
+            [(1, '商品001', Decimal('1')), (2, '商品002', Decimal('2')), (3, '商品003', Decimal('1'))],
+        )
+        self.assertEqual(order.subtotal, Decimal('400.00'))
+        self.assertEqual(order.grand_total, Decimal('440.00'))
+
+    def test_2_1_2_2(self):
+        '''CSVインポート（正常系：既存の受注は重複登録せず更新）'''
+        manager = User.objects.get(pk=2)
+        existing = SalesOrder.objects.create(
+            tenant=self.tenant, sales_order_no='SO-2026-000001', partner_id=1, assignee=manager,
+            delivery_place='旧倉庫', create_user=manager, update_user=manager,
+        )
+        SalesOrderDetail.objects.create(
+            tenant=self.tenant, sales_order=existing, line_no=1, product_id=1, quantity=Decimal('1'),
+            master_unit_price=Decimal('1000'), billing_unit_price=Decimal('1000'), tax_rate=Decimal('0.10'),
+            create_user=manager, update_user=manager,
+        )
+
+        rows = [
+            self._make_row(**{'受注番号': 'SO-2026-000001', '行番号': '2', '商品': '商品002', '請求単価': '500', '納入場所': '新倉庫'}),
+            self._make_row(**{'受注番号': 'SO-2026-000002', '行番号': '1'}),
+        ]
+        self._import(rows)
+
+        # 既存の受注は同じレコードを更新（作成者はそのまま）
+        self.assertEqual(SalesOrder.objects.filter(tenant=self.tenant, sales_order_no='SO-2026-000001').count(), 1)
+        order = SalesOrder.objects.get(tenant=self.tenant, sales_order_no='SO-2026-000001')
+        self.assertEqual(order.pk, existing.pk)
+        self.assertEqual(order.delivery_place, '新倉庫')
+        self.assertEqual(order.assignee, self.user)
+        self.assertEqual((order.create_user, order.update_user), (manager, self.user))
+
+        # 明細は既存の明細に追加し、金額集計は全明細で再計算
+        self.assertEqual(list(order.details.order_by('line_no').values_list('line_no', flat=True)), [1, 2])
+        self.assertEqual(order.subtotal, Decimal('1500.00'))
+        self.assertEqual(order.tax_total, Decimal('150.00'))
+        self.assertEqual(order.grand_total, Decimal('1650.00'))
+
+        # 新規の受注
+        self.assertEqual(SalesOrder.objects.filter(tenant=self.tenant).count(), 2)
+        self.assertEqual(SalesOrder.objects.get(sales_order_no='SO-2026-000002').grand_total, Decimal('110.00'))
+
+    def test_2_1_2_3(self):
+        '''CSVインポート（正常系：参照ユーザー・グループは入力のある受注のみ置き換え、参照権限も同期）'''
+        group1, group2 = UserGroup.objects.get(pk=1), UserGroup.objects.get(pk=2)
+        group2.users.add(10)
+        orders = []
+        for sales_order_no in ('SO-2026-000001', 'SO-2026-000002'):
+            order = SalesOrder.objects.create(
+                tenant=self.tenant, sales_order_no=sales_order_no, partner_id=1, create_user=self.user, update_user=self.user,
+            )
+            order.reference_users.add(7)
+            order.reference_groups.add(group1)
+            orders.append(order)
+
+        rows = [
+            # 参照設定は入力のある最後の行の内容
+            self._make_row(**{'受注番号': 'SO-2026-000001', '行番号': '1', '参照ユーザー': 'user_1', '参照グループ': 'group_999'}),
+            self._make_row(**{'受注番号': 'SO-2026-000001', '行番号': '2', '参照ユーザー': 'user_2,user_3', '参照グループ': 'group_000'}),
+            self._make_row(**{'受注番号': 'SO-2026-000001', '行番号': '3'}),
+            # 入力なし：既存の参照設定を維持
+            self._make_row(**{'受注番号': 'SO-2026-000002', '行番号': '1'}),
+            # 新規の受注
+            self._make_row(**{'受注番号': 'SO-2026-000003', '行番号': '1', '参照ユーザー': 'user_4'}),
+        ]
+        self._import(rows)
+
+        order1, order2 = orders
+        order3 = SalesOrder.objects.get(tenant=self.tenant, sales_order_no='SO-2026-000003')
+        self.assertEqual(set(order1.reference_users.values_list('pk', flat=True)), {8, 9})
+        self.assertEqual(set(order1.reference_groups.all()), {group2})
+        self.assertEqual(set(order2.reference_users.values_list('pk', flat=True)), {7})
+        self.assertEqual(set(order2.reference_groups.all()), {group1})
+        self.assertEqual(set(order3.reference_users.values_list('pk', flat=True)), {10})
+        self.assertEqual(set(order3.reference_groups.all()), set())
+
+        # 参照権限テーブル（参照ユーザー＋参照グループの所属ユーザー）
+        self.assertEqual(set(order1.visibilities.values_list('user_id', flat=True)), {8, 9, 10})
+        self.assertEqual(set(order2.visibilities.values_list('user_id', flat=True)), {2, 7})
+        self.assertEqual(set(order3.visibilities.values_list('user_id', flat=True)), {10})
+
+    def test_2_1_2_4(self):
+        '''CSVインポート（異常系：エラーのあるファイルでは受注番号を採番しない）'''
+        rows = [
+            self._make_row(**{'受注番号': ''}),
+            self._make_row(**{'受注番号': '', '商品': '存在しない商品'}),
+        ]
+        response = self.client.post(reverse('sales_order:import_csv'), {'file': self._make_csv_file(rows)})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(SalesOrderNoSequence.objects.filter(tenant=self.tenant).exists())
+
+        # エラーのないファイルは1番から採番
+        self._import(rows[:1])
+        year = timezone.now().year
+        self.assertEqual(SalesOrder.objects.get(tenant=self.tenant).sales_order_no, f'SO-{year}-000001')
+
+    #----------------
+    # 参照権限（ユーザーのCSVインポート）
+    #----------------
+    def test_3_1_1_1(self):
+        '''参照権限の同期（正常系：CSVインポートで登録したユーザーの所属グループ）'''
+        order = SalesOrder.objects.create(tenant=self.tenant, partner_id=1, create_user=self.user, update_user=self.user)
+        order.reference_groups.add(UserGroup.objects.get(pk=2))
+
+        # 管理者ユーザーでユーザーをインポート
+        self.client.login(email='manager@example.com', password='pass')
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['ユーザー名', 'ユーザー名（カナ）', 'メールアドレス', '性別', '電話番号', '雇用状態', '権限', '所属グループ'])
+        writer.writerow(['インポートユーザー', 'インポートユーザー', 'imported@example.com', '男性', '111-1111-1111', '在職中', '更新', 'group_000'])
+        file = io.BytesIO(output.getvalue().encode('utf-8'))
+        file.name = 'test.csv'
+
+        # レスポンス取得
+        response = self.client.post(reverse('register:import_csv'), {'file': file})
+
+        # ステータスコード確認
+        self.assertEqual(response.status_code, 200, response.content)
+
+        # 参照権限の確認
+        imported = User.objects.get(email='imported@example.com')
+        self.assertEqual(set(order.visibilities.values_list('user_id', flat=True)), {imported.pk})
+
+    #----------------
+    # ListView（キーセットページング）
+    #----------------
+    def _create_list_orders(self, count):
+        '''一覧表示用の受注を作成（納入予定日は一部NULL、同日を含む）'''
+        orders = []
+        for i in range(count):
+            orders.append(SalesOrder.objects.create(
+                tenant=self.tenant,
+                partner_id=1,
+                sales_order_date=date(2026, 4, 1) + timedelta(days=i % 7),
+                delivery_due_date=None if i % 4 == 0 else date(2026, 5, 1) + timedelta(days=i % 5),
+                is_visible_all=True,
+                create_user=self.user,
+                update_user=self.user,
+            ))
+        return orders
+
+    def _walk_pages(self, params):
+        '''次ページのカーソルを辿り、ページごとの受注IDと最後のレスポンスを返す'''
+        pages = []
+        params = {**params, 'paging': 'keyset'}
+        response = self.client.get(reverse('sales_order:list'), params)
+        while True:
+            page = response.context['page_obj']
+            pages.append([order.pk for order in page])
+            if not page.has_next():
+                return pages, response
+            response = self.client.get(reverse('sales_order:list'), {**params, 'after': page.next_cursor})
+
+    def test_4_1_1_1(self):
+        '''キーセットページング（正常系：昇順・NULLは末尾）'''
+        orders = self._create_list_orders(45)
+        pages, response = self._walk_pages({'sort': 'delivery_due_date'})
+
+        # ページ数・件数の確認
+        self.assertEqual([len(page) for page in pages], [settings.DEFAULT_PAGE_SIZE, settings.DEFAULT_PAGE_SIZE, 5])
+
+        # 並び順の確認（重複・欠落なし）
+        expected = sorted(orders, key=lambda o: (o.delivery_due_date is None, o.delivery_due_date or date.min, o.pk))
+        self.assertEqual(sum(pages, []), [o.pk for o in expected])
+
+        # 最終ページ：次ページなし、前ページあり
+        self.assertFalse(response.context['page_obj'].has_next())
+        self.assertTrue(response.context['page_obj'].has_previous())
+
+    def test_4_1_1_2(self):
+        '''キーセットページング（正常系：降順・NULLは先頭）'''
+        orders = self._create_list_orders(45)
+        pages, _ = self._walk_pages({'sort': '-delivery_due_date'})
+
+        expected = sorted(orders, key=lambda o: (o.delivery_due_date is None, o.delivery_due_date or date.min, o.pk), reverse=True)
+        self.assertEqual(sum(pages, []), [o.pk for o in expected])
+
+    def test_4_1_1_3(self):
+        '''キーセットページング（正常系：既定の並び順（受注日降順））'''
+        orders = self._create_list_orders(30)
+        pages, _ = self._walk_pages({})
+
+        expected = sorted(orders, key=lambda o: (o.sales_order_date, o.pk), reverse=True)
+        self.assertEqual(sum(pages, []), [o.pk for o in expected])
+
+    def test_4_1_2_1(self):
+        '''キーセットページング（正常系：前ページへの移動）'''
+        self._create_list_orders(45)
+        params = {'sort': 'delivery_due_date'}
+        pages, response = self._walk_pages(params)
+
+        # 3ページ目 → 2ページ目
+        page = response.context['page_obj']
+        response = self.client.get(reverse('sales_order:list'), {**params, 'before': page.previous_cursor})
+        page = response.context['page_obj']
+        self.assertEqual([order.pk for order in page], pages[1])
+        self.assertTrue(page.has_next())
+        self.assertTrue(page.has_previous())
+
+        # 2ページ目 → 1ページ目（前ページなし）
+        response = self.client.get(reverse('sales_order:list'), {**params, 'before': page.previous_cursor})
+        page = response.context['page_obj']
+        self.assertEqual([order.pk for order in page], pages[0])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_4_1_2_2(self):
+        '''キーセットページング（正常系：1ページに収まる場合）'''
+        self._create_list_orders(3)
+        response = self.client.get(reverse('sales_order:list'), {'paging': 'keyset'})
+
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 3)
+        self.assertFalse(page.has_next())
+        self.assertFalse(page.has_previous())
+        self.assertFalse(page.has_other_pages())
+
+    def test_4_1_3_1(self):
+        '''キーセットページング（異常系：改ざん・不正なカーソルは先頭ページとして扱う）'''
+        self._create_list_orders(25)
+        params = {'sort': 'sales_order_no', 'paging': 'keyset'}
+        first = self.client.get(reverse('sales_order:list'), params).context['page_obj']
+        cursor = first.next_cursor
+
+        # 署名の改ざん・別用途の署名・件数不一致・不正な文字列
+        invalid_cursors = [
+            cursor[:-1] + ('A' if cursor[-1] != 'A' else 'B'),
+            signing.dumps(['SO-9999-999999', '1'], salt='other-salt'),
+            signing.dumps(['SO-9999-999999'], salt='keyset-pagination'),
+            'invalid',
+        ]
+        for invalid in invalid_cursors:
+            with self.subTest(cursor=invalid):
+                response = self.client.get(reverse('sales_order:list'), {**params, 'after': invalid})
+                self.assertEqual(response.status_code, 200)
+                page = response.context['page_obj']
+                self.assertEqual([o.pk for o in page], [o.pk for o in first])
+                self.assertFalse(page.has_previous())
+
+    def test_4_1_3_2(self):
+        '''キーセットページング（正常系：参照できない受注はカーソルを辿っても表示しない）'''
+        self._create_list_orders(25)
+        hidden = SalesOrder.objects.create(
+            tenant=self.tenant, partner_id=1, assignee=User.objects.get(pk=2), create_user=self.user, update_user=self.user,
+        )
+        pages, _ = self._walk_pages({})
+
+        self.assertEqual(len(sum(pages, [])), 25)
+        self.assertNotIn(hidden.pk, sum(pages, []))
+
+    @override_settings(COUNT_ESTIMATE_THRESHOLD=100000)
+    def test_4_1_4_1(self):
+        '''ページング（正常系：既定はページ番号方式で件数を表示）'''
+        self._create_list_orders(25)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('sales_order:list'))
+
+        # 件数の取得は1回（キーセット方式の判定で取得した件数をそのまま使用）
+        self.assertEqual(sum(q['sql'].startswith('SELECT COUNT(') for q in queries), 1)
+
+        page = response.context['page_obj']
+        self.assertFalse(getattr(page, 'is_keyset', False))
+        self.assertEqual(response.context['paginator'].count, 25)
+        self.assertContains(response, '25件中 1〜20件を表示')
+
+        response = self.client.get(reverse('sales_order:list'), {'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+    @override_settings(COUNT_ESTIMATE_THRESHOLD=0)
+    def test_4_1_4_2(self):
+        '''ページング（正常系：件数が推定値となる場合はキーセット方式）'''
+        self._create_list_orders(25)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('sales_order:list'))
+
+        page = response.context['page_obj']
+        self.assertTrue(page.is_keyset)
+        self.assertEqual(len(page), settings.DEFAULT_PAGE_SIZE)
+        self.assertFalse(any(q['sql'].startswith('SELECT COUNT(') for q in queries))
+
+    #----------------
+    # CreateView
+    #----------------
+    def test_5_1_1_1(self):
+        '''登録（異常系：入力エラーの再表示でも明細金額を表示）'''
+        data = {
+            'header-sales_order_date': '',
+            'header-assignee': self.user.pk,
+            'header-partner': 1,
+            'header-rounding_method': 'floor',
+            'details-TOTAL_FORMS': 1,
+            'details-INITIAL_FORMS': 0,
+            'details-MIN_NUM_FORMS': 0,
+            'details-MAX_NUM_FORMS': 1000,
+            # 333 × 3 = 999（税込 1098.9 → 切り捨て 1098）
+            'details-0-product': 1,
+            'details-0-quantity': '3',
+            'details-0-billing_unit_price': '333',
+            'details-0-tax_rate': '0.10',
+        }
+        response = self.client.post(reverse('sales_order:create'), data)
+        res_json = response.json()
+
+        self.assertFalse(res_json['success'])
+        soup = BeautifulSoup(res_json['html'], 'html.parser')
+        self.assertEqual(soup.select_one('td.amount').get_text(strip=True), '¥1,098')
+
+    #----------------
+    # ExportCSV
+    #----------------
+    def test_6_1_1_1(self):
+        '''CSVエクスポート（正常系：Parquet の列の型はモデル項目に対応）'''
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        order = SalesOrder.objects.create(
+            tenant=self.tenant, partner_id=1, assignee=self.user, sales_order_date=date(2026, 4, 1),
+            create_user=self.user, update_user=self.user,
+        )
+        SalesOrderDetail.objects.create(
+            tenant=self.tenant, sales_order=order, line_no=1, product_id=1, quantity=Decimal('3'),
+            master_unit_price=Decimal('333'), billing_unit_price=Decimal('333'), tax_rate=Decimal('0.10'),
+            create_user=self.user, update_user=self.user,
+        )
+
+        response = self.client.get(reverse('sales_order:export_csv') + '?format=parquet')
+        self.assertEqual(response.status_code, 200)
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+
+        quantity = SalesOrderDetail._meta.get_field('quantity')
+        self.assertEqual(table.schema.field('受注日').type, pa.date32())
+        self.assertEqual(table.schema.field('行番号').type, pa.int64())
+        self.assertEqual(table.schema.field('数量').type, pa.decimal128(quantity.max_digits, quantity.decimal_places))
+        self.assertEqual(table.schema.field('商品').type, pa.string())
+
+        record = table.to_pylist()[0]
+        self.assertEqual(
+            (record['受注日'], record['行番号'], record['数量']),
+            (date(2026, 4, 1), 1, Decimal('3').quantize(Decimal(10) ** -quantity.decimal_places)),
+        )
@@ -1,16 +1,16 @@
 from django.shortcuts import redirect
 from django.views import generic
 from django.urls import reverse_lazy, reverse
-from django.db.models import Q
+from django.db.models import Case, Q, Value, When
 from django.http import JsonResponse
 from django.template.loader import render_to_string
-from .models import SalesOrder, SalesOrderDetail, ApprovalToken
+from .models import SalesOrder, SalesOrderDetail, ApprovalToken, advance_sales_order_no_sequence, reserve_sales_order_nos, sync_sales_order_visibility
 from partner_mst.models import Partner
 from product_mst.models import Product
 from register.models import CustomUser, UserGroup
 from .form import SalesOrderSearchForm, SalesOrderForm, SalesOrderDetailFormSet
 from config.common import Common
-from config.base import CSVExportBaseView, CSVImportBaseView, ExcelExportBaseView, PrivilegeRequiredMixin
+from config.base import CSVExportBaseView, CSVImportBaseView, ExcelExportBaseView, ImportLookup, KeysetPaginationMixin, PrivilegeRequiredMixin, bulk_created
 from .services import *
 from django.db import transaction
 from .constants import *
@@ -27,7 +27,7 @@ from django.http import HttpResponse
 from weasyprint import HTML
 from django.contrib.auth.mixins import LoginRequiredMixin
 import tempfile
-import io, csv
+import csv
 
 
 # 出力カラム定義
@@ -55,13 +55,41 @@ HEADER_MAP = {
     '参照グループ': 'reference_groups',
 }
 
+# 出力列定義（明細単位、ヘッダ → ORMパス or 式）
+EXPORT_COLUMNS = {
+    '受注番号': 'sales_order__sales_order_no',
+    '取引先': 'sales_order__partner__partner_name',
+    '受注日': 'sales_order__sales_order_date',
+    '受注担当者': 'sales_order__assignee__username',
+    '納入予定日': 'sales_order__delivery_due_date',
+    '納入場所': 'sales_order__delivery_place',
+    '備考': 'sales_order__remarks',
+    '見積書_承認者コメント': 'sales_order__quotation_manager_comment',
+    '見積書_顧客コメント': 'sales_order__quotation_customer_comment',
+    '注文書_承認者コメント': 'sales_order__order_manager_comment',
+    '注文書_顧客コメント': 'sales_order__order_customer_comment',
+    '端数処理方法': Common.choice_label_expression('sales_order__rounding_method', SalesOrder.ROUNDING_CHOICES),
+    '行番号': 'line_no',
+    '商品': 'product__product_name',
+    '数量': 'quantity',
+    '原単価': 'master_unit_price',
+    '請求単価': 'billing_unit_price',
+    '課税対象外': Case(When(is_tax_exempt=True, then=Value('非課税')), default=Value('課税')),
+    '税率': 'tax_rate',
+    '参照ユーザー': Common.related_names_expression(SalesOrder.reference_users, 'username', outer_ref='sales_order_id'),
+    '参照グループ': Common.related_names_expression(SalesOrder.reference_groups, 'group_name', outer_ref='sales_order_id'),
+}
+
+# 差分出力：受注ヘッダの論理削除も明細の差分として扱う（ヘッダの更新日時は SalesOrder.save() で明細に反映）
+EXPORT_DELETED_CONDITION = Q(is_deleted=True) | Q(sales_order__is_deleted=True)
+
 # 出力ファイル名定義
 FILENAME_PREFIX = 'sales_order'
 
 #--------------------------
 # 一覧表示
 #--------------------------
-class SalesOrderListView(generic.ListView):
+class SalesOrderListView(KeysetPaginationMixin, generic.ListView):
     model = SalesOrder
     template_name = 'sales_order/list.html'
     context_object_name = 'sales_orders'
@@ -75,21 +103,14 @@ class SalesOrderListView(generic.ListView):
         queryset = SalesOrder.objects.filter(
             is_deleted=False
             , tenant=req.user.tenant
-        ).select_related('partner')
+        ).select_related('partner', 'create_user')
 
-        # 権限フィルタ：担当者が自分、または参照可能グループに属する
-        queryset = queryset.filter(
-            Q(assignee=req.user)
-            | Q(is_visible_all=True)
-            | (
-                Q(reference_users=req.user)
-                | Q(reference_groups__in=req.user.groups_custom.all())
-            )
-        ).distinct()
+        # 権限フィルタ：担当者が自分、全社参照可、または参照権限テーブルに登録済
+        queryset = filter_visible(queryset, req.user)
 
         # 検索フォームが有効な場合のみフィルタ
         if form.is_valid():
-            queryset = filter_data(form.cleaned_data, queryset).distinct()
+            queryset = filter_data(form.cleaned_data, queryset)
 
             # 並び替え処理
             sort = form.cleaned_data.get('sort')
@@ -168,6 +189,9 @@ class SalesOrderCreateView(generic.CreateView):
 
         # バリデーション
         if not (form.is_valid() and formset.is_valid()):
+            # 明細金額を再計算（ヘッダのエラー時も明細を検証して入力値をインスタンスに反映、入力中の端数処理方法で計算）
+            formset.is_valid()
+            price_formset(order=form.instance, formset=formset)
             html = render_to_string(
                 self.template_name,
                 {
@@ -202,6 +226,7 @@ class SalesOrderUpdateView(generic.UpdateView):
         self.object = self.get_object()
         form = SalesOrderForm(instance=self.object, prefix='header', user=request.user)
         formset = get_sales_order_detail_formset(instance=self.object)
+        price_formset(order=self.object, formset=formset)
         status_code = getattr(self.object, 'status_code', None)
         assignee = getattr(self.object, 'assignee', None)
 
@@ -563,6 +588,7 @@ class SalesOrderUpdateView(generic.UpdateView):
 
         # バリデーション
         if not (form.is_valid() and formset.is_valid()):
+            price_formset(order=self.object, formset=formset)
             html = render_to_string(
                 self.template_name,
                 {
@@ -589,6 +615,7 @@ class SalesOrderUpdateView(generic.UpdateView):
         # フォームの情報を取得
         form = SalesOrderForm(instance=self.object, prefix='header', user=request.user)
         formset = get_sales_order_detail_formset(instance=self.object)
+        price_formset(order=self.object, formset=formset)
 
         # ボタン操作の活性制御
         is_submittable = get_submittable(user=request.user, form=form)
@@ -819,38 +846,37 @@ class SalesOrderPublicContractView(generic.View):
 class ExportExcel(ExcelExportBaseView):
     model_class = SalesOrderDetail
     filename_prefix = 'sales_order'
-    headers = HEADER_MAP
+    columns = EXPORT_COLUMNS
+    deleted_condition = EXPORT_DELETED_CONDITION
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.select_related('sales_order', 'product', 'sales_order__partner') \
-                 .filter(
-                     is_deleted=False,
+        return qs.filter(
                      sales_order__in=search_order_data(
                          request=request,
-                         query_set=SalesOrder.objects.all()
+                         query_set=filter_visible(SalesOrder.objects.all(), request.user)
                      )
                  ) \
                  .order_by('sales_order__sales_order_no', 'line_no')
 
-    def row(self, detail):
-        return get_row(detail.sales_order, detail)
-
 
 class ExportCSV(CSVExportBaseView):
     model_class = SalesOrderDetail
     filename_prefix = FILENAME_PREFIX
-    headers = list(HEADER_MAP.keys())
+    columns = EXPORT_COLUMNS
+    deleted_condition = EXPORT_DELETED_CONDITION
 
     def get_queryset(self, request):
         req = self.request
         form = SalesOrderSearchForm(req.GET or None)
 
-        # クエリセットを初期化（削除フラグ：False, 所属テナント限定）
-        orders = SalesOrder.objects.filter(
-            is_deleted=False,
-            tenant=req.user.tenant
-        ).select_related('partner')
+        # クエリセットを初期化（所属テナント限定、差分出力時以外は削除フラグ：False）
+        orders = SalesOrder.objects.filter(tenant=req.user.tenant)
+        if self.delta_since is None:
+            orders = orders.filter(is_deleted=False)
+
+        # 参照可能な受注に限定
+        orders = filter_visible(orders, req.user)
 
         # フォームが有効なら検索条件を反映
         if form.is_valid():
@@ -861,17 +887,10 @@ class ExportCSV(CSVExportBaseView):
         orders = set_table_sort(queryset=orders, sort=sort)
 
         # 明細データ粒度で取得
-        details = SalesOrderDetail.objects.filter(
-            is_deleted=False,
-            tenant=req.user.tenant,
-            sales_order__in=orders
-        ).select_related('sales_order', 'product')
+        details = self.get_base_queryset(req).filter(sales_order__in=orders)
 
         return details
 
-    def row(self, detail):
-        return get_row(header=detail.sales_order, detail=detail)
-
 
 class ImportCSV(LoginRequiredMixin, CSVImportBaseView):
     '''
@@ -882,6 +901,7 @@ class ImportCSV(LoginRequiredMixin, CSVImportBaseView):
     model_class = SalesOrderDetail
     HEADER_MAP = HEADER_MAP
     unique_field = None  # 重複チェックは受注明細行単位で実施
+    import_job_enabled = False  # 受注単位（複数行）で登録するため、チャンク単位の登録は行わない
 
     def post(self, request, *args, **kwargs):
         '''
@@ -892,8 +912,7 @@ class ImportCSV(LoginRequiredMixin, CSVImportBaseView):
             return JsonResponse({'error': 'ファイルが選択されていません'}, status=400)
 
         # Baseのpost()と同じ流れを維持
-        decoded_file = io.TextIOWrapper(file.file, encoding='utf-8')
-        reader = csv.DictReader(decoded_file)
+        reader = csv.DictReader(self.open_csv(file))
         headers = reader.fieldnames
 
         # ヘッダチェック
@@ -902,10 +921,15 @@ class ImportCSV(LoginRequiredMixin, CSVImportBaseView):
 
         existing = set()  # unique_fieldがNoneなので空集合にする
 
+        rows = list(reader)
+
+        # 担当者・取引先・商品・参照ユーザー／グループをファイル単位でまとめて解決
+        self.lookups = self.get_lookups(rows, request)
+
         # 通常のvalidate_row呼び出し
         objects = []
         errors = []
-        for idx, row in enumerate(reader, start=2):
+        for idx, row in enumerate(rows, start=2):
             obj, err = self.validate_row(row, idx, existing, request)
             if err:
                 errors.append(err)
@@ -915,33 +939,141 @@ class ImportCSV(LoginRequiredMixin, CSVImportBaseView):
         if errors:
             return JsonResponse({'error': '\n'.join(errors)}, status=400)
 
-        self.model_class.objects.bulk_create(objects)
+        with transaction.atomic():
+            # 受注番号が未入力の行は新規受注として番号をまとめて確保（検証後に確保し、エラー・ロールバック時は採番しない）
+            blank_objects = [obj for obj in objects if not (obj._header['sales_order_no'] or '').strip()]
+            for obj, sales_order_no in zip(blank_objects, reserve_sales_order_nos(request.user.tenant, len(blank_objects))):
+                obj._header['sales_order_no'] = sales_order_no
+
+            # 受注番号ごとに明細をまとめて登録
+            grouped = {}
+            for obj in objects:
+                grouped.setdefault(obj._header['sales_order_no'], []).append(obj)
+            self.save_orders(grouped, request)
         return JsonResponse({'success': f'{len(objects)}件を登録しました。'})
 
-    @transaction.atomic
+    def save_orders(self, grouped, request):
+        '''
+        受注番号単位で受注ヘッダ・明細・参照設定を一括登録
+        - 受注ヘッダは既存をまとめて取得し、新規は bulk_create、既存は bulk_update で1回ずつ更新
+        - ヘッダ項目・参照設定は同じ受注番号の最後の行（参照設定は入力のある最後の行）の内容を使用
+        - 明細は全受注分を1回の bulk_create で登録し、金額集計もまとめて更新
+        '''
+        tenant = request.user.tenant
+        now = timezone.now()
+        existing = {
+            order.sales_order_no: order
+            for order in SalesOrder.objects.filter(tenant=tenant, sales_order_no__in=grouped)
+        }
+
+        orders, created, updated, fields = [], [], [], []
+        for sales_order_no, details in grouped.items():
+            header_data = details[-1]._header
+            order = existing.get(sales_order_no)
+            if order is None:
+                order = SalesOrder(**header_data, create_user=request.user, update_user=request.user)
+                created.append(order)
+            else:
+                for k, v in header_data.items():
+                    setattr(order, k, v)
+                order.update_user = request.user
+                order.updated_at = now
+                updated.append(order)
+                fields = [k for k in header_data if k != 'tenant']
+            orders.append(order)
+
+        SalesOrder.objects.bulk_create(created)
+        if updated:
+            SalesOrder.objects.bulk_update(updated, [*fields, 'update_user', 'updated_at'])
+            # 差分出力：ヘッダの更新日時を既存の明細にも反映（SalesOrder.save() と同じ）
+            SalesOrderDetail.objects.filter(sales_order__in=updated).update(updated_at=now)
+
+        # 番号指定で登録した受注の番号まで採番テーブルを進める（以降の採番で重複させない）
+        advance_sales_order_no_sequence(tenant.pk, [order.sales_order_no for order in created])
+
+        # ------------------------------------------------------
+        # 参照ユーザー / グループ設定（入力のある受注のみ置き換え）
+        # ------------------------------------------------------
+        referenced = set()
+        for field in ('reference_users', 'reference_groups'):
+            relation = SalesOrder._meta.get_field(field)
+            through = relation.remote_field.through
+            source, target = relation.m2m_field_name(), relation.m2m_reverse_field_name()
+
+            targets = {}
+            for order, details in zip(orders, grouped.values()):
+                values = [d._references[field] for d in details if d._references[field] is not None]
+                if values:
+                    targets[order] = values[-1]
+            if not targets:
+                continue
+
+            through.objects.filter(**{f'{source}__in': targets}).delete()
+            through.objects.bulk_create([
+                through(**{source: order, target: obj}) for order, objs in targets.items() for obj in objs
+            ])
+            referenced.update(order.pk for order in targets)
+
+        # m2m_changed は送信されないため参照可能ユーザーを直接同期
+        sync_sales_order_visibility(referenced)
+
+        # ------------------------------------------------------
+        # 明細の登録・金額集計の更新
+        # ------------------------------------------------------
+        details = []
+        for order, order_details in zip(orders, grouped.values()):
+            for detail in order_details:
+                detail.sales_order = order
+                details.append(detail)
+        self.model_class.objects.bulk_create(details)
+
+        pricing = price_orders(orders, SalesOrderDetail.objects.filter(sales_order__in=orders))
+        for order in orders:
+            order.subtotal = pricing[order.pk]['subtotal']
+            order.tax_total = pricing[order.pk]['tax_total']
+            order.grand_total = pricing[order.pk]['grand_total']
+        SalesOrder.objects.bulk_update(orders, ['subtotal', 'tax_total', 'grand_total'])
+
+        bulk_created.send(sender=SalesOrder, instances=orders)
+
+    def get_lookups(self, rows, request):
+        tenant = request.user.tenant
+        header = {v: k for k, v in self.HEADER_MAP.items()}
+        user_names = [row.get(header['assignee']) for row in rows]
+        user_names += [name for row in rows for name in ImportLookup.split(row.get(header['reference_users']))]
+        group_names = [name for row in rows for name in ImportLookup.split(row.get(header['reference_groups']))]
+        return {
+            'user': ImportLookup(CustomUser.objects.filter(tenant=tenant), 'username', user_names),
+            'partner': ImportLookup(Partner.objects.filter(tenant=tenant), 'partner_name', [row.get(header['partner']) for row in rows]),
+            'product': ImportLookup(Product.objects.filter(tenant=tenant), 'product_name', [row.get(header['product']) for row in rows]),
+            'group': ImportLookup(UserGroup.objects.filter(tenant=tenant), 'group_name', group_names),
+        }
+
     def validate_row(self, row, idx, existing, request):
+        '''
+        1行分（明細）を検証し、未保存の受注明細を返す
+        - 受注ヘッダの項目・参照設定は _header / _references に保持し、save_orders でまとめて登録
+        '''
         data = row.copy()
         tenant = request.user.tenant
         # ------------------------------------------------------
         # 受注担当者の解決
         # ------------------------------------------------------
         assignee = data.get(next(k for k, v in self.HEADER_MAP.items() if v == 'assignee'))
-        try:
-            cuser = CustomUser.objects.get(tenant=tenant, username=assignee)
-        except CustomUser.DoesNotExist:
+        cuser = self.lookups['user'].get(assignee)
+        if cuser is None:
             return None, f'{idx}行目: ユーザー「{assignee}」が存在しません。'
 
         # ------------------------------------------------------
         # 取引先の解決
         # ------------------------------------------------------
         partner_name = data.get(next(k for k, v in self.HEADER_MAP.items() if v == 'partner'))
-        try:
-            partner = Partner.objects.get(tenant=tenant, partner_name=partner_name)
-        except Partner.DoesNotExist:
+        partner = self.lookups['partner'].get(partner_name)
+        if partner is None:
             return None, f'{idx}行目: 取引先「{partner_name}」が存在しません。'
 
         # ------------------------------------------------------
-        # 受注ヘッダ生成または再利用
+        # 受注ヘッダの項目
         # ------------------------------------------------------
         sales_order_no = data.get(next(k for k, v in self.HEADER_MAP.items() if v == 'sales_order_no'))
         sales_order_date = data.get(next(k for k, v in self.HEADER_MAP.items() if v == 'sales_order_date'))
@@ -969,45 +1101,25 @@ class ImportCSV(LoginRequiredMixin, CSVImportBaseView):
             'rounding_method': get_rounding_code(label=rounding_method),
         }
 
-        header_obj, created = SalesOrder.objects.get_or_create(
-            tenant=tenant,
-            sales_order_no=sales_order_no,
-            defaults={
-                **header_data,
-                'create_user': request.user,
-                'update_user': request.user,
-            }
-        )
-
-        if not created:
-            # 既存の受注を更新
-            for k, v in header_data.items():
-                setattr(header_obj, k, v)
-            header_obj.update_user = request.user
-            header_obj.save()
-
         # ------------------------------------------------------
-        # 参照ユーザー / グループ設定
+        # 参照ユーザー / グループ（未入力の場合は None）
         # ------------------------------------------------------
         ref_users_text = data.get(next(k for k, v in self.HEADER_MAP.items() if v == 'reference_users'))
         ref_groups_text = data.get(next(k for k, v in self.HEADER_MAP.items() if v == 'reference_groups'))
+        references = {'reference_users': None, 'reference_groups': None}
         if ref_users_text:
-            user_names = [name.strip() for name in ref_users_text.split(',') if name.strip()]
-            users = CustomUser.objects.filter(username__in=user_names, is_deleted=False)
-            header_obj.reference_users.set(users)
+            users = self.lookups['user'].get_many(ImportLookup.split(ref_users_text))
+            references['reference_users'] = [user for user in users if not user.is_deleted]
 
         if ref_groups_text:
-            group_names = [name.strip() for name in ref_groups_text.split(',') if name.strip()]
-            groups = UserGroup.objects.filter(group_name__in=group_names)
-            header_obj.reference_groups.set(groups)
+            references['reference_groups'] = self.lookups['group'].get_many(ImportLookup.split(ref_groups_text))
 
         # ------------------------------------------------------
         # 商品（Product）の解決
         # ------------------------------------------------------
         product_name = data.get(next(k for k, v in self.HEADER_MAP.items() if v == 'product'))
-        try:
-            product = Product.objects.get(tenant=tenant, product_name=product_name)
-        except Product.DoesNotExist:
+        product = self.lookups['product'].get(product_name)
+        if product is None:
             return None, f'{idx}行目: 商品「{product_name}」が存在しません。'
 
         # ------------------------------------------------------
@@ -1020,7 +1132,6 @@ class ImportCSV(LoginRequiredMixin, CSVImportBaseView):
         is_tax_exempt = data.get(next(k for k, v in self.HEADER_MAP.items() if v == 'is_tax_exempt'))
         tax_rate = data.get(next(k for k, v in self.HEADER_MAP.items() if v == 'tax_rate'))
         detail = SalesOrderDetail(
-            sales_order=header_obj,
             line_no=line_no or 0,
             product=product,
             quantity=quantity or 0,
@@ -1032,6 +1143,8 @@ class ImportCSV(LoginRequiredMixin, CSVImportBaseView):
             create_user=request.user,
             update_user=request.user,
         )
+        detail._header = header_data
+        detail._references = references
 
         return detail, None
 
@@ -1063,9 +1176,11 @@ class OrderSheetPdfView(generic.DetailView):
     # PDF生成処理
     #----------------------------------------
     def render_pdf(self):
+        details = list(self.object.details.select_related('product').order_by('line_no'))
         context = {
             'order': self.object,
-            'details': self.object.details.all(),
+            'details': details,
+            'pricing': price_order(self.object.rounding_method, details),
             'partner': self.object.partner,
             # 'company_name': self.request.user.tenant.tenant_name,
             'title': f"注文書（{self.object.sales_order_no}）",
@@ -1111,9 +1226,11 @@ class QuatationSheetPdfView(generic.DetailView):
     # PDF生成処理
     #----------------------------------------
     def render_pdf(self):
+        details = list(self.object.details.select_related('product').order_by('line_no'))
         context = {
             'order': self.object,
-            'details': self.object.details.all(),
+            'details': details,
+            'pricing': price_order(self.object.rounding_method, details),
             'partner': self.object.partner,
             # 'company_name': self.request.user.tenant.tenant_name,
             'title': f"見積書（{self.object.sales_order_no}）",
@@ -1163,6 +1280,12 @@ def filter_data(cleaned_data, queryset):
     if cleaned_data.get('search_delivery_place'):
         queryset = queryset.filter(delivery_place__icontains=cleaned_data['search_delivery_place'])
 
+    if cleaned_data.get('search_total_amount_from') is not None:
+        queryset = queryset.filter(grand_total__gte=cleaned_data['search_total_amount_from'])
+
+    if cleaned_data.get('search_total_amount_to') is not None:
+        queryset = queryset.filter(grand_total__lte=cleaned_data['search_total_amount_to'])
+
     return queryset
 
 
@@ -1172,8 +1295,11 @@ def set_table_sort(queryset, sort):
         'sales_order_no', '-sales_order_no',
         'sales_order_date', '-sales_order_date',
         'delivery_due_date', '-delivery_due_date',
-        'total_amount', '-total_amount'
+        'grand_total', '-grand_total',
     ]
+    # 合計金額は保持カラム（grand_total）で並び替え
+    if sort in ('total_amount', '-total_amount'):
+        sort = sort.replace('total_amount', 'grand_total')
     if sort in valid_sorts:
         return queryset.order_by(sort)
     return queryset.order_by('-sales_order_date')
\ No newline at end of file
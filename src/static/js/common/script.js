@@ -30,6 +30,57 @@ $(function () {
         });
     };
 
+    /**
+     * 推定件数の表示時、正確な件数を非同期で取得して置き換え
+     */
+    $('[data-count-action]').each(function () {
+        const $count = $(this);
+        $.get(`${$count.data('count-action')}${window.location.search}`, function (res) {
+            $count.text(res.count);
+        });
+    });
+
+    /**
+     * エクスポートジョブの登録・進捗表示・完了後のダウンロード
+     */
+    $.fn.export_job = function (url, query) {
+        const $btn = this;
+        const label = $btn.html();
+        $btn.prop('disabled', true).text('出力準備中...');
+
+        const finish = function () {
+            $btn.prop('disabled', false).html(label);
+        };
+
+        $.post($btn.data('job-action'), {
+            action: url,
+            query: query,
+            csrfmiddlewaretoken: $('[name=csrfmiddlewaretoken]').val()
+        }).done(function (res) {
+            const poll = function () {
+                $.get(res.status_url, function (job) {
+                    if (job.status === 'done') {
+                        finish();
+                        window.location.href = job.download_url;
+                        return;
+                    }
+                    if (job.status === 'failed') {
+                        finish();
+                        alert(job.error);
+                        return;
+                    }
+                    $btn.text(`${job.status_label} ${job.progress}%`);
+                    setTimeout(poll, 2000);
+                }).fail(finish);
+            };
+            poll();
+        }).fail(function (xhr) {
+            finish();
+            alert((xhr.responseJSON && xhr.responseJSON.error) || 'エクスポートの登録に失敗しました。');
+        });
+        return this;
+    };
+
     /**
      * データのimport処理（非同期）
      */
@@ -41,12 +92,26 @@ $(function () {
         formData.append('file', file);
         formData.append('csrfmiddlewaretoken', $('[name=csrfmiddlewaretoken]').val());
 
+        // インポートモード（新規登録／新規登録＋更新）
+        let mode = $('#import-mode').val();
+        if (mode) {
+            formData.append('mode', mode);
+        }
+
         let url = $('#import-btn').data('action');
+        let jobUrl = $('#import-btn').data('job-action');
         let spinner = $('#loading-spinner');
         spinner.removeClass('d-none');
 
+        // 大きなファイルはインポートジョブとして登録（検証・登録はバックグラウンド）、それ以外はその場で取込
+        if (!jobUrl || file.size < $('#import-btn').data('job-threshold')) {
+            jobUrl = null;
+        } else {
+            formData.append('action', url);
+        }
+
         let jqXHR = $.ajax({
-            url: url,
+            url: jobUrl || url,
             type: 'POST',
             data: formData,
             contentType: false,
@@ -69,6 +134,10 @@ $(function () {
             }
         })
         .done(function (response) {
+            if (response.status_url) {
+                $().import_job(response.status_url);
+                return;
+            }
             alert('アップロード完了: ' + response.message);
             spinner.addClass('d-none');
             setTimeout(() => location.reload(), 2000);
@@ -89,6 +158,43 @@ $(function () {
         });
     };
 
+    /**
+     * インポートジョブの進捗表示（処理件数・件/秒）・完了後のエラーファイルのダウンロード
+     */
+    $.fn.import_job = function (statusUrl) {
+        const spinner = $('#loading-spinner');
+        spinner.removeClass('d-none');
+        $('.progress').removeClass('d-none');
+
+        const poll = function () {
+            $.get(statusUrl, function (job) {
+                $('#progress-bar')
+                    .css('width', job.progress + '%')
+                    .attr('aria-valuenow', job.progress)
+                    .text(`${job.status_label} ${job.processed_rows}/${job.total_rows ?? '-'}件（${job.rows_per_second}件/秒）`);
+
+                if (job.status === 'pending' || job.status === 'running') {
+                    setTimeout(poll, 2000);
+                    return;
+                }
+                spinner.addClass('d-none');
+                if (job.status === 'done') {
+                    alert('インポート完了: ' + job.message);
+                } else {
+                    alert(job.error);
+                }
+                if (job.error_file_url && confirm('エラーの内容をダウンロードしますか？')) {
+                    window.location.href = job.error_file_url;
+                }
+                setTimeout(() => location.reload(), 2000);
+            }).fail(function () {
+                spinner.addClass('d-none');
+            });
+        };
+        poll();
+        return this;
+    };
+
     /**
      * モーダルフォーム（共通部品）
      */
@@ -3,14 +3,20 @@ $(function () {
     // Export
     // =====================================================
     $('.export-btn').on('click', function () {
-        const url = $(this).data('action');
-        const checkUrl = $(this).data('check-action'); // 件数チェック用URL
+        const $btn = $(this);
+        const url = $btn.data('action');
+        const checkUrl = $btn.data('check-action'); // 件数チェック用URL
         const $form = $('#search_form');
         const query = $form.serialize();
 
         // 1. まず件数チェックAPIを叩く
         $.get(`${checkUrl}?${query}`, function (res) {
             if (res.warning) {
+                // 上限超過時は全件をバックグラウンドで出力するか確認
+                if (confirm(res.warning + '\n\n全件をバックグラウンドで出力しますか？')) {
+                    $btn.export_job(url, query);
+                    return;
+                }
                 // 上限超過メッセージを警告表示
                 if (!confirm(res.warning + '\n\n続行して先頭データを出力しますか？')) {
                     return; // ユーザーがキャンセル